@@ -1,6 +1,7 @@
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
+import click
 import os
 
 # Inicialização do banco de dados
@@ -9,32 +10,36 @@ db = SQLAlchemy()
 # Inicialização do gerenciador de login
 login_manager = LoginManager()
 
-def create_app():
-    """Factory function para criar a aplicação Flask"""
-    app = Flask(__name__)
+def create_app(config_name=None):
+    """Factory function para criar a aplicação Flask
+
+    config_name escolhe a configuração de app.config ('development',
+    'production', 'testing'); o padrão vem da variável FLASK_CONFIG.
+    """
+    from app.config import config
+    config_name = config_name or os.environ.get('FLASK_CONFIG') or 'default'
     
-    # Configurações básicas
-    app.config['SECRET_KEY'] = 'sua-chave-secreta-aqui'
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///desbravadores.db'
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app = Flask(__name__)
+    app.config.from_object(config[config_name])
+    config[config_name].init_app(app)
     
-    # Inicializar extensões
+    # Inicializar extensões (app.banco: PRAGMAs do SQLite em cada conexão)
+    from app import banco
     db.init_app(app)
+    banco.init_app(app)
+    # Migrações (flask db ...) apenas na linha de comando: o Alembic não é carregado nos workers
+    if click.get_current_context(silent=True) is not None:
+        banco.registrar_migracoes(app)
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
     login_manager.login_message = 'Por favor, faça login para acessar esta página.'
     login_manager.login_message_category = 'info'
     
-    # Configurar user_loader para Flask-Login
+    # Configurar user_loader para Flask-Login: 'u:<id>' (User) ou 'd:<id>' (Desbravador)
     @login_manager.user_loader
     def load_user(user_id):
-        from app.models import User, Desbravador
-        # Tentar carregar como User primeiro
-        user = User.query.get(int(user_id))
-        if user:
-            return user
-        # Se não encontrar, tentar como Desbravador
-        return Desbravador.query.get(int(user_id))
+        from app.identidades import carregar
+        return carregar(user_id)
     
     # Registrar blueprints
     from app.routes.auth import auth_bp
@@ -43,6 +48,7 @@ def create_app():
     from app.routes.financeiro import financeiro_bp
     from app.routes.relatorios import relatorios_bp
     from app.routes.desbravador import desbravador_bp
+    from app.routes.api import api_bp
     
     app.register_blueprint(auth_bp, url_prefix='/auth')
     app.register_blueprint(main_bp)
@@ -50,9 +56,13 @@ def create_app():
     app.register_blueprint(financeiro_bp, url_prefix='/financeiro')
     app.register_blueprint(relatorios_bp, url_prefix='/relatorios')
     app.register_blueprint(desbravador_bp)
+    app.register_blueprint(api_bp, url_prefix='/api/v1')
     
-    # Criar tabelas do banco de dados
-    with app.app_context():
-        db.create_all()
+    # Resumo incremental de mensalidades, busca textual, listas de referência, fila de tarefas e comandos de linha de comando
+    from app import resumos, busca, versoes, identidades, cache, referencias, tarefas, cli, profiling
+    tarefas.init_app(app)
+    cli.init_app(app)
+    profiling.init_app(app)
     
+    # O banco não é criado nem alterado aqui: use flask init-db (ou python run.py)
     return app
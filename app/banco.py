@@ -0,0 +1,71 @@
+"""
+Ajustes das conexões com o banco de dados.
+
+Quando o banco é SQLite, os PRAGMAs de SQLITE_PRAGMAS (app.config) são
+executados em cada conexão nova do pool, antes do primeiro uso: PRAGMAs
+como busy_timeout, synchronous e cache_size valem por conexão, e não para
+o arquivo. Os perfis de cada ambiente ficam em app/config.py.
+
+O Flask-Migrate (e com ele o Alembic, que sozinho demora mais para importar
+que o resto da aplicação) só é carregado pelo CLI: registrar_migracoes e
+inicializar (flask init-db). Os workers do servidor não o importam.
+"""
+
+from sqlalchemy import event, inspect
+from app import db
+
+
+def _aplicar(pragmas):
+    def conectar(conexao, registro):
+        cursor = conexao.cursor()
+        try:
+            for nome, valor in pragmas.items():
+                cursor.execute(f'PRAGMA {nome}={valor}')
+        finally:
+            cursor.close()
+    return conectar
+
+
+def init_app(app):
+    """Registra os PRAGMAs nas conexões do engine da aplicação"""
+    pragmas = app.config.get('SQLITE_PRAGMAS')
+    if not pragmas:
+        return
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name == 'sqlite':
+        event.listen(engine, 'connect', _aplicar(dict(pragmas)))
+
+
+def registrar_migracoes(app):
+    """Registra o Flask-Migrate (comandos flask db) na aplicação"""
+    if 'migrate' in app.extensions:
+        return
+    from flask_migrate import Migrate
+    Migrate(app, db, render_as_batch=True)
+
+
+def inicializar(app):
+    """Prepara o banco para uso; retorna True se ele foi criado agora
+
+    Um banco vazio é criado direto pelos modelos (db.create_all) e marcado
+    com a última migração; um banco existente recebe as migrações pendentes.
+    """
+    from flask_migrate import stamp, upgrade
+    registrar_migracoes(app)
+    tabelas = set(inspect(db.engine).get_table_names()) - {'alembic_version'}
+    if tabelas:
+        upgrade()
+        return False
+    db.create_all()
+    stamp()
+    return True
+
+
+def insert_dialeto(tabela):
+    """INSERT com suporte a ON CONFLICT do dialeto em uso (SQLite ou PostgreSQL)"""
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(tabela)
@@ -0,0 +1,128 @@
+"""
+Busca textual de desbravadores.
+
+No SQLite, os campos pesquisáveis (nome, responsável, e-mail e telefone)
+ficam em uma tabela virtual FTS5, mantida em sincronia por triggers. O
+tokenizador unicode61 com remove_diacritics ignora acentos e maiúsculas
+("joao" encontra "João"), cada palavra digitada é buscada como prefixo e
+os resultados vêm ordenados por relevância (bm25, com peso maior no nome).
+
+Em bancos sem a tabela de busca (outros SGBDs, ou bancos ainda não
+migrados) a busca volta ao LIKE sobre o nome.
+"""
+
+import re
+from sqlalchemy import event, func, literal_column, table, column, text
+from app import db
+from app.models import Desbravador
+
+TABELA = 'desbravador_busca'
+
+# Pesos do bm25 por coluna: nome, nome_responsavel, email, telefone
+PESOS = (10.0, 3.0, 1.0, 1.0)
+
+# Palavras consideradas de um termo de busca
+MAXIMO_PALAVRAS = 8
+
+_TELEFONE_DIGITOS = (
+    "replace(replace(replace(replace(replace(coalesce({t}.telefone, ''), "
+    "'(', ''), ')', ''), '-', ''), ' ', ''), '.', '')"
+)
+
+# O telefone é indexado como digitado e só com dígitos, para que
+# "99999-1234" e "999991234" encontrem o mesmo número
+_VALORES = (
+    "{t}.id, {t}.nome, {t}.nome_responsavel, {t}.email, "
+    "coalesce({t}.telefone, '') || ' ' || " + _TELEFONE_DIGITOS
+)
+
+# A migração 0003 guarda uma cópia fixa destas instruções
+DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABELA} USING fts5("
+    "nome, nome_responsavel, email, telefone, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+
+    f"CREATE TRIGGER IF NOT EXISTS {TABELA}_ai AFTER INSERT ON desbravador BEGIN "
+    f"INSERT INTO {TABELA} (rowid, nome, nome_responsavel, email, telefone) "
+    f"VALUES ({_VALORES.format(t='new')}); END",
+
+    f"CREATE TRIGGER IF NOT EXISTS {TABELA}_ad AFTER DELETE ON desbravador BEGIN "
+    f"DELETE FROM {TABELA} WHERE rowid = old.id; END",
+
+    f"CREATE TRIGGER IF NOT EXISTS {TABELA}_au AFTER UPDATE OF "
+    "nome, nome_responsavel, email, telefone ON desbravador BEGIN "
+    f"DELETE FROM {TABELA} WHERE rowid = old.id; "
+    f"INSERT INTO {TABELA} (rowid, nome, nome_responsavel, email, telefone) "
+    f"VALUES ({_VALORES.format(t='new')}); END",
+]
+
+POPULAR = (
+    f"INSERT INTO {TABELA} (rowid, nome, nome_responsavel, email, telefone) "
+    f"SELECT {_VALORES.format(t='desbravador')} FROM desbravador"
+)
+
+indice = table(TABELA, column('rowid'), column(TABELA))
+
+# Engines em que a tabela de busca existe (verificado uma vez por engine)
+_disponivel = {}
+
+
+def criar(conexao):
+    """Cria a tabela de busca e os triggers e indexa os desbravadores existentes"""
+    for comando in DDL:
+        conexao.execute(text(comando))
+    conexao.execute(text(f'DELETE FROM {TABELA}'))
+    conexao.execute(text(POPULAR))
+    _disponivel.pop(conexao.engine, None)
+
+
+@event.listens_for(db.metadata, 'after_create')
+def _criar_indice(metadata, conexao, tables=(), **kw):
+    if conexao.dialect.name == 'sqlite' and Desbravador.__table__ in tables:
+        criar(conexao)
+
+
+def disponivel():
+    """Se o banco atual tem a tabela de busca FTS5"""
+    engine = db.engine
+    if engine not in _disponivel:
+        if engine.dialect.name != 'sqlite':
+            _disponivel[engine] = False
+        else:
+            with engine.connect() as conexao:
+                _disponivel[engine] = conexao.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :nome"),
+                    {'nome': TABELA}
+                ).first() is not None
+    return _disponivel[engine]
+
+
+def expressao(termo):
+    """Converte o texto digitado em uma consulta FTS5: todas as palavras, por prefixo"""
+    palavras = re.findall(r'\w+', termo or '')[:MAXIMO_PALAVRAS]
+    return ' '.join(f'"{palavra}"*' for palavra in palavras)
+
+
+def filtrar(query, termo):
+    """Aplica a busca a uma consulta de Desbravador, ordenando por relevância"""
+    if not disponivel():
+        return query.filter(Desbravador.nome.contains(termo)).order_by(Desbravador.nome)
+
+    consulta = expressao(termo)
+    if not consulta:
+        return query.filter(db.false())
+
+    relevancia = func.bm25(literal_column(TABELA), *PESOS)
+    return (
+        query.join(indice, indice.c.rowid == Desbravador.id)
+        .filter(indice.c[TABELA].op('MATCH')(consulta))
+        .order_by(relevancia, Desbravador.nome)
+    )
+
+
+def sugerir(termo, limite=10):
+    """Desbravadores ativos mais relevantes para o termo (auto-completar)"""
+    query = db.session.query(Desbravador.id, Desbravador.nome, Desbravador.unidade).filter(
+        Desbravador.ativo == True
+    )
+    return filtrar(query, termo).limit(limite).all()
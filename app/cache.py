@@ -0,0 +1,228 @@
+"""
+Cache dos dados dos dashboards e relatórios.
+
+Os números calculados por páginas muito acessadas (dashboards, patrimônio,
+estatísticas de desbravadores) são iguais para todos os usuários até que
+algum dado mude. memorizar() guarda o resultado de uma função sob uma chave
+e um conjunto de tags (nomes das tabelas de que ele depende). A chave inclui
+as versões atuais dessas tabelas (app.versoes): depois de um commit em
+qualquer worker, as entradas antigas deixam de ser encontradas. O commit
+também descarta, no processo que o fez, as entradas marcadas com as tabelas
+alteradas, liberando espaço.
+
+Backends (CACHE_BACKEND):
+
+- 'memoria': LRU no próprio processo;
+- 'sqlite': arquivo SQLite (CACHE_SQLITE_PATH) compartilhado entre os
+  workers do gunicorn, de modo que um valor calculado em um worker serve a
+  todos.
+
+Os valores guardados devem ser serializáveis com pickle (dicionários,
+listas, tuplas, números, datas), nunca objetos do ORM.
+"""
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, has_app_context
+from app.versoes import ao_alterar, versoes
+
+
+class MemoriaLRU:
+    """Backend em memória, local a cada processo"""
+
+    def __init__(self, tamanho=512):
+        self.tamanho = tamanho
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()
+
+    def obter(self, chave):
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is None:
+                return None
+            expira, tags, valor = entrada
+            if expira < time.time():
+                del self._entradas[chave]
+                return None
+            self._entradas.move_to_end(chave)
+            return valor
+
+    def guardar(self, chave, valor, tags, ttl):
+        with self._lock:
+            self._entradas[chave] = (time.time() + ttl, frozenset(tags), valor)
+            self._entradas.move_to_end(chave)
+            while len(self._entradas) > self.tamanho:
+                self._entradas.popitem(last=False)
+
+    def descartar_tags(self, tags):
+        with self._lock:
+            for chave, (_, marcadas, _) in list(self._entradas.items()):
+                if marcadas & tags:
+                    del self._entradas[chave]
+
+    def limpar(self):
+        with self._lock:
+            self._entradas.clear()
+
+    def tamanho_atual(self):
+        return len(self._entradas)
+
+
+class SQLiteCache:
+    """Backend em arquivo SQLite, compartilhado entre processos"""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+        with self._conexao() as conexao:
+            conexao.executescript(
+                'CREATE TABLE IF NOT EXISTS entrada ('
+                '  chave TEXT PRIMARY KEY, valor BLOB NOT NULL, expira REAL NOT NULL);'
+                'CREATE TABLE IF NOT EXISTS tag ('
+                '  tag TEXT NOT NULL, chave TEXT NOT NULL, PRIMARY KEY (tag, chave)) WITHOUT ROWID;'
+            )
+
+    def _conexao(self):
+        conexao = getattr(self._local, 'conexao', None)
+        if conexao is None:
+            conexao = sqlite3.connect(self.caminho, timeout=5)
+            conexao.execute('PRAGMA journal_mode=WAL')
+            conexao.execute('PRAGMA synchronous=NORMAL')
+            self._local.conexao = conexao
+        return conexao
+
+    def obter(self, chave):
+        linha = self._conexao().execute(
+            'SELECT valor FROM entrada WHERE chave = ? AND expira >= ?', (chave, time.time())
+        ).fetchone()
+        return pickle.loads(linha[0]) if linha else None
+
+    def guardar(self, chave, valor, tags, ttl):
+        with self._conexao() as conexao:
+            conexao.execute(
+                'INSERT OR REPLACE INTO entrada (chave, valor, expira) VALUES (?, ?, ?)',
+                (chave, pickle.dumps(valor, pickle.HIGHEST_PROTOCOL), time.time() + ttl)
+            )
+            conexao.executemany(
+                'INSERT OR IGNORE INTO tag (tag, chave) VALUES (?, ?)',
+                [(tag, chave) for tag in tags]
+            )
+
+    def descartar_tags(self, tags):
+        marcas = ','.join('?' * len(tags))
+        with self._conexao() as conexao:
+            conexao.execute(
+                f'DELETE FROM entrada WHERE chave IN (SELECT chave FROM tag WHERE tag IN ({marcas}))',
+                tuple(tags)
+            )
+            conexao.execute(
+                'DELETE FROM tag WHERE chave NOT IN (SELECT chave FROM entrada)'
+            )
+            conexao.execute('DELETE FROM entrada WHERE expira < ?', (time.time(),))
+
+    def limpar(self):
+        with self._conexao() as conexao:
+            conexao.execute('DELETE FROM entrada')
+            conexao.execute('DELETE FROM tag')
+
+    def tamanho_atual(self):
+        return self._conexao().execute('SELECT COUNT(*) FROM entrada').fetchone()[0]
+
+
+_lock = threading.Lock()
+_backends = {}
+_estatisticas = {}
+# Commits deste processo por tabela: um valor calculado enquanto uma de suas
+# tabelas mudou não é guardado
+_geracoes = {}
+
+
+def backend():
+    """Backend configurado para a aplicação atual"""
+    app = current_app._get_current_object()
+    with _lock:
+        if app not in _backends:
+            if app.config['CACHE_BACKEND'] == 'sqlite':
+                caminho = app.config['CACHE_SQLITE_PATH']
+                if not os.path.isabs(caminho):
+                    caminho = os.path.join(os.path.dirname(app.root_path), caminho)
+                _backends[app] = SQLiteCache(caminho)
+            else:
+                _backends[app] = MemoriaLRU(app.config['CACHE_SIZE'])
+        return _backends[app]
+
+
+def _contar(nome, campo):
+    with _lock:
+        estatistica = _estatisticas.setdefault(nome, {'nome': nome, 'acertos': 0, 'falhas': 0})
+        estatistica[campo] += 1
+
+
+def memorizar(nome, tags, funcao, *partes, ttl=None):
+    """Resultado de funcao() guardado sob (nome, *partes) e descartado quando as tags mudam
+
+    O TTL (CACHE_TTL por padrão) cobre o que muda sem commit, como a
+    passagem do mês.
+    """
+    tags = sorted(set(tags))
+    marca = versoes(*tags)
+    chave = ':'.join([nome, *map(str, partes), *(marca[tag] for tag in tags)])
+    armazenamento = backend()
+    valor = armazenamento.obter(chave)
+    if valor is not None:
+        _contar(nome, 'acertos')
+        return valor
+
+    _contar(nome, 'falhas')
+    with _lock:
+        antes = [_geracoes.get(tag, 0) for tag in tags]
+    valor = funcao()
+    with _lock:
+        alterado = antes != [_geracoes.get(tag, 0) for tag in tags]
+    # Com um commit no meio do cálculo, o valor pode misturar dados das duas
+    # versões: ele serve a esta requisição, mas não é guardado
+    if not alterado:
+        armazenamento.guardar(chave, valor, tags, ttl or current_app.config['CACHE_TTL'])
+    return valor
+
+
+def estatisticas():
+    """Acertos e falhas por nome de cache neste processo, além do tamanho do backend"""
+    with _lock:
+        por_nome = [dict(e) for e in _estatisticas.values()]
+    for e in por_nome:
+        total = e['acertos'] + e['falhas']
+        e['taxa_acerto'] = 100.0 * e['acertos'] / total if total else 0.0
+    por_nome.sort(key=lambda e: e['nome'])
+    return {
+        'backend': current_app.config['CACHE_BACKEND'],
+        'entradas': backend().tamanho_atual(),
+        'por_nome': por_nome
+    }
+
+
+def limpar():
+    """Esvazia o cache e zera as estatísticas"""
+    backend().limpar()
+    with _lock:
+        _estatisticas.clear()
+
+
+@ao_alterar
+def descartar(tabelas):
+    """Descarta as entradas que dependem das tabelas alteradas"""
+    if has_app_context():
+        # O backend compartilhado precisa ser limpo mesmo que este processo
+        # ainda não tenha lido nada do cache
+        backend()
+    with _lock:
+        for tabela in tabelas:
+            _geracoes[tabela] = _geracoes.get(tabela, 0) + 1
+        armazenamentos = list(_backends.values())
+    for armazenamento in armazenamentos:
+        armazenamento.descartar_tags(set(tabelas))
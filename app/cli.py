@@ -0,0 +1,242 @@
+"""Comandos de linha de comando (flask <comando>) do sistema"""
+
+import click
+from app import db
+
+
+def init_app(app):
+    """Registra os comandos da aplicação no CLI do Flask"""
+
+    @app.cli.command('init-db')
+    def init_db():
+        """Cria o banco de dados ou aplica as migrações pendentes"""
+        from app import banco
+        if banco.inicializar(app):
+            click.echo('✅ Banco de dados criado.')
+        else:
+            click.echo('✅ Banco de dados atualizado para a última migração.')
+
+    @app.cli.command('seed')
+    def seed():
+        """Cria o administrador padrão (admin / admin123) e dados de exemplo"""
+        from app import exemplos
+        if exemplos.criar_admin_padrao():
+            click.echo('✅ Usuário administrador criado: admin / admin123')
+            click.echo('   ⚠️  Altere a senha após o primeiro login!')
+        else:
+            click.echo('Usuário administrador já existe.')
+        if exemplos.criar_dados_exemplo():
+            click.echo('✅ Dados de exemplo criados. Desbravadores com login:')
+            click.echo(f'   - joao.silva / {exemplos.SENHA_DESBRAVADORES}')
+            click.echo(f'   - ana.santos / {exemplos.SENHA_DESBRAVADORES}')
+        else:
+            click.echo('Já existem desbravadores cadastrados; dados de exemplo não criados.')
+
+    @app.cli.command('gerar-dados')
+    @click.option('--desbravadores', type=click.IntRange(0), default=500, show_default=True)
+    @click.option('--anos', type=click.IntRange(1), default=3, show_default=True, help='Anos de mensalidades.')
+    @click.option('--transacoes', type=click.IntRange(0), default=20000, show_default=True)
+    @click.option('--eventos', type=click.IntRange(0), default=500, show_default=True)
+    @click.option('--semente', type=int, default=1, show_default=True, help='Mesma semente, mesmos dados.')
+    @click.option('--ate', help='Último mês com dados, AAAA-MM (padrão: mês atual).')
+    def gerar_dados(desbravadores, anos, transacoes, eventos, semente, ate):
+        """Acrescenta dados sintéticos em volume para testes de carga"""
+        from datetime import datetime
+        from app import sinteticos
+        if ate:
+            try:
+                ate = datetime.strptime(ate, '%Y-%m')
+            except ValueError:
+                raise click.BadParameter('use o formato AAAA-MM.', param_hint='--ate')
+            ate = (ate.year, ate.month)
+        resultado = sinteticos.gerar(desbravadores, anos, transacoes, eventos, semente, ate)
+        de, ate = resultado['de'], resultado['ate']
+        click.echo(f'✅ {resultado["desbravadores"]} desbravadores ({resultado["com_login"]} com login, '
+                   f'senha {sinteticos.SENHA}), {resultado["mensalidades"]} mensalidades, '
+                   f'{resultado["transacoes"]} transações e {resultado["eventos"]} eventos '
+                   f'de {de[1]:02d}/{de[0]} a {ate[1]:02d}/{ate[0]}.')
+
+    @app.cli.command('create-admin')
+    @click.option('--username', prompt='Usuário', help='Nome de usuário para o login.')
+    @click.option('--email', prompt='E-mail', help='E-mail do administrador.')
+    @click.option('--nome', prompt='Nome completo', help='Nome completo do administrador.')
+    @click.option('--cargo', default='Diretor', show_default=True, help='Cargo no clube.')
+    @click.password_option('--senha', prompt='Senha', confirmation_prompt='Confirme a senha',
+                           help='Senha (se omitida, é pedida sem eco no terminal).')
+    def create_admin(username, email, nome, cargo, senha):
+        """Cria um usuário administrador"""
+        from app import exemplos
+        if not senha:
+            raise click.ClickException('Informe uma senha.')
+        if exemplos.criar_admin(username, email, senha, nome, cargo) is None:
+            raise click.ClickException(f'Já existe um usuário com o nome {username} ou o e-mail {email}.')
+        click.echo(f'✅ Administrador {username} criado.')
+
+    @app.cli.command('rebuild-rollups')
+    def rebuild_rollups():
+        """Recalcula do zero o resumo de mensalidades dos dashboards"""
+        from app.resumos import reconstruir
+        reconstruir()
+        db.session.commit()
+        click.echo('✅ Resumo de mensalidades reconstruído.')
+
+    @app.cli.command('fechar-saldos')
+    @click.option('--refazer', is_flag=True, help='Descarta os fechamentos existentes antes de recalcular.')
+    def fechar_saldos(refazer):
+        """Fecha os saldos de todos os meses encerrados"""
+        from app import saldos
+        if refazer:
+            saldos.invalidar_a_partir(1900, 1)
+            db.session.commit()
+        fechamento = saldos.garantir_fechamentos(*saldos.mes_aberto())
+        if fechamento is None:
+            click.echo('Nenhuma transação em meses encerrados.')
+        else:
+            click.echo(f'✅ Saldos fechados até {fechamento.mes}/{fechamento.ano}: R$ {fechamento.saldo_final:.2f}')
+
+    @app.cli.command('verificar-planos')
+    def verificar_planos():
+        """Falha se alguma consulta das rotas fizer varredura completa de tabela ou se uma rota der erro"""
+        from app.diagnostico import verificar_planos as verificar
+        if db.engine.dialect.name != 'sqlite':
+            raise click.ClickException('A verificação de planos usa EXPLAIN QUERY PLAN do SQLite.')
+
+        resultados, problemas, falhas = verificar(app)
+        for url, status, consultas in resultados:
+            situacao = 'ignorada (sem usuário/dados)' if status is None else f'{status} - {len(consultas)} consultas'
+            click.echo(f'{url}: {situacao}')
+
+        for url, statement, linhas in problemas:
+            click.echo(f'\n❌ {url}\n{statement}')
+            for linha in linhas:
+                click.echo(f'   {linha}')
+        for url, status in falhas:
+            click.echo(f'\n❌ {url}: a rota respondeu HTTP {status}')
+        if problemas or falhas:
+            raise SystemExit(1)
+        click.echo('✅ Nenhuma varredura completa de tabela nas rotas verificadas.')
+
+    @app.cli.command('gerar-mensalidades')
+    @click.option('--ano', type=int, help='Ano de referência (padrão: ano atual).')
+    @click.option('--mes', type=click.IntRange(1, 12), help='Mês de referência (padrão: mês atual).')
+    @click.option('--valor', type=float, default=None, help='Valor da mensalidade.')
+    def gerar_mensalidades(ano, mes, valor):
+        """Gera as mensalidades do mês para todos os desbravadores ativos"""
+        from datetime import datetime
+        from app.mensalidades import gerar_mensalidades as gerar, VALOR_PADRAO
+        hoje = datetime.now()
+        ano = ano or hoje.year
+        mes = mes or hoje.month
+        criadas = gerar(ano, mes, VALOR_PADRAO if valor is None else valor)
+        click.echo(f'✅ {criadas} mensalidade(s) gerada(s) para {mes:02d}/{ano}.')
+
+    @app.cli.command('verificar-consultas')
+    @click.option('--sql', is_flag=True, help='Mostra os comandos SQL das rotas que excederem o orçamento.')
+    def verificar_consultas(sql):
+        """Falha se alguma rota exceder seu orçamento de consultas SQL (N+1) ou der erro"""
+        from app.diagnostico import verificar_orcamento
+        resultados, excedidas, falhas = verificar_orcamento(app)
+        reprovadas = {url for url, _, _ in excedidas} | {url for url, _ in falhas}
+        for url, status, consultas in resultados:
+            if status is None:
+                click.echo(f'{url}: ignorada (sem usuário/dados)')
+                continue
+            marca = '❌' if url in reprovadas else '✅'
+            click.echo(f'{marca} {url}: {len(consultas)} consultas (HTTP {status})')
+
+        for url, consultas, orcamento in excedidas:
+            click.echo(f'\n❌ {url}: {len(consultas)} consultas, orçamento {orcamento}')
+            if sql:
+                for statement, _ in consultas:
+                    click.echo(f'   {" ".join(statement.split())[:160]}')
+        for url, status in falhas:
+            click.echo(f'\n❌ {url}: a rota respondeu HTTP {status}')
+        if excedidas or falhas:
+            raise SystemExit(1)
+        click.echo('✅ Todas as rotas dentro do orçamento de consultas.')
+
+    @app.cli.command('gerar-pdfs')
+    @click.option('--ano', type=int, help='Ano de referência (padrão: mês anterior).')
+    @click.option('--mes', type=click.IntRange(1, 12), help='Mês de referência (padrão: mês anterior).')
+    def gerar_pdfs(ano, mes):
+        """Gera os PDFs de relatórios do mês (fechamento para a diretoria)"""
+        from datetime import datetime
+        from app import relatorios_pdf
+        if not relatorios_pdf.disponivel():
+            raise click.ClickException('Instale o reportlab para gerar PDFs.')
+        if ano is None or mes is None:
+            hoje = datetime.now()
+            anterior = (hoje.year - 1, 12) if hoje.month == 1 else (hoje.year, hoje.month - 1)
+            ano = ano or anterior[0]
+            mes = mes or anterior[1]
+        for tipo in relatorios_pdf.RELATORIOS:
+            caminho = relatorios_pdf.gerar(tipo, ano, mes)
+            click.echo(f'✅ {tipo} {mes:02d}/{ano}: {caminho}')
+
+    @app.cli.command('importar-desbravadores')
+    @click.argument('arquivo', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--simular', is_flag=True, help='Apenas valida o arquivo, sem gravar nada.')
+    def importar_desbravadores(arquivo, simular):
+        """Importa desbravadores de um arquivo CSV ou XLSX"""
+        import os
+        from app import importacao
+        formato = os.path.splitext(arquivo)[1].lower().lstrip('.')
+        if formato not in ('csv', 'xlsx'):
+            raise click.ClickException('Use um arquivo .csv ou .xlsx.')
+        if formato == 'xlsx' and not importacao.disponivel_xlsx():
+            raise click.ClickException('Instale o openpyxl para importar planilhas XLSX.')
+        try:
+            estado = importacao.processar(arquivo, formato, simular=simular)
+        except ValueError as erro:
+            raise click.ClickException(str(erro))
+        for erro in estado['detalhes']:
+            click.echo(f'   linha {erro["linha"]}: {erro["motivo"]}')
+        acao = 'válida(s)' if simular else 'importada(s)'
+        click.echo(f'✅ {estado["linhas"]} linha(s) lida(s), {estado["importadas"]} {acao}, {estado["erros"]} com erro.')
+        if estado['erros']:
+            raise SystemExit(1)
+
+    @app.cli.command('importar-extrato')
+    @click.argument('arquivo', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--simular', is_flag=True, help='Mostra as conciliações sem gravar nada.')
+    def importar_extrato(arquivo, simular):
+        """Importa um extrato bancário (OFX/CSV) e concilia as mensalidades"""
+        import os
+        from app import extratos
+        formato = os.path.splitext(arquivo)[1].lower().lstrip('.')
+        try:
+            resumo = extratos.processar(arquivo, formato, simular=simular)
+        except ValueError as erro:
+            raise click.ClickException(str(erro))
+        for erro in resumo['detalhes']:
+            click.echo(f'   linha {erro["linha"]}: {erro["motivo"]}')
+        for item in resumo['conciliacoes']:
+            click.echo(f'   {item["data"]:%d/%m/%Y} R$ {item["valor"]:.2f} -> {item["desbravador"]} ({item["referencia"]})')
+        acao = 'a importar' if simular else 'importado(s)'
+        click.echo(f'✅ {resumo["lancamentos"]} lançamento(s): {resumo["importados"]} {acao}, '
+                   f'{resumo["repetidos"]} já importado(s), {resumo["conciliados"]} mensalidade(s) conciliada(s), '
+                   f'{resumo["erros"]} com erro.')
+
+    @app.cli.command('worker')
+    @click.option('--processos', type=click.IntRange(1), help='Processos do pool (padrão: JOBS_WORKERS).')
+    @click.option('--sem-agendador', is_flag=True, help='Não enfileira as tarefas de JOBS_SCHEDULE.')
+    def worker(processos, sem_agendador):
+        """Executa a fila de tarefas em segundo plano com um pool de processos"""
+        from app import worker as pool
+        processos = processos or app.config['JOBS_WORKERS']
+        click.echo(f'✅ Fila de tarefas: {processos} processo(s). Ctrl+C para encerrar.')
+        pool.executar(app, processos, agendador=not sem_agendador, saida=click.echo)
+        click.echo('✅ Pool encerrado.')
+
+    @app.cli.command('tarefas')
+    @click.option('--limite', type=click.IntRange(1), default=20, show_default=True)
+    def listar_tarefas(limite):
+        """Lista as últimas tarefas da fila e a contagem por situação"""
+        from app import tarefas
+        for linha in tarefas.recentes(limite):
+            quando = (linha.concluida_em or linha.iniciada_em or linha.executar_em).strftime('%d/%m %H:%M:%S')
+            click.echo(f'   {linha.id:>6} {linha.tipo:<24} {linha.situacao:<12} {linha.progresso:>4.0%} '
+                       f'{linha.tentativas}/{linha.max_tentativas} {quando} {linha.mensagem or ""}')
+        contagem = tarefas.contagem()
+        click.echo('✅ ' + (', '.join(f'{total} {situacao}' for situacao, total in sorted(contagem.items()))
+                           or 'Nenhuma tarefa na fila.'))
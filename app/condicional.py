@@ -0,0 +1,94 @@
+"""
+Requisições condicionais (ETag / 304 Not Modified) nas páginas de leitura.
+
+Uma rota declara as tabelas de que depende com @depende_de('evento', ...);
+a tabela da conta logada (nome exibido no menu) é sempre incluída.
+
+O ETag da resposta combina as versões dessas tabelas (app.versoes), o
+usuário logado, a data de hoje (as páginas destacam o dia atual e o mês
+corrente) e a versão do código implantado. Se o navegador envia o mesmo
+ETag em If-None-Match, a resposta é 304 sem executar a rota: o custo é uma
+única consulta às versões. As mesmas versões ficam na requisição e entram
+nas chaves de app.cache, de modo que um worker nunca responde com dados
+guardados antes da versão que está no ETag.
+
+If-Modified-Since não é usado para responder 304: as páginas dependem do
+usuário e uma data não distingue duas contas logadas no mesmo navegador.
+O cabeçalho Last-Modified é enviado apenas como informação.
+"""
+
+import hashlib
+import os
+from datetime import date, datetime, time, timezone
+from functools import lru_cache, wraps
+from flask import make_response, request, session
+from flask_login import current_user
+from sqlalchemy import select
+from app import db
+from app.models import VersaoTabela
+from app.versoes import lembrar
+
+
+@lru_cache(maxsize=1)
+def versao_do_codigo():
+    """Marca dos arquivos da aplicação: muda a cada implantação, igual em todos os workers
+
+    Calculada na primeira requisição condicional, não na importação: o
+    wsgi.py sobe sem percorrer a árvore da aplicação.
+    """
+    raiz = os.path.dirname(os.path.abspath(__file__))
+    marca = hashlib.sha256()
+    for pasta, subpastas, arquivos in sorted(os.walk(raiz)):
+        subpastas[:] = sorted(d for d in subpastas if d != '__pycache__')
+        for arquivo in sorted(arquivos):
+            if arquivo.endswith(('.py', '.html')):
+                caminho = os.path.join(pasta, arquivo)
+                marca.update(f'{os.path.relpath(caminho, raiz)}:{os.stat(caminho).st_mtime_ns}'.encode())
+    return marca.hexdigest()[:16]
+
+
+def _versoes(tabelas):
+    """(marcas de versão, última alteração em UTC) das tabelas, em uma consulta"""
+    linhas = db.session.execute(
+        select(VersaoTabela.tabela, VersaoTabela.versao, VersaoTabela.alterada_em)
+        .where(VersaoTabela.tabela.in_(tabelas))
+    ).all()
+    marca = {tabela: '0' for tabela in tabelas}
+    alterada_em = datetime.combine(date.today(), time.min).astimezone(timezone.utc)
+    for tabela, versao, alteracao in linhas:
+        marca[tabela] = versao
+        if alteracao is not None:
+            alterada_em = max(alterada_em, alteracao.replace(tzinfo=timezone.utc))
+    lembrar(marca)
+    return marca, alterada_em
+
+
+def depende_de(*tabelas):
+    """Responde 304 quando nenhuma das tabelas mudou desde a última visita do usuário"""
+    def decorador(view):
+        @wraps(view)
+        def condicional(*args, **kwargs):
+            # Mensagens flash pendentes precisam ser exibidas
+            if request.method not in ('GET', 'HEAD') or session.get('_flashes'):
+                return view(*args, **kwargs)
+
+            marca, alterada_em = _versoes({*tabelas, current_user.__tablename__})
+            chave = [versao_do_codigo(), current_user.get_id(), date.today().isoformat(), sorted(marca.items())]
+            etag = hashlib.sha256(repr(chave).encode()).hexdigest()[:32]
+
+            if etag in request.if_none_match:
+                resposta = make_response('', 304)
+            else:
+                resposta = make_response(view(*args, **kwargs))
+                if resposta.status_code != 200:
+                    return resposta
+                resposta.last_modified = alterada_em
+
+            resposta.set_etag(etag)
+            # O navegador guarda a página, mas confirma a cada acesso
+            resposta.cache_control.private = True
+            resposta.cache_control.no_cache = True
+            resposta.vary.add('Cookie')
+            return resposta
+        return condicional
+    return decorador
@@ -4,15 +4,65 @@
 import os
 from datetime import timedelta
 
+
+def _opcoes_engine(**padroes):
+    """SQLALCHEMY_ENGINE_OPTIONS: pool de conexões, com variáveis de ambiente DB_POOL_*"""
+    variaveis = {
+        'pool_size': ('DB_POOL_SIZE', int),
+        'max_overflow': ('DB_POOL_MAX_OVERFLOW', int),
+        'pool_timeout': ('DB_POOL_TIMEOUT', float),
+        'pool_recycle': ('DB_POOL_RECYCLE', int),
+    }
+    opcoes = dict(padroes)
+    for opcao, (variavel, tipo) in variaveis.items():
+        if os.environ.get(variavel):
+            opcoes[opcao] = tipo(os.environ[variavel])
+    return opcoes
+
+
 class Config:
     """Configurações base"""
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'sua-chave-secreta-desenvolvimento'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_RECORD_QUERIES = True
+    SQLALCHEMY_ENGINE_OPTIONS = _opcoes_engine()
+    
+    # PRAGMAs aplicados a cada conexão nova do pool quando o banco é SQLite
+    # (app.banco): esperar até busy_timeout ms por um lock em vez de falhar
+    # com "database is locked"
+    SQLITE_PRAGMAS = {
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT') or 5000),
+    }
+    
+    # Requisições acima deste tempo (ms) são registradas no log de lentidão
+    SLOW_REQUEST_MS = int(os.environ.get('SLOW_REQUEST_MS') or 500)
+    # Cabeçalho Server-Timing (tempos e número de consultas) em todas as
+    # respostas; desligado, só os administradores logados o recebem
+    SERVER_TIMING = os.environ.get('SERVER_TIMING', 'false').lower() in ['true', 'on', '1']
+    
+    # Cache dos dashboards e relatórios: 'memoria' (por processo) ou 'sqlite'
+    # (arquivo compartilhado entre os workers do gunicorn)
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND') or 'memoria'
+    CACHE_SQLITE_PATH = os.environ.get('CACHE_SQLITE_PATH') or 'instance/cache.sqlite'
+    CACHE_TTL = int(os.environ.get('CACHE_TTL') or 300)
+    CACHE_SIZE = int(os.environ.get('CACHE_SIZE') or 512)
     
     # Configurações de sessão
     PERMANENT_SESSION_LIFETIME = timedelta(hours=24)
     
+    # Cache das identidades de login: validade (s) e número máximo de contas
+    IDENTITY_CACHE_TTL = int(os.environ.get('IDENTITY_CACHE_TTL') or 30)
+    IDENTITY_CACHE_SIZE = int(os.environ.get('IDENTITY_CACHE_SIZE') or 256)
+    
+    # Senhas: esquema dos novos hashes ('scrypt', 'pbkdf2:sha256:600000',
+    # 'bcrypt:12'...), processos que calculam os hashes em cada processo da
+    # aplicação (0: na própria thread; 1 sob o gunicorn.conf.py) e cálculos
+    # simultâneos por processo antes de o login responder 503
+    PASSWORD_SCHEME = os.environ.get('PASSWORD_SCHEME') or 'scrypt'
+    PASSWORD_WORKERS = int(os.environ.get('PASSWORD_WORKERS') or min(os.cpu_count() or 1, 4))
+    PASSWORD_QUEUE = int(os.environ.get('PASSWORD_QUEUE') or 4 * PASSWORD_WORKERS or 1)
+    PASSWORD_QUEUE_TIMEOUT = float(os.environ.get('PASSWORD_QUEUE_TIMEOUT') or 2)
+    
     # Configurações de upload (futuro)
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB
     UPLOAD_FOLDER = 'app/static/uploads'
@@ -24,8 +74,30 @@ class Config:
     MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
     
+    # Destinatários do log de erros por email (separados por vírgula)
+    ADMINS = [email.strip() for email in (os.environ.get('ADMINS') or '').split(',') if email.strip()]
+    
     # Configurações de relatórios
-    REPORTS_FOLDER = 'app/static/reports'
+    # Fora de app/static: os PDFs só são entregues pela rota autenticada
+    REPORTS_FOLDER = os.environ.get('REPORTS_FOLDER') or 'instance/reports'
+    
+    # Arquivos enviados para importação, apagados após o processamento
+    IMPORTS_FOLDER = os.environ.get('IMPORTS_FOLDER') or 'instance/importacoes'
+    
+    # Fila de tarefas em segundo plano (app.tarefas)
+    # local: thread em cada processo da aplicação; worker: processos do
+    # `flask worker`; imediato: na própria requisição (testes)
+    JOBS_EXECUTOR = os.environ.get('JOBS_EXECUTOR') or 'local'
+    JOBS_WORKERS = int(os.environ.get('JOBS_WORKERS') or 2)  # processos do `flask worker`
+    JOBS_POLL_INTERVAL = float(os.environ.get('JOBS_POLL_INTERVAL') or 2)  # segundos com a fila vazia
+    JOBS_RETRY_DELAY = int(os.environ.get('JOBS_RETRY_DELAY') or 30)  # segundos; dobra a cada falha
+    JOBS_KEEP_DAYS = int(os.environ.get('JOBS_KEEP_DAYS') or 7)  # tarefas encerradas guardadas
+    # (expressão cron, tarefa, argumentos), em horário local
+    JOBS_SCHEDULE = [
+        ('5 0 1 * *', 'gerar_mensalidades', {}),
+        ('15 0 1 * *', 'fechar_saldos', {}),
+        ('30 3 * * *', 'limpar_tarefas', {}),
+    ]
     
     @staticmethod
     def init_app(app):
@@ -34,14 +106,32 @@ class Config:
 class DevelopmentConfig(Config):
     """Configurações para desenvolvimento"""
     DEBUG = True
+    # Mesmo arquivo (em instance/) usado antes de create_app ler esta configuração
     SQLALCHEMY_DATABASE_URI = os.environ.get('DEV_DATABASE_URL') or \
-        'sqlite:///desbravadores_dev.db'
+        'sqlite:///desbravadores.db'
 
 class ProductionConfig(Config):
     """Configurações para produção"""
     DEBUG = False
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'sqlite:///desbravadores.db'
+    SQLALCHEMY_ENGINE_OPTIONS = _opcoes_engine(pool_size=10, max_overflow=20, pool_timeout=10)
+    
+    # Tarefas pesadas (PDFs, importações, mensalidades) fora dos workers web:
+    # execute `flask worker` ao lado do gunicorn
+    JOBS_EXECUTOR = os.environ.get('JOBS_EXECUTOR') or 'worker'
+    
+    # SQLite com vários workers e threads: WAL (leitores não bloqueiam o
+    # escritor), fsync só nos checkpoints, páginas em cache e mapeadas em
+    # memória e tabelas temporárias em memória
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT') or 5000),
+        'synchronous': 'NORMAL',
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64 * 1024,  # em KiB: 64 MB
+        'temp_store': 'MEMORY',
+    }
     
     @classmethod
     def init_app(cls, app):
@@ -50,7 +140,7 @@ class ProductionConfig(Config):
         # Log de erros por email
         import logging
         from logging.handlers import SMTPHandler
-        if app.config['MAIL_SERVER']:
+        if app.config['MAIL_SERVER'] and app.config['ADMINS']:
             auth = None
             if app.config['MAIL_USERNAME'] or app.config['MAIL_PASSWORD']:
                 auth = (app.config['MAIL_USERNAME'], app.config['MAIL_PASSWORD'])
@@ -74,6 +164,8 @@ class TestingConfig(Config):
     SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DATABASE_URL') or \
         'sqlite:///desbravadores_test.db'
     WTF_CSRF_ENABLED = False
+    JOBS_EXECUTOR = 'imediato'
+    JOBS_SCHEDULE = []
 
 # Dicionário de configurações
 config = {
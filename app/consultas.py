@@ -0,0 +1,54 @@
+"""
+Consultas de agregação reutilizáveis pelas rotas e relatórios.
+
+As estatísticas são calculadas no banco com um único GROUP BY por status,
+sem carregar as linhas como objetos do ORM.
+"""
+
+from sqlalchemy import select, func
+from app import db
+from app.models import Mensalidade
+from app.resumos import Totais, VAZIO, STATUS_PADRAO
+
+
+def totais_mensalidades_por_status(*criterios):
+    """Quantidade e valor das mensalidades por status: {status: Totais}"""
+    status = func.coalesce(Mensalidade.status, STATUS_PADRAO)
+    linhas = db.session.execute(
+        select(
+            status,
+            func.count(Mensalidade.id),
+            func.coalesce(func.sum(Mensalidade.valor), 0.0)
+        )
+        .where(*criterios)
+        .group_by(status)
+    )
+    return {status: Totais(quantidade, valor) for status, quantidade, valor in linhas}
+
+
+def totais_mensalidades_mes(ano, mes):
+    """Totais por status das mensalidades de um mês/ano"""
+    return totais_mensalidades_por_status(
+        Mensalidade.ano_referencia == ano,
+        Mensalidade.mes_referencia == mes
+    )
+
+
+def estatisticas_mensalidades(totais):
+    """Monta o dicionário de estatísticas usado pelas telas de mensalidades"""
+    pagas = totais.get('pago', VAZIO)
+    pendentes = totais.get('pendente', VAZIO)
+    atrasadas = totais.get('atrasado', VAZIO)
+    quantidade_total = sum(t.quantidade for t in totais.values())
+
+    return {
+        'total_desbravadores': quantidade_total,
+        'pagas': pagas.quantidade,
+        'pendentes': pendentes.quantidade,
+        'atrasadas': atrasadas.quantidade,
+        'valor_total': sum(t.valor for t in totais.values()),
+        'valor_pago': pagas.valor,
+        'valor_pendente': pendentes.valor,
+        'valor_atrasado': atrasadas.valor,
+        'percentual_pago': (pagas.quantidade / quantidade_total * 100) if quantidade_total > 0 else 0
+    }
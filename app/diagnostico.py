@@ -0,0 +1,213 @@
+"""
+Verificações de desempenho das rotas.
+
+As rotas de leitura são percorridas com o cliente de testes do Flask e
+todas as consultas emitidas são capturadas. verificar_planos() executa
+EXPLAIN QUERY PLAN em cada SELECT capturado e aponta varreduras completas
+de tabelas que crescem com o uso do sistema; verificar_orcamento() compara
+o número de consultas de cada rota com o máximo definido em ROTAS. Nas
+duas, uma rota que responde com erro (HTTP 400 ou mais) é uma falha: suas
+consultas não são as de uma resposta normal.
+
+Os números só dizem algo com dados em volume: rode as verificações sobre
+um banco com flask gerar-dados, como fazem os testes em tests/.
+"""
+
+import re
+import threading
+from contextlib import contextmanager
+from sqlalchemy import event, select
+from app import db, cache, saldos
+from app.models import User, Desbravador
+
+# Rotas de leitura verificadas: (url, perfil de login, máximo de consultas SQL)
+#
+# O orçamento de consultas não depende da quantidade de linhas: uma rota
+# que passa a fazer uma consulta por item listado (N+1) estoura o limite.
+# Cada orçamento inclui a consulta de identidade do usuário, que só ocorre
+# quando a identidade não está no cache (app.identidades), e a consulta de
+# versões das rotas com ETag (app.condicional) ou com listas de referência
+# (app.referencias).
+ROTAS = [
+    ('/dashboard', 'admin', 5),
+    ('/profile', 'admin', 1),
+    ('/settings', 'admin', 1),
+    ('/desempenho', 'admin', 1),
+    ('/desbravadores/', 'admin', 2),
+    ('/desbravadores/?search=silva', 'admin', 2),
+    ('/desbravadores/cadastrar', 'admin', 1),
+    ('/desbravadores/{desbravador_id}', 'admin', 4),
+    ('/desbravadores/{desbravador_id}/editar', 'admin', 3),
+    ('/financeiro/', 'admin', 3),
+    ('/financeiro/mensalidades', 'admin', 3),
+    ('/financeiro/transacoes', 'admin', 2),
+    ('/financeiro/transacoes?tipo=receita', 'admin', 2),
+    ('/financeiro/transacoes/nova', 'admin', 1),
+    ('/financeiro/fluxo-caixa', 'admin', 4),
+    ('/financeiro/extratos/importar', 'admin', 1),
+    ('/relatorios/', 'admin', 1),
+    ('/relatorios/mensalidades', 'admin', 3),
+    ('/relatorios/fluxo-caixa', 'admin', 2),
+    ('/relatorios/patrimonio', 'admin', 5),
+    ('/relatorios/desbravadores', 'admin', 3),
+    ('/desbravador/dashboard', 'desbravador', 3),
+    ('/desbravador/calendario', 'desbravador', 2),
+    ('/desbravador/perfil', 'desbravador', 2),
+    ('/api/v1/desbravadores', 'admin', 2),
+    ('/api/v1/desbravadores?busca=silva', 'admin', 2),
+    ('/api/v1/desbravadores/{desbravador_id}', 'admin', 2),
+    ('/api/v1/mensalidades', 'admin', 2),
+    ('/api/v1/mensalidades?campos=id,nome,status', 'admin', 2),
+    ('/api/v1/transacoes', 'admin', 2),
+    ('/api/v1/transacoes?tipo=receita', 'admin', 2),
+    ('/api/v1/eventos', 'admin', 2),
+]
+
+# Tabelas limitadas por natureza (poucas linhas por mês ou por usuário do
+# sistema) e o catálogo do SQLite, em que uma varredura completa é aceitável
+TABELAS_PEQUENAS = {'sqlite_master', 'user', 'especialidade', 'unidade', 'resumo_mensalidade', 'saldo_mensal', 'saldo_categoria', 'alembic_version'}
+
+_VARREDURA = re.compile(r'^SCAN (\w+)$')
+
+
+@contextmanager
+def capturar_consultas(engine):
+    """Registra (sql, parâmetros) de cada comando executado no engine por esta thread
+
+    As consultas de outras threads (o executor local de app.tarefas, por
+    exemplo) não pertencem à requisição medida.
+    """
+    consultas = []
+    thread = threading.get_ident()
+
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == thread:
+            consultas.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', registrar)
+    try:
+        yield consultas
+    finally:
+        event.remove(engine, 'before_cursor_execute', registrar)
+
+
+def _usuarios():
+    """Usuários usados para autenticar o cliente de testes em cada perfil"""
+    return {
+        'admin': db.session.execute(select(User).limit(1)).scalar(),
+        'desbravador': db.session.execute(
+            select(Desbravador).where(Desbravador.pode_fazer_login == True).limit(1)
+        ).scalar()
+    }
+
+
+def identidades_de_teste():
+    """Identidade de sessão de cada perfil e o id de um desbravador para as rotas com {desbravador_id}"""
+    usuarios = _usuarios()
+    primeiro = db.session.execute(select(Desbravador.id).limit(1)).scalar()
+    identidades = {perfil: usuario.get_id() for perfil, usuario in usuarios.items() if usuario}
+    db.session.remove()
+    return identidades, primeiro
+
+
+def cliente_autenticado(app, identidade):
+    """Cliente de testes com a sessão de login de uma identidade ('u:1', 'd:3'...)"""
+    cliente = app.test_client()
+    with cliente.session_transaction() as sessao:
+        sessao['_user_id'] = identidade
+        sessao['_fresh'] = True
+    return cliente
+
+
+def percorrer_rotas(app, rotas=ROTAS):
+    """Executa cada rota autenticada e devolve (url, status, consultas)
+
+    Antes, os meses encerrados são fechados, como faz a tarefa agendada
+    fechar_saldos: as leituras de saldo contam com os fechamentos em dia.
+    """
+    saldos.garantir_fechamentos(*saldos.mes_aberto())
+    db.session.remove()
+    identidades, primeiro = identidades_de_teste()
+
+    # Em DEBUG o cliente de testes propagaria as exceções; aqui elas contam
+    # como HTTP 500, como em produção
+    propagar = app.config['PROPAGATE_EXCEPTIONS']
+    app.config['PROPAGATE_EXCEPTIONS'] = False
+    try:
+        return _percorrer(app, rotas, identidades, primeiro)
+    finally:
+        app.config['PROPAGATE_EXCEPTIONS'] = propagar
+
+
+def _percorrer(app, rotas, identidades, primeiro):
+    resultados = []
+    for url, perfil, _ in rotas:
+        if perfil not in identidades or ('{desbravador_id}' in url and primeiro is None):
+            resultados.append((url, None, []))
+            continue
+
+        cliente = cliente_autenticado(app, identidades[perfil])
+
+        # O cliente de testes reaproveitaria o contexto de aplicação atual (e
+        # com ele g e a sessão); cada rota roda em um contexto novo. O cache de
+        # dashboards e relatórios é esvaziado para que as consultas medidas
+        # sejam as de quando ele não vale
+        with app.app_context():
+            cache.backend().limpar()
+        with app.app_context(), capturar_consultas(db.engine) as consultas:
+            resposta = cliente.get(url.format(desbravador_id=primeiro))
+        resultados.append((url, resposta.status_code, consultas))
+    return resultados
+
+
+def plano(conexao, statement, parameters):
+    """Linhas de EXPLAIN QUERY PLAN de um comando"""
+    cursor = conexao.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters)
+    return [linha[-1] for linha in cursor]
+
+
+def varreduras(linhas_plano):
+    """Tabelas varridas por completo em um plano"""
+    encontradas = []
+    for detalhe in linhas_plano:
+        correspondencia = _VARREDURA.match(detalhe)
+        if correspondencia and correspondencia.group(1) not in TABELAS_PEQUENAS:
+            encontradas.append(correspondencia.group(1))
+    return encontradas
+
+
+def falhas(resultados):
+    """Rotas (url, status) que responderam com erro"""
+    return [(url, status) for url, status, _ in resultados if status is not None and status >= 400]
+
+
+def verificar_planos(app, rotas=ROTAS):
+    """Resultados, problemas (url, sql, plano) em que alguma consulta varre uma tabela e rotas com erro"""
+    problemas = []
+    resultados = percorrer_rotas(app, rotas)
+    with db.engine.connect() as conexao:
+        for url, status, consultas in resultados:
+            for statement, parameters in consultas:
+                if not statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+                    continue
+                linhas = plano(conexao, statement, parameters)
+                if varreduras(linhas):
+                    problemas.append((url, statement, linhas))
+    return resultados, problemas, falhas(resultados)
+
+
+def verificar_orcamento(app, rotas=ROTAS):
+    """Resultados, rotas (url, consultas, orçamento) que excedem o orçamento e rotas com erro
+
+    As rotas são executadas duas vezes e vale a segunda execução: a primeira
+    aquece o que é carregado uma vez por processo.
+    """
+    percorrer_rotas(app, rotas)
+    resultados = percorrer_rotas(app, rotas)
+    orcamentos = {url: orcamento for url, _, orcamento in rotas}
+
+    excedidas = []
+    for url, status, consultas in resultados:
+        if status is not None and len(consultas) > orcamentos[url]:
+            excedidas.append((url, consultas, orcamentos[url]))
+    return resultados, excedidas, falhas(resultados)
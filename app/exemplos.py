@@ -0,0 +1,168 @@
+"""
+Administrador padrão e dados de demonstração (flask create-admin / flask seed).
+
+Antes eram criados a cada execução do run.py; como cada senha passa pelo
+hash (propositalmente lento) de app.senhas, agora só são criados quando
+pedidos pela linha de comando.
+"""
+
+from datetime import datetime
+from app import db, senhas, referencias
+from app.models import User, Desbravador, Mensalidade, Transacao, Evento
+
+DESBRAVADORES = [
+    {
+        'nome': 'João Silva',
+        'idade': 12,
+        'data_nascimento': '2011-05-15',
+        'unidade': 'Companheiro',
+        'classe': 'Companheiro',
+        'telefone': '(11) 99999-1111',
+        'email': 'joao@email.com',
+        'endereco': 'Rua das Flores, 123',
+        'nome_responsavel': 'Maria Silva',
+        'telefone_responsavel': '(11) 99999-2222',
+        'especialidades': ['ADRA', 'Estudos da Natureza'],
+        'username': 'joao.silva',
+    },
+    {
+        'nome': 'Ana Santos',
+        'idade': 14,
+        'data_nascimento': '2009-08-22',
+        'unidade': 'Pesquisador',
+        'classe': 'Pesquisador',
+        'telefone': '(11) 99999-3333',
+        'email': 'ana@email.com',
+        'endereco': 'Av. Principal, 456',
+        'nome_responsavel': 'Carlos Santos',
+        'telefone_responsavel': '(11) 99999-4444',
+        'especialidades': ['Estudos da Natureza'],
+        'username': 'ana.santos',
+    },
+    {
+        'nome': 'Pedro Oliveira',
+        'idade': 16,
+        'data_nascimento': '2007-12-10',
+        'unidade': 'Pioneiro',
+        'classe': 'Pioneiro',
+        'telefone': '(11) 99999-5555',
+        'email': 'pedro@email.com',
+        'endereco': 'Rua do Sol, 789',
+        'nome_responsavel': 'Lucia Oliveira',
+        'telefone_responsavel': '(11) 99999-6666',
+    },
+]
+
+# Senha dos desbravadores de exemplo com login
+SENHA_DESBRAVADORES = '123456'
+
+
+def criar_admin(username, email, senha, nome_completo, cargo='Diretor'):
+    """Cria um usuário administrador; retorna None se o usuário ou o e-mail já existirem"""
+    existente = User.query.filter((User.username == username) | (User.email == email)).first()
+    if existente:
+        return None
+    admin = User(
+        username=username,
+        email=email,
+        password_hash=senhas.gerar(senha),
+        nome_completo=nome_completo,
+        cargo=cargo
+    )
+    db.session.add(admin)
+    db.session.commit()
+    return admin
+
+
+def criar_admin_padrao():
+    """Cria o usuário admin / admin123 se ainda não existir"""
+    return criar_admin('admin', 'admin@desbravadores.com', 'admin123', 'Administrador do Sistema')
+
+
+def criar_dados_exemplo():
+    """Cria desbravadores, mensalidades, transações e eventos de exemplo
+
+    Não faz nada (e retorna False) se já houver desbravadores cadastrados.
+    """
+    if db.session.query(Desbravador.id).first() is not None:
+        return False
+
+    agora = datetime.now()
+
+    for exemplo in DESBRAVADORES:
+        dados = dict(exemplo)
+        dados['data_nascimento'] = datetime.strptime(dados['data_nascimento'], '%Y-%m-%d').date()
+        dados['especialidades'] = referencias.por_nome(dados.get('especialidades', []))
+        if dados.get('username'):
+            dados['password_hash'] = senhas.gerar(SENHA_DESBRAVADORES)
+            dados['pode_fazer_login'] = True
+        db.session.add(Desbravador(**dados))
+
+    db.session.commit()
+
+    # Mensalidades do mês atual
+    for desbravador in Desbravador.query.all():
+        db.session.add(Mensalidade(
+            desbravador_id=desbravador.id,
+            mes_referencia=agora.month,
+            ano_referencia=agora.year,
+            valor=50.0,
+            status='pendente'
+        ))
+
+    transacoes = [
+        {
+            'tipo': 'receita',
+            'categoria': 'mensalidade',
+            'descricao': 'Mensalidade - João Silva',
+            'valor': 50.0,
+            'data_transacao': agora
+        },
+        {
+            'tipo': 'despesa',
+            'categoria': 'material',
+            'descricao': 'Compra de material para atividades',
+            'valor': 25.0,
+            'data_transacao': agora
+        },
+        {
+            'tipo': 'receita',
+            'categoria': 'evento',
+            'descricao': 'Arrecadação do acampamento',
+            'valor': 200.0,
+            'data_transacao': agora
+        }
+    ]
+    for dados in transacoes:
+        db.session.add(Transacao(**dados))
+
+    eventos = [
+        {
+            'nome': 'Reunião Semanal',
+            'descricao': 'Reunião regular do clube de desbravadores',
+            'data_inicio': agora.replace(day=1, hour=19, minute=0, second=0, microsecond=0),
+            'local': 'Sede do Clube',
+            'tipo': 'reunião'
+        },
+        {
+            'nome': 'Acampamento de Fim de Semana',
+            'descricao': 'Acampamento especial para todas as unidades',
+            'data_inicio': agora.replace(day=15, hour=8, minute=0, second=0, microsecond=0),
+            'data_fim': agora.replace(day=16, hour=17, minute=0, second=0, microsecond=0),
+            'local': 'Parque Municipal',
+            'tipo': 'acampamento',
+            'custo': 25.0
+        },
+        {
+            'nome': 'Especialidade de Culinária',
+            'descricao': 'Aula prática de culinária ao ar livre',
+            'data_inicio': agora.replace(day=20, hour=14, minute=0, second=0, microsecond=0),
+            'local': 'Área de Churrasqueira',
+            'tipo': 'especialidade'
+        }
+    ]
+    for dados in eventos:
+        db.session.add(Evento(**dados))
+
+    db.session.commit()
+    return True
@@ -0,0 +1,249 @@
+"""
+Exportação de relatórios em CSV e XLSX.
+
+As linhas são lidas do banco em lotes (yield_per) e escritas à medida que
+chegam, de modo que o consumo de memória não depende do tamanho do
+período exportado:
+
+- CSV: a resposta é um gerador; o primeiro lote vai para o navegador antes
+  de a consulta terminar.
+- XLSX: o openpyxl em modo write-only grava as linhas em arquivo temporário;
+  como o formato é um ZIP que só fica completo no fim, o arquivo é montado
+  em disco e então enviado em blocos.
+
+Cada relatório é uma função que recebe os parâmetros da requisição e
+devolve (nome do arquivo, colunas, linhas), com as linhas como gerador.
+"""
+
+import csv
+import importlib.util
+import io
+import tempfile
+from datetime import datetime, date
+from sqlalchemy import select
+from app import db
+from app.models import Desbravador, Mensalidade, Transacao
+from app.saldos import intervalo_mes, patrimonio, saldo_inicial
+
+# Linhas lidas do banco por lote
+LOTE = 1000
+
+# Tamanho dos blocos enviados ao navegador
+BLOCO = 64 * 1024
+
+# Inícios de texto que o Excel e o LibreOffice interpretam como fórmula (as
+# descrições podem vir de extratos bancários importados)
+INICIO_FORMULA = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _em_lotes(consulta):
+    return db.session.execute(consulta.execution_options(yield_per=LOTE))
+
+
+def _mes_ano(parametros):
+    hoje = datetime.now()
+    mes = parametros.get('mes', type=int)
+    ano = parametros.get('ano', type=int)
+    if mes is not None and not 1 <= mes <= 12:
+        mes = None
+    return ano, mes, hoje
+
+
+def mensalidades(parametros):
+    """Mensalidades de um mês, de um ano ou de todo o histórico"""
+    ano, mes, _ = _mes_ano(parametros)
+    criterios = []
+    if ano is not None:
+        criterios.append(Mensalidade.ano_referencia == ano)
+        if mes is not None:
+            criterios.append(Mensalidade.mes_referencia == mes)
+
+    nome = 'mensalidades'
+    if ano is not None:
+        nome += f'_{ano}' + (f'_{mes:02d}' if mes is not None else '')
+
+    def linhas():
+        consulta = (
+            select(
+                Mensalidade.ano_referencia, Mensalidade.mes_referencia, Desbravador.nome,
+                Desbravador.unidade, Mensalidade.valor, Mensalidade.status,
+                Mensalidade.data_pagamento, Mensalidade.observacoes
+            )
+            .join(Desbravador, Mensalidade.desbravador_id == Desbravador.id)
+            .where(*criterios)
+            # (ano, mês) vem do índice: só as linhas de cada mês são ordenadas
+            # por nome, e a primeira linha sai sem ordenar o período inteiro
+            .order_by(Mensalidade.ano_referencia, Mensalidade.mes_referencia,
+                      Desbravador.nome, Mensalidade.id)
+        )
+        for linha in _em_lotes(consulta):
+            yield tuple(linha)
+
+    colunas = ['Ano', 'Mês', 'Desbravador', 'Unidade', 'Valor', 'Status', 'Data de Pagamento', 'Observações']
+    return nome, colunas, linhas()
+
+
+def fluxo_caixa(parametros):
+    """Transações de um mês com o saldo acumulado a partir do saldo inicial"""
+    ano, mes, hoje = _mes_ano(parametros)
+    ano = ano or hoje.year
+    mes = mes or hoje.month
+    inicio, fim = intervalo_mes(ano, mes)
+
+    def linhas():
+        saldo = saldo_inicial(ano, mes)
+        yield (inicio.date(), 'Saldo inicial', '', '', None, saldo)
+        consulta = (
+            select(Transacao.data_transacao, Transacao.descricao, Transacao.tipo,
+                   Transacao.categoria, Transacao.valor)
+            .where(Transacao.data_transacao >= inicio, Transacao.data_transacao < fim)
+            .order_by(Transacao.data_transacao, Transacao.id)
+        )
+        for data, descricao, tipo, categoria, valor in _em_lotes(consulta):
+            saldo += valor if tipo == 'receita' else -valor
+            yield (data, descricao, tipo, categoria, valor, saldo)
+
+    colunas = ['Data', 'Descrição', 'Tipo', 'Categoria', 'Valor', 'Saldo']
+    return f'fluxo_caixa_{ano}_{mes:02d}', colunas, linhas()
+
+
+def patrimonio_categorias(parametros):
+    """Totais acumulados por tipo e categoria"""
+    def linhas():
+        dados = patrimonio()
+        for categoria, total in sorted(dados['receitas_por_categoria'].items()):
+            yield ('receita', categoria, total)
+        for categoria, total in sorted(dados['despesas_por_categoria'].items()):
+            yield ('despesa', categoria, total)
+        yield ('', 'Patrimônio atual', dados['patrimonio_atual'])
+
+    return 'patrimonio', ['Tipo', 'Categoria', 'Total'], linhas()
+
+
+def desbravadores(parametros):
+    """Cadastro dos desbravadores ativos"""
+    def linhas():
+        consulta = (
+            select(
+                Desbravador.nome, Desbravador.data_nascimento, Desbravador.unidade,
+                Desbravador.classe, Desbravador.telefone, Desbravador.email,
+                Desbravador.nome_responsavel, Desbravador.telefone_responsavel,
+                Desbravador.data_cadastro
+            )
+            .where(Desbravador.ativo == True)
+            .order_by(Desbravador.nome)
+        )
+        for linha in _em_lotes(consulta):
+            yield tuple(linha)
+
+    colunas = ['Nome', 'Data de Nascimento', 'Unidade', 'Classe', 'Telefone', 'E-mail',
+               'Responsável', 'Telefone do Responsável', 'Data de Cadastro']
+    return 'desbravadores', colunas, linhas()
+
+
+def transacoes(parametros):
+    """Livro-caixa completo, em ordem cronológica, com o saldo acumulado"""
+    def linhas():
+        saldo = 0.0
+        consulta = (
+            select(Transacao.data_transacao, Transacao.descricao, Transacao.tipo,
+                   Transacao.categoria, Transacao.valor, Transacao.observacoes)
+            .order_by(Transacao.data_transacao, Transacao.id)
+        )
+        for data, descricao, tipo, categoria, valor, observacoes in _em_lotes(consulta):
+            saldo += valor if tipo == 'receita' else -valor
+            yield (data, descricao, tipo, categoria, valor, saldo, observacoes)
+
+    colunas = ['Data', 'Descrição', 'Tipo', 'Categoria', 'Valor', 'Saldo', 'Observações']
+    return 'transacoes', colunas, linhas()
+
+
+RELATORIOS = {
+    'mensalidades': mensalidades,
+    'fluxo-caixa': fluxo_caixa,
+    'patrimonio': patrimonio_categorias,
+    'desbravadores': desbravadores,
+    'transacoes': transacoes,
+}
+
+
+def _texto_csv(valor):
+    """Formato brasileiro: datas dd/mm/aaaa e vírgula decimal; texto nunca vira fórmula"""
+    if valor is None:
+        return ''
+    if isinstance(valor, datetime):
+        if valor.time() == datetime.min.time():
+            return valor.strftime('%d/%m/%Y')
+        return valor.strftime('%d/%m/%Y %H:%M')
+    if isinstance(valor, date):
+        return valor.strftime('%d/%m/%Y')
+    if isinstance(valor, float):
+        return f'{valor:.2f}'.replace('.', ',')
+    if isinstance(valor, str) and valor.startswith(INICIO_FORMULA):
+        return "'" + valor
+    return valor
+
+
+def gerar_csv(titulo, colunas, linhas):
+    """Gerador de blocos CSV (separador ';', com BOM para o Excel)"""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, delimiter=';')
+    buffer.write('\ufeff')
+    escritor.writerow(colunas)
+    yield buffer.getvalue().encode('utf-8')
+    buffer.seek(0)
+    buffer.truncate()
+
+    for linha in linhas:
+        escritor.writerow([_texto_csv(valor) for valor in linha])
+        if buffer.tell() >= BLOCO:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue().encode('utf-8')
+
+
+def _celula_xlsx(aba, valor):
+    """Valor da célula; texto que começa como fórmula é gravado como texto"""
+    if not (isinstance(valor, str) and valor.startswith(INICIO_FORMULA)):
+        return valor
+    from openpyxl.cell import WriteOnlyCell
+    celula = WriteOnlyCell(aba, value=valor)
+    celula.data_type = 's'
+    return celula
+
+
+def gerar_xlsx(titulo, colunas, linhas):
+    """Gerador de blocos de uma planilha montada em modo write-only"""
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+
+    planilha = Workbook(write_only=True)
+    aba = planilha.create_sheet(titulo[:31])
+
+    cabecalho = []
+    for coluna in colunas:
+        celula = WriteOnlyCell(aba, value=coluna)
+        celula.font = Font(bold=True)
+        cabecalho.append(celula)
+    aba.append(cabecalho)
+
+    for linha in linhas:
+        aba.append([_celula_xlsx(aba, valor) for valor in linha])
+
+    with tempfile.TemporaryFile() as arquivo:
+        planilha.save(arquivo)
+        arquivo.seek(0)
+        while True:
+            bloco = arquivo.read(BLOCO)
+            if not bloco:
+                break
+            yield bloco
+
+
+# openpyxl é opcional (sem ele, apenas CSV) e só é importado ao gerar a planilha
+FORMATOS = {'csv': ('text/csv; charset=utf-8', gerar_csv)}
+if importlib.util.find_spec('openpyxl') is not None:
+    FORMATOS['xlsx'] = ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', gerar_xlsx)
@@ -0,0 +1,446 @@
+"""
+Importação de extratos bancários (OFX ou CSV) e conciliação de mensalidades.
+
+O extrato é lido em fluxo: o OFX (SGML 1.x ou XML 2.x) é percorrido em
+blocos, um lançamento <STMTTRN> por vez, e o CSV linha a linha. Cada
+lançamento recebe uma impressão digital (SHA-256 do FITID do banco ou, sem
+ele, de data, valor, descrição e ocorrência no arquivo) gravada em
+transacao.hash_extrato, que tem índice único: os lançamentos são inseridos
+em lotes com INSERT ... ON CONFLICT DO NOTHING, e reimportar o mesmo
+extrato não grava nada de novo.
+
+Os créditos são conciliados com as mensalidades não pagas pelo valor, pela
+data (de ANTECEDENCIA_DIAS antes do mês de referência até ATRASO_DIAS
+depois dele) e pelo nome: o primeiro e o último nome do desbravador (ou do
+responsável) devem aparecer na descrição do lançamento. Havendo mais de um
+desbravador possível, o lançamento não é conciliado. As mensalidades
+conciliadas são marcadas como pagas no mesmo lote, e o próprio lançamento
+vira a receita da mensalidade (categoria "mensalidade"); se ela já tiver
+sido paga por outro caminho, o lançamento fica em "outros".
+"""
+
+import codecs
+import hashlib
+import re
+import unicodedata
+from collections import namedtuple
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, func, or_, and_, bindparam, case
+from app import db
+from app.models import Desbravador, Mensalidade, Transacao
+from app import resumos, saldos
+from app.importacao import linhas_csv, normalizar, converter_data
+from app.banco import insert_dialeto
+
+# Lançamentos gravados por transação
+LOTE = 500
+
+# Erros e conciliações guardados por importação (os demais são apenas contados)
+LIMITE_DETALHES = 500
+
+# Janela de datas aceita para o pagamento de uma mensalidade
+ANTECEDENCIA_DIAS = 15
+ATRASO_DIAS = 60
+
+FORMATOS = ('ofx', 'csv')
+
+# Nome normalizado da coluna do CSV -> campo do lançamento
+COLUNAS = {
+    'data': 'data',
+    'datalancamento': 'data',
+    'datamovimento': 'data',
+    'descricao': 'descricao',
+    'historico': 'descricao',
+    'lancamento': 'descricao',
+    'memo': 'descricao',
+    'valor': 'valor',
+    'valorrs': 'valor',
+    'credito': 'credito',
+    'debito': 'debito',
+    'documento': 'documento',
+    'numerodocumento': 'documento',
+    'nodocumento': 'documento',
+    'identificador': 'documento',
+    'fitid': 'documento',
+}
+
+# Palavras ignoradas ao comparar nomes
+CONECTIVOS = {'de', 'da', 'do', 'das', 'dos', 'e'}
+
+Lancamento = namedtuple('Lancamento', ['numero', 'data', 'centavos', 'descricao', 'hash'])
+
+Pendente = namedtuple('Pendente', ['id', 'desbravador_id', 'ano', 'mes', 'centavos', 'nome', 'inicio', 'fim'])
+
+_TAG = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<]*)')
+
+
+# Leitura do OFX
+
+def _codificacao(caminho):
+    """Codificação declarada no cabeçalho do OFX (CHARSET:1252 nos bancos brasileiros)"""
+    with open(caminho, 'rb') as bruto:
+        cabecalho = bruto.read(1024).upper()
+    if b'CHARSET:1252' in cabecalho or b'WINDOWS-1252' in cabecalho:
+        return 'cp1252'
+    if b'8859' in cabecalho:
+        return 'latin-1'
+    return 'utf-8-sig'
+
+
+def _elementos(texto, tamanho=65536):
+    """(fecha, nome, valor) de cada tag do OFX, lendo o arquivo em blocos"""
+    resto = ''
+    for bloco in iter(lambda: texto.read(tamanho), ''):
+        resto += bloco
+        corte = resto.rfind('<')
+        if corte <= 0:
+            continue
+        for tag in _TAG.finditer(resto, 0, corte):
+            yield tag.group(1) == '/', tag.group(2).upper(), tag.group(3).strip()
+        resto = resto[corte:]
+    for tag in _TAG.finditer(resto):
+        yield tag.group(1) == '/', tag.group(2).upper(), tag.group(3).strip()
+
+
+def _data_ofx(valor):
+    """AAAAMMDD[HHMMSS[.XXX][[-3:BRT]]] -> date"""
+    try:
+        return datetime.strptime(valor[:8], '%Y%m%d').date()
+    except ValueError:
+        return None
+
+
+def _registros_ofx(caminho):
+    """(número, {campo: valor}) de cada <STMTTRN> do OFX"""
+    conta = ''
+    atual = None
+    numero = 0
+    with codecs.open(caminho, 'r', encoding=_codificacao(caminho), errors='replace') as texto:
+        for fecha, nome, valor in _elementos(texto):
+            if nome == 'ACCTID' and not fecha:
+                conta = valor
+            elif nome == 'STMTTRN':
+                if fecha and atual is not None:
+                    numero += 1
+                    descricao = ' - '.join(dict.fromkeys(
+                        parte for parte in (atual.get('NAME'), atual.get('MEMO')) if parte))
+                    yield numero, {
+                        'data': _data_ofx(atual.get('DTPOSTED', '')),
+                        'valor': atual.get('TRNAMT'),
+                        'descricao': descricao,
+                        'documento': f'{conta}:{atual["FITID"]}' if atual.get('FITID') else '',
+                        'fitid': bool(atual.get('FITID')),
+                    }
+                atual = None if fecha else {}
+            elif atual is not None and not fecha and valor:
+                atual[nome] = valor
+
+
+# Leitura do CSV
+
+def _registros_csv(caminho):
+    """(número da linha, {campo: valor}) de cada linha de dados do CSV"""
+    linhas = linhas_csv(caminho)
+    cabecalho = next(linhas, None)
+    if cabecalho is None:
+        raise ValueError('Arquivo vazio.')
+
+    campos = [COLUNAS.get(normalizar(coluna)) for coluna in cabecalho]
+    if 'data' not in campos or 'descricao' not in campos:
+        raise ValueError('O extrato precisa das colunas Data e Descrição (ou Histórico).')
+    if 'valor' not in campos and 'credito' not in campos:
+        raise ValueError('O extrato precisa da coluna Valor (ou Crédito e Débito).')
+
+    for numero, linha in enumerate(linhas, start=2):
+        if not any(valor.strip() for valor in linha):
+            continue
+        registro = {campo: valor.strip() for campo, valor in zip(campos, linha) if campo}
+        if not registro.get('valor'):
+            credito = _valor(registro.get('credito'))
+            debito = _valor(registro.get('debito'))
+            if credito is not None or debito is not None:
+                registro['valor'] = (credito or 0) - abs(debito or 0)
+        registro['data'] = converter_data(registro.get('data'))
+        registro['fitid'] = False
+        yield numero, registro
+
+
+# Normalização
+
+def _valor(texto):
+    """Valor em reais a partir de "1.234,56", "-50,00", "R$ 50.00" ou número"""
+    if texto is None or isinstance(texto, (int, float)):
+        return texto
+    texto = texto.replace('R$', '').replace(' ', '').strip()
+    if not texto:
+        return None
+    negativo = texto.endswith(('-', 'D')) or (texto.startswith('(') and texto.endswith(')'))
+    texto = texto.strip('()-+DC') if negativo else texto.rstrip('C')
+    if ',' in texto:
+        texto = texto.replace('.', '').replace(',', '.')
+    try:
+        valor = float(texto)
+    except ValueError:
+        return None
+    return -valor if negativo else valor
+
+
+def _palavras(texto):
+    """Palavras significativas de um nome ou descrição, sem acentos e em minúsculas"""
+    texto = unicodedata.normalize('NFKD', texto or '').encode('ascii', 'ignore').decode().lower()
+    return [palavra for palavra in re.findall(r'[a-z0-9]+', texto) if palavra not in CONECTIVOS]
+
+
+def _chave_nome(nome):
+    """(primeiro nome, {primeiro, último nome} exigidos na descrição, todas as palavras do nome)"""
+    partes = _palavras(nome)
+    if len(partes) < 2:
+        return None
+    return partes[0], frozenset((partes[0], partes[-1])), frozenset(partes)
+
+
+def _impressao(registro, data, centavos, ocorrencias):
+    """SHA-256 que identifica o lançamento entre importações"""
+    if registro['fitid']:
+        chave = f'ofx|{registro["documento"]}'
+    else:
+        base = (data.isoformat(), centavos, normalizar(registro.get('descricao')), registro.get('documento', ''))
+        ocorrencias[base] = ocorrencias.get(base, 0) + 1
+        chave = '|'.join(map(str, base + (ocorrencias[base],)))
+    return hashlib.sha256(chave.encode()).hexdigest()
+
+
+def _lancamentos(caminho, formato, erro):
+    """Lançamentos válidos do extrato; os inválidos são informados a erro()"""
+    registros = _registros_ofx(caminho) if formato == 'ofx' else _registros_csv(caminho)
+    ocorrencias = {}
+    for numero, registro in registros:
+        data = registro.get('data')
+        valor = _valor(registro.get('valor'))
+        if data is None:
+            erro(numero, 'Data inválida')
+        elif valor is None:
+            erro(numero, f'Valor inválido: {registro.get("valor")!r}')
+        elif round(valor * 100) == 0:
+            erro(numero, 'Lançamento com valor zero')
+        else:
+            centavos = round(valor * 100)
+            descricao = registro.get('descricao') or 'Lançamento do extrato'
+            yield Lancamento(numero, data, centavos, descricao, _impressao(registro, data, centavos, ocorrencias))
+
+
+# Conciliação
+
+class Conciliador:
+    """Mensalidades indexadas pelo primeiro nome do desbravador e do responsável
+
+    As já pagas também são carregadas (em usadas): um crédito com o nome de
+    quem não deve nada não é atribuído a outro desbravador de nome parecido.
+    """
+
+    def __init__(self):
+        self.meses = set()
+        self.indice = {}
+        self.usadas = set()
+
+    def carregar(self, inicio, fim):
+        """Carrega as mensalidades dos meses cuja janela de pagamento cobre [inicio, fim]"""
+        periodo = inicio - timedelta(days=ATRASO_DIAS)
+        ultimo = fim + timedelta(days=ANTECEDENCIA_DIAS)
+        meses = []
+        ano, mes = periodo.year, periodo.month
+        while (ano, mes) <= (ultimo.year, ultimo.month):
+            if (ano, mes) not in self.meses:
+                meses.append((ano, mes))
+            ano, mes = (ano + 1, 1) if mes == 12 else (ano, mes + 1)
+        if not meses:
+            return
+        self.meses.update(meses)
+
+        linhas = db.session.execute(
+            select(Mensalidade.id, Mensalidade.desbravador_id, Mensalidade.ano_referencia,
+                   Mensalidade.mes_referencia, Mensalidade.valor, Mensalidade.status,
+                   Desbravador.nome, Desbravador.nome_responsavel)
+            .join(Desbravador, Desbravador.id == Mensalidade.desbravador_id)
+            .where(or_(*[and_(Mensalidade.ano_referencia == ano, Mensalidade.mes_referencia == mes)
+                         for ano, mes in meses]))
+        )
+        for linha in linhas:
+            if linha.status == 'pago':
+                self.usadas.add(linha.id)
+            inicio_mes, fim_mes = saldos.intervalo_mes(linha.ano_referencia, linha.mes_referencia)
+            pendente = Pendente(
+                linha.id, linha.desbravador_id, linha.ano_referencia, linha.mes_referencia,
+                round(linha.valor * 100), linha.nome,
+                inicio_mes.date() - timedelta(days=ANTECEDENCIA_DIAS),
+                fim_mes.date() + timedelta(days=ATRASO_DIAS)
+            )
+            for prioridade, nome in enumerate((linha.nome, linha.nome_responsavel)):
+                chave = _chave_nome(nome)
+                if chave:
+                    primeiro, exigidas, todas = chave
+                    self.indice.setdefault(primeiro, []).append((pendente, exigidas, todas, prioridade))
+
+    def encontrar(self, lancamento):
+        """Mensalidade em aberto paga pelo lançamento (None se nenhuma ou se ambígua)"""
+        descricao = set(_palavras(lancamento.descricao))
+        candidatas = {}
+        for palavra in descricao:
+            for pendente, exigidas, todas, prioridade in self.indice.get(palavra, ()):
+                if (pendente.centavos != lancamento.centavos
+                        or not pendente.inicio <= lancamento.data < pendente.fim
+                        or not exigidas <= descricao):
+                    continue
+                # O nome do próprio desbravador prevalece sobre o do responsável, e
+                # o nome mais completo sobre o mais curto ("Ana Lima" x "Ana Paula Lima")
+                ordem = (prioridade, -len(todas & descricao))
+                candidatas[pendente] = min(ordem, candidatas.get(pendente, ordem))
+        if not candidatas:
+            return None
+
+        melhor = min(candidatas.values())
+        candidatas = [pendente for pendente, ordem in candidatas.items() if ordem == melhor]
+        if len({pendente.desbravador_id for pendente in candidatas}) > 1:
+            return None
+        abertas = [pendente for pendente in candidatas if pendente.id not in self.usadas]
+        if not abertas:
+            return None
+        escolhida = min(abertas, key=lambda pendente: (pendente.ano, pendente.mes))
+        self.usadas.add(escolhida.id)
+        return escolhida
+
+
+# Gravação
+
+def _ja_importados(lote):
+    return set(db.session.execute(
+        select(Transacao.hash_extrato).where(Transacao.hash_extrato.in_([l.hash for l in lote]))
+    ).scalars())
+
+
+def _transacao(lancamento, mensalidade):
+    agora = datetime.utcnow()
+    dados = {
+        'tipo': 'receita' if lancamento.centavos > 0 else 'despesa',
+        'categoria': 'outros',
+        'descricao': lancamento.descricao[:200],
+        'valor': abs(lancamento.centavos) / 100,
+        'data_transacao': datetime.combine(lancamento.data, datetime.min.time()),
+        'observacoes': 'Importado de extrato bancário',
+        'hash_extrato': lancamento.hash,
+        'created_at': agora,
+    }
+    if mensalidade is not None:
+        dados['categoria'] = 'mensalidade'
+        dados['descricao'] = f'Mensalidade - {mensalidade.nome} - {mensalidade.mes}/{mensalidade.ano}'
+        dados['observacoes'] = f'Importado de extrato bancário: {lancamento.descricao}'
+    return dados
+
+
+def _gravar(novos):
+    """Insere um lote de lançamentos e paga as mensalidades conciliadas
+
+    Devolve os hashes gravados e os dos lançamentos conciliados. Um
+    lançamento só vira receita da mensalidade se o UPDATE ... RETURNING a
+    pagou agora; se ela foi paga depois de carregada, ele fica em "outros".
+    """
+    comando = insert_dialeto(Transacao.__table__).on_conflict_do_nothing(
+        index_elements=['hash_extrato']
+    ).returning(Transacao.__table__.c.hash_extrato)
+    gravados = set(db.session.execute(comando, [_transacao(l, None) for l, _ in novos]).scalars())
+
+    conciliados = {m.id: (l, m) for l, m in novos if m is not None and l.hash in gravados}
+    pagas = set()
+    if conciliados:
+        tabela = Mensalidade.__table__
+        datas = {chave: datetime.combine(l.data, datetime.min.time()) for chave, (l, _) in conciliados.items()}
+        pagas = set(db.session.execute(
+            update(tabela)
+            .where(tabela.c.id.in_(conciliados),
+                   func.coalesce(tabela.c.status, 'pendente') != 'pago')
+            .values(status='pago', data_pagamento=case(datas, value=tabela.c.id))
+            .returning(tabela.c.id)
+        ).scalars())
+
+    if pagas:
+        receitas = []
+        for chave in pagas:
+            lancamento, mensalidade = conciliados[chave]
+            dados = _transacao(lancamento, mensalidade)
+            receitas.append({'b_hash': lancamento.hash, 'b_categoria': dados['categoria'],
+                             'b_descricao': dados['descricao'], 'b_observacoes': dados['observacoes']})
+        tabela = Transacao.__table__
+        db.session.execute(
+            update(tabela)
+            .where(tabela.c.hash_extrato == bindparam('b_hash'))
+            .values(categoria=bindparam('b_categoria'), descricao=bindparam('b_descricao'),
+                    observacoes=bindparam('b_observacoes')),
+            receitas
+        )
+        # O UPDATE em lote não passa pelos eventos do ORM
+        for ano, mes in {(conciliados[chave][1].ano, conciliados[chave][1].mes) for chave in pagas}:
+            resumos.reconstruir(ano, mes)
+
+    # O INSERT em lote também não: os fechamentos dos meses afetados são refeitos
+    saldos.invalidar_datas([l.data for l, _ in novos if l.hash in gravados])
+    db.session.commit()
+    return gravados, {conciliados[chave][0].hash for chave in pagas}
+
+
+def processar(caminho, formato, simular=False):
+    """Importa (ou, na simulação, apenas analisa) um extrato; devolve o resumo"""
+    if formato not in FORMATOS:
+        raise ValueError('Use um extrato .ofx ou .csv.')
+
+    resumo = {'simulacao': simular, 'lancamentos': 0, 'importados': 0, 'repetidos': 0,
+              'conciliados': 0, 'erros': 0, 'detalhes': [], 'conciliacoes': []}
+    conciliador = Conciliador()
+
+    def erro(numero, motivo):
+        resumo['erros'] += 1
+        if len(resumo['detalhes']) < LIMITE_DETALHES:
+            resumo['detalhes'].append({'linha': numero, 'motivo': motivo})
+
+    def concluir_lote(lote):
+        existentes = _ja_importados(lote)
+        resumo['repetidos'] += sum(1 for l in lote if l.hash in existentes)
+        lote = [l for l in lote if l.hash not in existentes]
+        if not lote:
+            return
+
+        receitas = [l for l in lote if l.centavos > 0]
+        if receitas:
+            conciliador.carregar(min(l.data for l in receitas), max(l.data for l in receitas))
+        novos = [(l, conciliador.encontrar(l) if l.centavos > 0 else None) for l in lote]
+
+        if simular:
+            gravados = {l.hash for l in lote}
+            conciliados = {l.hash for l, m in novos if m is not None}
+        else:
+            gravados, conciliados = _gravar(novos)
+        resumo['repetidos'] += len(lote) - len(gravados)
+        resumo['importados'] += len(gravados)
+        for lancamento, mensalidade in novos:
+            if lancamento.hash not in conciliados:
+                continue
+            resumo['conciliados'] += 1
+            if len(resumo['conciliacoes']) < LIMITE_DETALHES:
+                resumo['conciliacoes'].append({
+                    'linha': lancamento.numero,
+                    'data': lancamento.data,
+                    'valor': lancamento.centavos / 100,
+                    'descricao': lancamento.descricao,
+                    'desbravador': mensalidade.nome,
+                    'referencia': f'{mensalidade.mes:02d}/{mensalidade.ano}',
+                })
+
+    lote = []
+    for lancamento in _lancamentos(caminho, formato, erro):
+        resumo['lancamentos'] += 1
+        lote.append(lancamento)
+        if len(lote) >= LOTE:
+            concluir_lote(lote)
+            lote = []
+    if lote:
+        concluir_lote(lote)
+    return resumo
@@ -0,0 +1,99 @@
+"""
+Carregamento da identidade do usuário logado (user_loader do Flask-Login).
+
+O identificador guardado na sessão indica o tipo de conta: 'u:<id>' para
+administradores (User) e 'd:<id>' para desbravadores, de modo que apenas
+uma tabela é consultada e ids iguais nas duas tabelas não se confundem.
+Sessões antigas, com o id numérico puro, continuam aceitas.
+
+As colunas de cada identidade carregada ficam em um cache LRU com validade
+(IDENTITY_CACHE_TTL segundos); enquanto valem, a identidade é reanexada à
+sessão do SQLAlchemy sem consulta. O cache da tabela é descartado em todo
+commit que altera User ou Desbravador (perfil, senha, permissão de login);
+em outros processos a alteração vale no máximo após o TTL.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
+from app import db
+from app.models import User, Desbravador
+from app.versoes import ao_alterar
+
+TIPOS = {modelo.PREFIXO_SESSAO: modelo for modelo in (User, Desbravador)}
+
+_lock = threading.Lock()
+_cache = OrderedDict()
+
+
+def _pode_entrar(conta):
+    if isinstance(conta, Desbravador):
+        return bool(conta.ativo and conta.pode_fazer_login)
+    return True
+
+
+def _do_cache(chave):
+    with _lock:
+        guardado = _cache.get(chave)
+        if guardado is None:
+            return None
+        expira, modelo, colunas = guardado
+        if expira < time.monotonic():
+            del _cache[chave]
+            return None
+        _cache.move_to_end(chave)
+
+    conta = modelo(**colunas)
+    make_transient_to_detached(conta)
+    return db.session.merge(conta, load=False)
+
+
+def _guardar(chave, conta):
+    mapeamento = inspect(type(conta))
+    colunas = {atributo.key: getattr(conta, atributo.key) for atributo in mapeamento.column_attrs}
+    expira = time.monotonic() + current_app.config['IDENTITY_CACHE_TTL']
+    with _lock:
+        _cache[chave] = (expira, type(conta), colunas)
+        _cache.move_to_end(chave)
+        while len(_cache) > current_app.config['IDENTITY_CACHE_SIZE']:
+            _cache.popitem(last=False)
+
+
+def carregar(user_id):
+    """Conta correspondente ao identificador da sessão, ou None"""
+    prefixo, _, numero = user_id.rpartition(':')
+    if not numero.isdigit():
+        return None
+
+    if not prefixo:
+        # Sessão anterior aos identificadores com tipo
+        conta = db.session.get(User, int(numero)) or db.session.get(Desbravador, int(numero))
+        return conta if conta is not None and _pode_entrar(conta) else None
+
+    modelo = TIPOS.get(prefixo)
+    if modelo is None:
+        return None
+
+    chave = f'{prefixo}:{numero}'
+    conta = _do_cache(chave)
+    if conta is None:
+        conta = db.session.get(modelo, int(numero))
+        if conta is None or not _pode_entrar(conta):
+            return None
+        _guardar(chave, conta)
+    return conta
+
+
+@ao_alterar
+def descartar(tabelas):
+    """Descarta as identidades em cache das tabelas alteradas"""
+    prefixos = {prefixo for prefixo, modelo in TIPOS.items() if modelo.__tablename__ in tabelas}
+    if not prefixos:
+        return
+    with _lock:
+        for chave in list(_cache):
+            if chave.split(':', 1)[0] in prefixos:
+                del _cache[chave]
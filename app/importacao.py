@@ -0,0 +1,344 @@
+"""
+Importação de desbravadores em lote a partir de CSV ou XLSX.
+
+O arquivo enviado é gravado em IMPORTS_FOLDER e processado em segundo
+plano, como uma tarefa da fila (app.tarefas): as linhas são lidas uma a
+uma (csv.reader ou openpyxl em modo read-only), validadas em lotes de LOTE
+linhas e inseridas com um único INSERT executemany por lote, em uma
+transação por lote. Da importação só fica em memória o lote atual e as
+chaves (nome, nascimento) já vistas, usadas para apontar linhas repetidas
+no arquivo.
+
+Cada linha inválida (campo obrigatório ausente, data, unidade ou classe
+inválida, especialidade desconhecida, desbravador já cadastrado) é
+registrada com o número da linha e o motivo e não impede a importação das
+demais. No modo simulação nada é gravado: o arquivo inteiro é apenas
+validado.
+
+O cabeçalho aceita os nomes das colunas da exportação de desbravadores
+(app.exportacao), de modo que uma planilha exportada pode ser reimportada.
+"""
+
+import csv
+import importlib.util
+import io
+import json
+import os
+import unicodedata
+import uuid
+from datetime import datetime, date
+from flask import current_app
+from sqlalchemy import select, insert, tuple_
+from app import db
+from app.models import Desbravador, Especialidade, desbravador_especialidade
+from app import referencias, tarefas
+
+# Linhas validadas e inseridas por transação
+LOTE = 500
+
+# Erros guardados por importação (os demais são apenas contados)
+LIMITE_ERROS = 500
+
+AGUARDANDO = tarefas.AGUARDANDO
+PROCESSANDO = tarefas.PROCESSANDO
+CONCLUIDA = tarefas.CONCLUIDA
+FALHOU = tarefas.FALHOU
+
+# Nome normalizado da coluna no arquivo -> campo de Desbravador
+COLUNAS = {
+    'nome': 'nome',
+    'datadenascimento': 'data_nascimento',
+    'datanascimento': 'data_nascimento',
+    'nascimento': 'data_nascimento',
+    'unidade': 'unidade',
+    'classe': 'classe',
+    'telefone': 'telefone',
+    'email': 'email',
+    'endereco': 'endereco',
+    'responsavel': 'nome_responsavel',
+    'nomeresponsavel': 'nome_responsavel',
+    'nomedoresponsavel': 'nome_responsavel',
+    'telefonedoresponsavel': 'telefone_responsavel',
+    'telefoneresponsavel': 'telefone_responsavel',
+    'especialidades': 'especialidades',
+}
+
+OBRIGATORIOS = ('nome', 'data_nascimento', 'unidade', 'classe')
+
+FORMATOS_DATA = ('%Y-%m-%d', '%d/%m/%Y', '%d/%m/%y', '%d-%m-%Y')
+
+
+def disponivel_xlsx():
+    # openpyxl é opcional (sem ele, apenas CSV) e só é importado ao ler a planilha
+    return importlib.util.find_spec('openpyxl') is not None
+
+
+def _pasta():
+    pasta = current_app.config['IMPORTS_FOLDER']
+    if not os.path.isabs(pasta):
+        pasta = os.path.join(os.path.dirname(current_app.root_path), pasta)
+    return pasta
+
+
+def normalizar(texto):
+    """Texto sem acentos, espaços e pontuação, em minúsculas (nomes de colunas)"""
+    texto = unicodedata.normalize('NFKD', str(texto or '')).encode('ascii', 'ignore').decode()
+    return ''.join(letra for letra in texto.lower() if letra.isalnum())
+
+
+# Leitura
+
+class _PontoEVirgula(csv.excel):
+    """Formato da exportação (app.exportacao), usado se o separador não for detectado"""
+    delimiter = ';'
+
+
+def linhas_csv(caminho, progresso=None):
+    """Linhas de um CSV em UTF-8, com o separador detectado pela amostra inicial"""
+    with open(caminho, 'rb') as bruto:
+        tamanho = os.fstat(bruto.fileno()).st_size or 1
+        texto = io.TextIOWrapper(bruto, encoding='utf-8-sig', newline='')
+        amostra = texto.read(4096)
+        texto.seek(0)
+        try:
+            dialeto = csv.Sniffer().sniff(amostra, delimiters=';,\t')
+        except csv.Error:
+            dialeto = _PontoEVirgula
+        for linha in csv.reader(texto, dialeto):
+            if progresso:
+                progresso(bruto.tell() / tamanho)
+            yield linha
+
+
+def _linhas_xlsx(caminho, progresso):
+    from openpyxl import load_workbook
+
+    planilha = load_workbook(caminho, read_only=True, data_only=True)
+    try:
+        aba = planilha.worksheets[0]
+        total = aba.max_row or 0
+        for numero, linha in enumerate(aba.iter_rows(values_only=True), start=1):
+            if total:
+                progresso(numero / total)
+            yield linha
+    finally:
+        planilha.close()
+
+
+def _registros(caminho, formato, progresso):
+    """(número da linha, {campo: valor}) para cada linha de dados do arquivo"""
+    linhas = _linhas_xlsx(caminho, progresso) if formato == 'xlsx' else linhas_csv(caminho, progresso)
+    cabecalho = next(linhas, None)
+    if cabecalho is None:
+        raise ValueError('Arquivo vazio.')
+
+    campos = [COLUNAS.get(normalizar(coluna)) for coluna in cabecalho]
+    faltando = [campo for campo in OBRIGATORIOS if campo not in campos]
+    if faltando:
+        raise ValueError('Colunas obrigatórias ausentes: ' + ', '.join(faltando))
+
+    for numero, linha in enumerate(linhas, start=2):
+        if not any(valor not in (None, '') for valor in linha):
+            continue
+        yield numero, {campo: valor for campo, valor in zip(campos, linha) if campo}
+
+
+# Validação
+
+def converter_data(valor):
+    """date a partir de date/datetime ou de texto em um dos FORMATOS_DATA (None se inválida)"""
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    texto = str(valor or '').strip()
+    for formato in FORMATOS_DATA:
+        try:
+            return datetime.strptime(texto, formato).date()
+        except ValueError:
+            pass
+    return None
+
+
+def _texto(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return str(valor).strip()
+
+
+def _validar(registro, hoje, unidades, especialidades):
+    """(dados para o INSERT, nomes das especialidades) ou ValueError com o motivo"""
+    dados = {campo: _texto(registro.get(campo)) for campo in COLUNAS.values() if campo != 'data_nascimento'}
+    for campo in ('nome', 'unidade', 'classe'):
+        if not dados[campo]:
+            raise ValueError(f'Campo obrigatório vazio: {campo}')
+
+    nascimento = converter_data(registro.get('data_nascimento'))
+    if nascimento is None:
+        raise ValueError(f'Data de nascimento inválida: {registro.get("data_nascimento")!r}')
+    if nascimento > hoje:
+        raise ValueError('Data de nascimento no futuro')
+
+    if dados['unidade'] not in unidades:
+        raise ValueError(f'Unidade desconhecida: {dados["unidade"]}')
+    if dados['classe'] not in referencias.CLASSES:
+        raise ValueError(f'Classe desconhecida: {dados["classe"]}')
+    if dados['email'] and '@' not in dados['email']:
+        raise ValueError(f'E-mail inválido: {dados["email"]}')
+
+    nomes = [nome.strip() for nome in dados.pop('especialidades').replace(';', ',').split(',') if nome.strip()]
+    desconhecidas = [nome for nome in nomes if nome not in especialidades]
+    if desconhecidas:
+        raise ValueError('Especialidade desconhecida: ' + ', '.join(desconhecidas))
+
+    dados['data_nascimento'] = nascimento
+    dados['idade'] = hoje.year - nascimento.year - ((hoje.month, hoje.day) < (nascimento.month, nascimento.day))
+    dados['ativo'] = True
+    dados['data_cadastro'] = datetime.utcnow()
+    return dados, nomes
+
+
+def _ja_cadastrados(chaves):
+    """Chaves (nome, data de nascimento) do lote que já existem entre os ativos"""
+    if not chaves:
+        return set()
+    return set(db.session.execute(
+        select(Desbravador.nome, Desbravador.data_nascimento)
+        .where(Desbravador.ativo == True,
+               tuple_(Desbravador.nome, Desbravador.data_nascimento).in_(list(chaves)))
+    ).all())
+
+
+# Gravação
+
+def _gravar(validos, ids_especialidades):
+    """Insere um lote de desbravadores e suas especialidades em uma transação"""
+    ids = db.session.execute(
+        insert(Desbravador).returning(Desbravador.id, sort_by_parameter_order=True),
+        [dados for dados, _ in validos]
+    ).scalars().all()
+    associacoes = [
+        {'desbravador_id': desbravador_id, 'especialidade_id': ids_especialidades[nome]}
+        for desbravador_id, (_, nomes) in zip(ids, validos) for nome in dict.fromkeys(nomes)
+    ]
+    if associacoes:
+        db.session.execute(insert(desbravador_especialidade), associacoes)
+    db.session.commit()
+
+
+def processar(caminho, formato, simular=False, estado=None, notificar=None):
+    """Valida e (fora da simulação) importa o arquivo; devolve o estado final
+
+    notificar(estado) é chamada a cada linha lida, com o estado parcial.
+    """
+    estado = estado if estado is not None else _novo_estado(simular)
+    hoje = date.today()
+    unidades = set(referencias.unidades())
+    ids_especialidades = dict(db.session.execute(select(Especialidade.nome, Especialidade.id)).all())
+    vistos = set()
+
+    def progresso(fracao):
+        estado['progresso'] = min(fracao, 1.0)
+        if notificar:
+            notificar(estado)
+
+    def erro(numero, motivo):
+        estado['erros'] += 1
+        if len(estado['detalhes']) < LIMITE_ERROS:
+            estado['detalhes'].append({'linha': numero, 'motivo': motivo})
+
+    def concluir_lote(lote):
+        existentes = _ja_cadastrados({(dados['nome'], dados['data_nascimento']) for _, dados, _ in lote})
+        validos = []
+        for numero, dados, nomes in lote:
+            if (dados['nome'], dados['data_nascimento']) in existentes:
+                erro(numero, 'Desbravador já cadastrado (mesmo nome e data de nascimento)')
+            else:
+                validos.append((dados, nomes))
+        if validos and not simular:
+            _gravar(validos, ids_especialidades)
+        estado['importadas'] += len(validos)
+
+    lote = []
+    for numero, registro in _registros(caminho, formato, progresso):
+        estado['linhas'] += 1
+        try:
+            dados, nomes = _validar(registro, hoje, unidades, ids_especialidades)
+        except ValueError as motivo:
+            erro(numero, str(motivo))
+            continue
+
+        chave = (dados['nome'], dados['data_nascimento'])
+        if chave in vistos:
+            erro(numero, 'Linha repetida no arquivo')
+            continue
+        vistos.add(chave)
+
+        lote.append((numero, dados, nomes))
+        if len(lote) >= LOTE:
+            concluir_lote(lote)
+            lote = []
+    if lote:
+        concluir_lote(lote)
+
+    estado['progresso'] = 1.0
+    return estado
+
+
+# Execução em segundo plano
+
+def _novo_estado(simular):
+    return {'situacao': AGUARDANDO, 'simulacao': simular, 'progresso': 0.0,
+            'linhas': 0, 'importadas': 0, 'erros': 0, 'detalhes': [], 'mensagem': ''}
+
+
+def executar(caminho, formato, simular=False):
+    """Importação como tarefa da fila: o estado parcial fica no resultado da tarefa"""
+    try:
+        return processar(caminho, formato, simular,
+                         notificar=lambda estado: tarefas.progresso(estado['progresso'], dados=estado))
+    finally:
+        try:
+            os.remove(caminho)
+        except OSError:
+            pass
+
+
+def salvar_envio(arquivo, formatos, identificador=None):
+    """Grava em IMPORTS_FOLDER um arquivo enviado por formulário; devolve (caminho, formato)"""
+    formato = os.path.splitext(arquivo.filename or '')[1].lower().lstrip('.')
+    if formato not in formatos:
+        raise ValueError('Envie um arquivo ' + ' ou '.join(f'.{f}' for f in formatos) + '.')
+
+    pasta = _pasta()
+    os.makedirs(pasta, exist_ok=True)
+    caminho = os.path.join(pasta, f'{identificador or uuid.uuid4().hex}.{formato}')
+    arquivo.save(caminho)
+    return caminho, formato
+
+
+def iniciar(arquivo, simular=False):
+    """Grava o arquivo enviado e enfileira a importação; devolve o identificador"""
+    caminho, formato = salvar_envio(arquivo, ('csv', 'xlsx') if disponivel_xlsx() else ('csv',))
+    # Uma tentativa só: repetir uma importação interrompida duplicaria os lotes já gravados
+    linha = tarefas.enfileirar('importar_desbravadores',
+                               {'caminho': caminho, 'formato': formato, 'simular': simular},
+                               prioridade=tarefas.ALTA, max_tentativas=1)
+    return str(linha.id)
+
+
+def situacao(identificador):
+    """Estado da importação, a partir da tarefa (None se desconhecida)"""
+    linha = tarefas.obter(int(identificador)) if str(identificador).isdigit() else None
+    if linha is None or linha.tipo != 'importar_desbravadores':
+        return None
+    estado = _novo_estado(json.loads(linha.argumentos)['simular'])
+    if linha.resultado:
+        estado.update(json.loads(linha.resultado))
+    estado['situacao'] = linha.situacao
+    estado['progresso'] = linha.progresso
+    if linha.situacao == FALHOU:
+        estado['mensagem'] = linha.mensagem or 'Erro ao processar o arquivo.'
+    return estado
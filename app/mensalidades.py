@@ -0,0 +1,112 @@
+"""
+Geração e pagamento em lote das mensalidades.
+
+Todas as mensalidades do mês são criadas com um único INSERT ... SELECT
+sobre os desbravadores ativos. O índice único (desbravador, ano, mês) e o
+ON CONFLICT DO NOTHING tornam a geração idempotente: executá-la de novo,
+ou em paralelo, não cria duplicatas.
+"""
+
+from datetime import datetime
+from sqlalchemy import select, update, insert, literal, func
+from app import db
+from app.models import Desbravador, Mensalidade, Transacao
+from app import resumos
+from app.banco import insert_dialeto
+
+VALOR_PADRAO = 50.0  # Valor padrão da mensalidade
+
+
+def gerar_mensalidades(ano, mes, valor=VALOR_PADRAO):
+    """Cria as mensalidades do mês para os desbravadores ativos; devolve quantas foram criadas"""
+    ativos = select(
+        Desbravador.id,
+        literal(mes),
+        literal(ano),
+        literal(valor),
+        literal('pendente'),
+        literal(datetime.utcnow())
+    ).where(Desbravador.ativo == True)
+
+    comando = insert_dialeto(Mensalidade.__table__).from_select(
+        ['desbravador_id', 'mes_referencia', 'ano_referencia', 'valor', 'status', 'created_at'],
+        ativos
+    ).on_conflict_do_nothing(
+        index_elements=['desbravador_id', 'ano_referencia', 'mes_referencia']
+    )
+
+    criadas = db.session.execute(comando).rowcount
+    if criadas:
+        # O INSERT em lote não passa pelos eventos do ORM
+        resumos.reconstruir(ano, mes)
+    db.session.commit()
+    return criadas
+
+
+def pagar_mensalidades(ids=None, ano=None, mes=None):
+    """Marca como pagas as mensalidades indicadas (ou todas as pendentes do mês)
+
+    Usa um UPDATE ... RETURNING, de modo que apenas as mensalidades que esta
+    chamada efetivamente alterou geram transação de receita, e um único
+    INSERT em lote para as transações. Devolve um resumo da operação, com os
+    meses (ano, mes) afetados.
+    """
+    if ids is None and (ano is None or mes is None):
+        raise ValueError('Informe os ids das mensalidades ou o mês/ano de referência.')
+
+    criterios = [func.coalesce(Mensalidade.status, 'pendente') != 'pago']
+    if ids is not None:
+        criterios.append(Mensalidade.id.in_(ids))
+    if ano is not None and mes is not None:
+        criterios.append(Mensalidade.ano_referencia == ano)
+        criterios.append(Mensalidade.mes_referencia == mes)
+
+    agora = datetime.now()
+    pagas = db.session.execute(
+        update(Mensalidade)
+        .where(*criterios)
+        .values(status='pago', data_pagamento=agora)
+        .returning(
+            Mensalidade.id,
+            Mensalidade.desbravador_id,
+            Mensalidade.mes_referencia,
+            Mensalidade.ano_referencia,
+            Mensalidade.valor
+        )
+        .execution_options(synchronize_session=False)
+    ).all()
+
+    if not pagas:
+        db.session.rollback()
+        return {'pagas': 0, 'valor_total': 0.0, 'ids': [], 'data_pagamento': None, 'meses': []}
+
+    nomes = dict(db.session.execute(
+        select(Desbravador.id, Desbravador.nome)
+        .where(Desbravador.id.in_({m.desbravador_id for m in pagas}))
+    ).all())
+
+    db.session.execute(insert(Transacao), [
+        {
+            'tipo': 'receita',
+            'categoria': 'mensalidade',
+            'descricao': f'Mensalidade - {nomes.get(m.desbravador_id, "")} - {m.mes_referencia}/{m.ano_referencia}',
+            'valor': m.valor,
+            'data_transacao': agora,
+            'created_at': datetime.utcnow()
+        }
+        for m in pagas
+    ])
+
+    # O UPDATE em lote não passa pelos eventos do ORM
+    meses = sorted({(m.ano_referencia, m.mes_referencia) for m in pagas})
+    for ano_ref, mes_ref in meses:
+        resumos.reconstruir(ano_ref, mes_ref)
+
+    db.session.commit()
+    return {
+        'pagas': len(pagas),
+        'valor_total': sum(m.valor for m in pagas),
+        'ids': sorted(m.id for m in pagas),
+        'data_pagamento': agora,
+        'meses': meses
+    }
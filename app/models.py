@@ -8,23 +8,35 @@ class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
-    password_hash = db.Column(db.String(120), nullable=False)
+    password_hash = db.Column(db.String(255), nullable=False)
     nome_completo = db.Column(db.String(120), nullable=False)
     cargo = db.Column(db.String(50), nullable=False)  # Diretor, Secretário, etc.
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # Prefixo do identificador de sessão (Flask-Login): 'u:<id>'
+    PREFIXO_SESSAO = 'u'
+    
+    def get_id(self):
+        return f'{self.PREFIXO_SESSAO}:{self.id}'
+    
     def __repr__(self):
         return f'<User {self.username}>'
 
 class Desbravador(UserMixin, db.Model):
     """Modelo para desbravadores"""
+    __table_args__ = (
+        db.Index('ix_desbravador_ativo_nome', 'nome',
+                 sqlite_where=db.text('ativo = 1'), postgresql_where=db.text('ativo')),
+        db.Index('ix_desbravador_ativo_data_cadastro', 'data_cadastro',
+                 sqlite_where=db.text('ativo = 1'), postgresql_where=db.text('ativo')),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     nome = db.Column(db.String(100), nullable=False)
     idade = db.Column(db.Integer, nullable=False)
     data_nascimento = db.Column(db.Date, nullable=False)
     unidade = db.Column(db.String(50), nullable=False)  # Amigo, Companheiro, etc.
     classe = db.Column(db.String(50), nullable=False)  # Amigo, Companheiro, Pesquisador, etc.
-    especialidades = db.Column(db.Text)  # JSON string com especialidades
     telefone = db.Column(db.String(20))
     email = db.Column(db.String(120))
     endereco = db.Column(db.Text)
@@ -35,17 +47,59 @@ class Desbravador(UserMixin, db.Model):
     
     # Campos para login
     username = db.Column(db.String(80), unique=True)  # Username único para login
-    password_hash = db.Column(db.String(120))  # Hash da senha
+    password_hash = db.Column(db.String(255))  # Hash da senha (app.senhas)
     pode_fazer_login = db.Column(db.Boolean, default=False)  # Se pode fazer login
     
     # Relacionamento com mensalidades
     mensalidades = db.relationship('Mensalidade', backref='desbravador', lazy=True)
     
+    # Especialidades conquistadas (tabela desbravador_especialidade)
+    especialidades = db.relationship('Especialidade', secondary='desbravador_especialidade',
+                                     order_by='Especialidade.nome', lazy=True)
+    
+    # Prefixo do identificador de sessão (Flask-Login): 'd:<id>'
+    PREFIXO_SESSAO = 'd'
+    
+    def get_id(self):
+        return f'{self.PREFIXO_SESSAO}:{self.id}'
+    
     def __repr__(self):
         return f'<Desbravador {self.nome}>'
 
+desbravador_especialidade = db.Table(
+    'desbravador_especialidade',
+    db.Column('desbravador_id', db.Integer, db.ForeignKey('desbravador.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('especialidade_id', db.Integer, db.ForeignKey('especialidade.id', ondelete='CASCADE'), primary_key=True),
+    # "Quem tem a especialidade X": a chave primária só atende a busca por desbravador
+    db.Index('ix_desbravador_especialidade_especialidade', 'especialidade_id', 'desbravador_id'),
+)
+
+class Especialidade(db.Model):
+    """Especialidade que pode ser conquistada pelos desbravadores (lista de referência)"""
+    id = db.Column(db.Integer, primary_key=True)
+    nome = db.Column(db.String(100), unique=True, nullable=False)
+    
+    def __repr__(self):
+        return f'<Especialidade {self.nome}>'
+
+class Unidade(db.Model):
+    """Unidade do clube (lista de referência)"""
+    id = db.Column(db.Integer, primary_key=True)
+    nome = db.Column(db.String(50), unique=True, nullable=False)
+    ordem = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<Unidade {self.nome}>'
+
 class Mensalidade(db.Model):
     """Modelo para controle de mensalidades"""
+    __table_args__ = (
+        db.Index('ix_mensalidade_referencia_status', 'ano_referencia', 'mes_referencia', 'status'),
+        # Uma mensalidade por desbravador e mês (também atende buscas por desbravador_id)
+        db.Index('uq_mensalidade_desbravador_referencia',
+                 'desbravador_id', 'ano_referencia', 'mes_referencia', unique=True),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     desbravador_id = db.Column(db.Integer, db.ForeignKey('desbravador.id'), nullable=False)
     mes_referencia = db.Column(db.Integer, nullable=False)  # 1-12
@@ -59,8 +113,26 @@ class Mensalidade(db.Model):
     def __repr__(self):
         return f'<Mensalidade {self.desbravador_id} - {self.mes_referencia}/{self.ano_referencia}>'
 
+class ResumoMensalidade(db.Model):
+    """Totais de mensalidades por ano, mês e status (mantido por app.resumos)"""
+    ano = db.Column(db.Integer, primary_key=True)
+    mes = db.Column(db.Integer, primary_key=True)
+    status = db.Column(db.String(20), primary_key=True)
+    quantidade = db.Column(db.Integer, nullable=False, default=0)
+    valor_total = db.Column(db.Float, nullable=False, default=0.0)
+    
+    def __repr__(self):
+        return f'<ResumoMensalidade {self.mes}/{self.ano} {self.status}: {self.quantidade}>'
+
 class Transacao(db.Model):
     """Modelo para transações financeiras"""
+    __table_args__ = (
+        db.Index('ix_transacao_data_transacao', 'data_transacao'),
+        db.Index('ix_transacao_tipo_data_transacao', 'tipo', 'data_transacao'),
+        # Impressão digital do lançamento do extrato: reimportar não duplica (app.extratos)
+        db.Index('uq_transacao_hash_extrato', 'hash_extrato', unique=True),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     tipo = db.Column(db.String(20), nullable=False)  # receita, despesa
     categoria = db.Column(db.String(50), nullable=False)  # mensalidade, evento, material, etc.
@@ -68,13 +140,52 @@ class Transacao(db.Model):
     valor = db.Column(db.Float, nullable=False)
     data_transacao = db.Column(db.DateTime, nullable=False)
     observacoes = db.Column(db.Text)
+    hash_extrato = db.Column(db.String(64))  # apenas transações importadas de extrato bancário
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     def __repr__(self):
         return f'<Transacao {self.tipo} - {self.valor}>'
 
+class SaldoMensal(db.Model):
+    """Saldo de abertura e fechamento de um mês encerrado (mantido por app.saldos)"""
+    ano = db.Column(db.Integer, primary_key=True)
+    mes = db.Column(db.Integer, primary_key=True)
+    saldo_inicial = db.Column(db.Float, nullable=False, default=0.0)
+    total_receitas = db.Column(db.Float, nullable=False, default=0.0)
+    total_despesas = db.Column(db.Float, nullable=False, default=0.0)
+    saldo_final = db.Column(db.Float, nullable=False, default=0.0)
+    fechado_em = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<SaldoMensal {self.mes}/{self.ano}: {self.saldo_final}>'
+
+class SaldoCategoria(db.Model):
+    """Total por tipo e categoria de um mês encerrado"""
+    ano = db.Column(db.Integer, primary_key=True)
+    mes = db.Column(db.Integer, primary_key=True)
+    tipo = db.Column(db.String(20), primary_key=True)
+    categoria = db.Column(db.String(50), primary_key=True)
+    total = db.Column(db.Float, nullable=False, default=0.0)
+    
+    def __repr__(self):
+        return f'<SaldoCategoria {self.mes}/{self.ano} {self.tipo}/{self.categoria}: {self.total}>'
+
+class VersaoTabela(db.Model):
+    """Marca de versão dos dados de uma tabela, trocada a cada commit que a altera"""
+    tabela = db.Column(db.String(50), primary_key=True)
+    versao = db.Column(db.String(32), nullable=False)
+    alterada_em = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<VersaoTabela {self.tabela}: {self.versao}>'
+
 class Evento(db.Model):
     """Modelo para eventos do clube"""
+    __table_args__ = (
+        db.Index('ix_evento_ativo_data_inicio', 'data_inicio',
+                 sqlite_where=db.text('ativo = 1'), postgresql_where=db.text('ativo')),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     nome = db.Column(db.String(100), nullable=False)
     descricao = db.Column(db.Text)
@@ -88,3 +199,32 @@ class Evento(db.Model):
     
     def __repr__(self):
         return f'<Evento {self.nome}>'
+
+class Tarefa(db.Model):
+    """Tarefa em segundo plano (fila de app.tarefas); horários locais, como os do agendador"""
+    __table_args__ = (
+        db.Index('ix_tarefa_fila', 'situacao', 'prioridade', 'executar_em'),
+        # Ocorrências de agendamentos e PDFs de relatórios: uma tarefa por chave
+        db.Index('uq_tarefa_chave', 'chave', unique=True),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    tipo = db.Column(db.String(50), nullable=False)  # nome registrado em app.tarefas
+    argumentos = db.Column(db.Text)  # JSON
+    chave = db.Column(db.String(200))
+    prioridade = db.Column(db.Integer, nullable=False, default=0)  # maior sai primeiro
+    situacao = db.Column(db.String(20), nullable=False, default='aguardando')  # aguardando, processando, concluida, falhou
+    tentativas = db.Column(db.Integer, nullable=False, default=0)
+    max_tentativas = db.Column(db.Integer, nullable=False, default=3)
+    executar_em = db.Column(db.DateTime, nullable=False)  # não antes deste horário
+    progresso = db.Column(db.Float, nullable=False, default=0.0)  # 0 a 1
+    mensagem = db.Column(db.String(255))
+    resultado = db.Column(db.Text)  # JSON
+    erro = db.Column(db.Text)  # traceback da última falha
+    worker = db.Column(db.String(100))  # host:pid do processo que a executa
+    criada_em = db.Column(db.DateTime, default=datetime.now)
+    iniciada_em = db.Column(db.DateTime)
+    concluida_em = db.Column(db.DateTime)
+    
+    def __repr__(self):
+        return f'<Tarefa {self.id} {self.tipo}: {self.situacao}>'
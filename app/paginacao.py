@@ -0,0 +1,154 @@
+"""
+Paginação por cursor (keyset).
+
+Em vez de OFFSET, cada página continua a partir da chave de ordenação do
+último item exibido (por exemplo data_transacao, id): a consulta usa o
+índice para saltar direto ao ponto certo e o custo de qualquer página é o
+mesmo da primeira. Os cursores de próxima/anterior são opacos para o
+navegador (base64 de um JSON).
+
+O total exibido nas listagens vem de contagens guardadas em memória por
+alguns minutos e descartadas quando a tabela é alterada, em vez de um
+COUNT(*) a cada página. As chaves dependem dos filtros enviados pelo
+navegador, por isso só as MAXIMO_CONTAGENS mais recentes são mantidas.
+"""
+
+import base64
+import binascii
+import json
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import date, datetime
+from sqlalchemy import Date, DateTime, literal, tuple_
+from app import db
+from app.versoes import ao_alterar
+
+Pagina = namedtuple('Pagina', ['itens', 'anterior', 'proximo', 'total'])
+
+PROXIMA = 'p'
+ANTERIOR = 'a'
+POSICAO = 'o'
+
+# Validade (segundos) das contagens aproximadas
+TEMPO_CONTAGEM = 300
+
+# Contagens guardadas (as usadas há mais tempo saem primeiro)
+MAXIMO_CONTAGENS = 256
+
+_lock = threading.Lock()
+_contagens = OrderedDict()
+
+
+def _codificar(direcao, valores):
+    dados = json.dumps([direcao, [v.isoformat() if isinstance(v, date) else v for v in valores]])
+    return base64.urlsafe_b64encode(dados.encode()).decode().rstrip('=')
+
+
+def _decodificar(cursor, colunas):
+    """(direção, valores) de um cursor, ou (None, None) se ausente/inválido"""
+    if not cursor:
+        return None, None
+    try:
+        dados = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        direcao, valores = json.loads(dados)
+        if direcao not in (PROXIMA, ANTERIOR) or len(valores) != len(colunas):
+            return None, None
+        convertidos = []
+        for coluna, valor in zip(colunas, valores):
+            if isinstance(coluna.type, DateTime):
+                valor = datetime.fromisoformat(valor)
+            elif isinstance(coluna.type, Date):
+                valor = date.fromisoformat(valor)
+            convertidos.append(valor)
+        return direcao, convertidos
+    except (binascii.Error, ValueError, TypeError):
+        return None, None
+
+
+def paginar(query, colunas, cursor=None, por_pagina=20, decrescente=False):
+    """Uma página de `query` ordenada por `colunas` (a última deve ser única, ex.: id)
+
+    Todas as colunas são ordenadas no mesmo sentido, para que a posição do
+    cursor seja uma única comparação de tuplas atendida pelo índice.
+    """
+    direcao, valores = _decodificar(cursor, colunas)
+    para_tras = direcao == ANTERIOR and valores is not None
+    descendo = decrescente != para_tras
+
+    query = query.order_by(None)
+    if valores is not None:
+        chave = tuple_(*colunas)
+        limite = tuple_(*[literal(v, c.type) for c, v in zip(colunas, valores)])
+        query = query.filter(chave < limite if descendo else chave > limite)
+
+    ordem = [c.desc() if descendo else c.asc() for c in colunas]
+    itens = query.order_by(*ordem).limit(por_pagina + 1).all()
+
+    mais = len(itens) > por_pagina
+    itens = itens[:por_pagina]
+    if para_tras:
+        itens.reverse()
+        tem_anterior, tem_proxima = mais, True
+    else:
+        tem_anterior, tem_proxima = valores is not None, mais
+
+    def chave_de(item):
+        return [getattr(item, c.key) for c in colunas]
+
+    anterior = _codificar(ANTERIOR, chave_de(itens[0])) if itens and tem_anterior else None
+    proximo = _codificar(PROXIMA, chave_de(itens[-1])) if itens and tem_proxima else None
+    return Pagina(itens, anterior, proximo, None)
+
+
+def paginar_por_posicao(query, cursor=None, por_pagina=20):
+    """Página por OFFSET com os mesmos cursores opacos
+
+    Usada quando a ordem não é uma chave indexável (resultados de busca
+    ordenados por relevância), listas curtas por natureza.
+    """
+    posicao = 0
+    if cursor:
+        try:
+            dados = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            direcao, (valor,) = json.loads(dados)
+            if direcao == POSICAO and isinstance(valor, int) and valor > 0:
+                posicao = valor
+        except (binascii.Error, ValueError, TypeError):
+            pass
+
+    itens = query.offset(posicao).limit(por_pagina + 1).all()
+    mais = len(itens) > por_pagina
+    anterior = _codificar(POSICAO, [max(posicao - por_pagina, 0)]) if posicao > 0 else None
+    proximo = _codificar(POSICAO, [posicao + por_pagina]) if mais else None
+    return Pagina(itens[:por_pagina], anterior, proximo, None)
+
+
+def total_aproximado(query, tabela, chave=''):
+    """COUNT(*) de `query`, guardado por TEMPO_CONTAGEM segundos
+
+    A contagem é descartada antes disso quando a tabela é alterada.
+    """
+    identificador = (db.engine.url, tabela, chave)
+    with _lock:
+        guardada = _contagens.get(identificador)
+        if guardada is not None and guardada[0] > time.monotonic():
+            _contagens.move_to_end(identificador)
+            return guardada[1]
+
+    total = query.order_by(None).count()
+    with _lock:
+        _contagens[identificador] = (time.monotonic() + TEMPO_CONTAGEM, total)
+        _contagens.move_to_end(identificador)
+        while len(_contagens) > MAXIMO_CONTAGENS:
+            _contagens.popitem(last=False)
+    return total
+
+
+@ao_alterar
+def descartar_contagens(tabelas):
+    """Descarta as contagens das tabelas alteradas"""
+    with _lock:
+        for identificador in list(_contagens):
+            if identificador[1] in tabelas:
+                del _contagens[identificador]
@@ -0,0 +1,121 @@
+"""
+Perfil de consultas SQL por requisição.
+
+Com SQLALCHEMY_RECORD_QUERIES ativo, o Flask-SQLAlchemy registra cada
+consulta da requisição. Ao final de cada requisição este módulo:
+
+- envia o cabeçalho Server-Timing com o tempo total, o tempo de banco e o
+  número de consultas (visível nas ferramentas de desenvolvedor do
+  navegador) aos administradores logados, ou a todos com SERVER_TIMING;
+- grava um log estruturado (JSON) das requisições acima de SLOW_REQUEST_MS,
+  com as consultas mais lentas;
+- acumula totais por endpoint para a página de desempenho dos administradores.
+
+Os totais ficam na memória de cada processo: sob o gunicorn, cada worker
+tem os seus, e a página de desempenho mostra os do worker que a atendeu.
+O log de lentidão reúne todos os workers.
+"""
+
+import json
+import logging
+import threading
+import time
+from flask import g, request
+from flask_login import current_user
+from flask_sqlalchemy.record_queries import get_recorded_queries
+from app.models import User
+
+logger = logging.getLogger('app.profiling')
+
+_lock = threading.Lock()
+_por_endpoint = {}
+
+
+def init_app(app):
+    """Registra os ganchos de perfil na aplicação"""
+    app.config.setdefault('SLOW_REQUEST_MS', 500)
+    app.config.setdefault('PROFILING_SLOWEST_QUERIES', 3)
+    app.config.setdefault('SERVER_TIMING', False)
+
+    @app.before_request
+    def _iniciar_cronometro():
+        g._perfil_inicio = time.perf_counter()
+
+    @app.after_request
+    def _registrar_perfil(response):
+        inicio = g.pop('_perfil_inicio', None)
+        if inicio is None or not app.config.get('SQLALCHEMY_RECORD_QUERIES'):
+            return response
+
+        total_ms = (time.perf_counter() - inicio) * 1000
+        consultas = get_recorded_queries()
+        db_ms = sum(q.duration for q in consultas) * 1000
+
+        # Os tempos internos não são expostos a visitantes
+        if app.config['SERVER_TIMING'] or isinstance(current_user, User):
+            response.headers.add(
+                'Server-Timing',
+                f'db;dur={db_ms:.1f};desc="{len(consultas)} consultas", app;dur={total_ms:.1f}'
+            )
+
+        endpoint = request.endpoint or request.path
+        _acumular(endpoint, len(consultas), db_ms, total_ms)
+
+        if total_ms >= app.config['SLOW_REQUEST_MS']:
+            lentas = sorted(consultas, key=lambda q: q.duration, reverse=True)
+            logger.warning(json.dumps({
+                'evento': 'requisicao_lenta',
+                'metodo': request.method,
+                'caminho': request.full_path.rstrip('?'),
+                'endpoint': endpoint,
+                'status': response.status_code,
+                'tempo_ms': round(total_ms, 1),
+                'tempo_db_ms': round(db_ms, 1),
+                'consultas': len(consultas),
+                'mais_lentas': [
+                    {
+                        'tempo_ms': round(q.duration * 1000, 1),
+                        'sql': ' '.join(q.statement.split())[:500],
+                        'origem': q.location
+                    }
+                    for q in lentas[:app.config['PROFILING_SLOWEST_QUERIES']]
+                ]
+            }, ensure_ascii=False))
+
+        return response
+
+
+def _acumular(endpoint, consultas, db_ms, total_ms):
+    with _lock:
+        estatistica = _por_endpoint.setdefault(endpoint, {
+            'endpoint': endpoint,
+            'requisicoes': 0,
+            'consultas': 0,
+            'tempo_db_ms': 0.0,
+            'tempo_total_ms': 0.0,
+            'maior_tempo_db_ms': 0.0
+        })
+        estatistica['requisicoes'] += 1
+        estatistica['consultas'] += consultas
+        estatistica['tempo_db_ms'] += db_ms
+        estatistica['tempo_total_ms'] += total_ms
+        estatistica['maior_tempo_db_ms'] = max(estatistica['maior_tempo_db_ms'], db_ms)
+
+
+def ranking(limite=20):
+    """Endpoints com maior tempo de banco acumulado neste processo (worker)"""
+    with _lock:
+        estatisticas = [dict(e) for e in _por_endpoint.values()]
+
+    for e in estatisticas:
+        e['consultas_por_requisicao'] = e['consultas'] / e['requisicoes']
+        e['tempo_db_medio_ms'] = e['tempo_db_ms'] / e['requisicoes']
+        e['tempo_medio_ms'] = e['tempo_total_ms'] / e['requisicoes']
+    estatisticas.sort(key=lambda e: e['tempo_db_ms'], reverse=True)
+    return estatisticas[:limite]
+
+
+def limpar():
+    """Zera as estatísticas acumuladas"""
+    with _lock:
+        _por_endpoint.clear()
@@ -0,0 +1,100 @@
+"""
+Listas de referência (especialidades e unidades) e consultas por especialidade.
+
+As listas ficam nas tabelas especialidade e unidade, preenchidas com os
+valores padrão quando as tabelas são criadas (create_all ou migração 0005).
+Os nomes ficam em memória em cada processo junto com a versão da tabela
+(app.versoes) de que foram lidos, e são relidos quando a versão muda,
+mesmo que o commit tenha sido feito por outro worker.
+
+As especialidades de cada desbravador ficam em desbravador_especialidade,
+de modo que filtros ("quem tem a especialidade X") e contagens por
+especialidade são consultas SQL, sem carregar os cadastros.
+"""
+
+import threading
+from sqlalchemy import event, select, insert, func
+from app import db
+from app.models import Desbravador, Especialidade, Unidade, desbravador_especialidade
+from app.versoes import versoes
+
+# Valores iniciais (baseados no site MDA)
+ESPECIALIDADES_PADRAO = (
+    'ADRA', 'Artes e Habilidades Manuais', 'Atividades Agrícolas',
+    'Atividades Missionárias e Comunitárias', 'Atividades Profissionais',
+    'Atividades Recreativas', 'Ciência e Saúde', 'Estudos da Natureza',
+    'Habilidades Domésticas'
+)
+
+# Classes aceitas no cadastro, na edição e na importação
+CLASSES = (
+    'Amigo', 'Companheiro', 'Pesquisador', 'Pioneiro',
+    'Excursionista', 'Guia', 'Líder', 'Líder Master', 'Líder Master Avançado'
+)
+
+# As unidades iniciais têm os nomes das classes
+UNIDADES_PADRAO = CLASSES
+
+_lock = threading.Lock()
+_listas = {}
+
+
+@event.listens_for(Especialidade.__table__, 'after_create')
+def _preencher_especialidades(tabela, conexao, **kw):
+    conexao.execute(insert(tabela), [{'nome': nome} for nome in ESPECIALIDADES_PADRAO])
+
+
+@event.listens_for(Unidade.__table__, 'after_create')
+def _preencher_unidades(tabela, conexao, **kw):
+    conexao.execute(insert(tabela), [{'nome': nome, 'ordem': ordem}
+                                     for ordem, nome in enumerate(UNIDADES_PADRAO)])
+
+
+def _lista(tabela, consulta):
+    # Os formulários usam as duas listas: uma consulta de versões para ambas
+    versao = versoes(tabela, antecipar=('especialidade', 'unidade'))[tabela]
+    with _lock:
+        guardada, nomes = _listas.get(tabela, (None, None))
+    if guardada == versao:
+        return nomes
+    nomes = tuple(db.session.execute(consulta).scalars())
+    with _lock:
+        _listas[tabela] = (versao, nomes)
+    return nomes
+
+
+def especialidades():
+    """Nomes das especialidades, em ordem alfabética"""
+    return _lista('especialidade', select(Especialidade.nome).order_by(Especialidade.nome))
+
+
+def unidades():
+    """Nomes das unidades, na ordem definida"""
+    return _lista('unidade', select(Unidade.nome).order_by(Unidade.ordem, Unidade.nome))
+
+
+def por_nome(nomes):
+    """Especialidades com os nomes informados (nomes desconhecidos são ignorados)"""
+    if not nomes:
+        return []
+    return db.session.execute(
+        select(Especialidade).where(Especialidade.nome.in_(set(nomes))).order_by(Especialidade.nome)
+    ).scalars().all()
+
+
+def com_especialidade(query, nome):
+    """Restringe uma consulta de desbravadores a quem tem a especialidade"""
+    return query.filter(Desbravador.especialidades.any(Especialidade.nome == nome))
+
+
+def contagem_por_especialidade():
+    """[(especialidade, desbravadores ativos)], da mais para a menos frequente"""
+    quantidade = func.count(desbravador_especialidade.c.desbravador_id)
+    return [tuple(linha) for linha in db.session.execute(
+        select(Especialidade.nome, quantidade)
+        .join(desbravador_especialidade, desbravador_especialidade.c.especialidade_id == Especialidade.id)
+        .join(Desbravador, Desbravador.id == desbravador_especialidade.c.desbravador_id)
+        .where(Desbravador.ativo == True)
+        .group_by(Especialidade.nome)
+        .order_by(quantidade.desc(), Especialidade.nome)
+    )]
@@ -0,0 +1,232 @@
+"""
+Relatórios em PDF gerados em segundo plano.
+
+Os PDFs de mensalidades e de fluxo de caixa são desenhados com o reportlab
+por uma tarefa da fila (app.tarefas), fora das threads que atendem as
+requisições. Cada arquivo fica em REPORTS_FOLDER com um nome derivado dos
+parâmetros do relatório e das versões das tabelas de que ele depende
+(app.versoes): enquanto os dados não mudam, novos downloads são servidos
+direto do disco; quando mudam, o nome muda e o relatório é desenhado de
+novo, substituindo o arquivo anterior.
+"""
+
+import glob
+import hashlib
+import importlib.util
+import json
+import os
+import tempfile
+from collections import namedtuple
+from datetime import datetime, timedelta
+from xml.sax.saxutils import escape
+from flask import current_app
+from sqlalchemy import select
+from app import db, tarefas
+from app.models import Desbravador, Mensalidade, Transacao
+from app.consultas import totais_mensalidades_mes, estatisticas_mensalidades
+from app.saldos import intervalo_mes, saldo_inicial
+from app.versoes import versoes
+
+# Trocar quando o layout mudar, para que os PDFs antigos não sejam reaproveitados
+LAYOUT = 1
+
+# Segundos antes de tentar de novo um relatório cuja geração falhou
+ESPERA_APOS_FALHA = 60
+
+PRONTO = 'pronto'
+GERANDO = 'gerando'
+FALHOU = 'falhou'
+
+Relatorio = namedtuple('Relatorio', ['titulo', 'tabelas', 'coletar', 'desenhar'])
+
+
+def disponivel():
+    # reportlab é opcional (sem ele, não há PDFs) e só é importado ao desenhar
+    return importlib.util.find_spec('reportlab') is not None
+
+
+def _pasta():
+    pasta = current_app.config['REPORTS_FOLDER']
+    if not os.path.isabs(pasta):
+        pasta = os.path.join(os.path.dirname(current_app.root_path), pasta)
+    return pasta
+
+
+def _moeda(valor):
+    texto = f'{valor:,.2f}'.replace(',', '_').replace('.', ',').replace('_', '.')
+    return f'R$ {texto}'
+
+
+def _data(valor):
+    return valor.strftime('%d/%m/%Y') if valor else '-'
+
+
+# Mensalidades
+
+def _coletar_mensalidades(ano, mes):
+    linhas = db.session.execute(
+        select(Desbravador.nome, Desbravador.unidade, Mensalidade.valor,
+               Mensalidade.status, Mensalidade.data_pagamento)
+        .join(Desbravador, Mensalidade.desbravador_id == Desbravador.id)
+        .where(Mensalidade.ano_referencia == ano, Mensalidade.mes_referencia == mes)
+        .order_by(Desbravador.nome)
+    ).all()
+    return {
+        'stats': estatisticas_mensalidades(totais_mensalidades_mes(ano, mes)),
+        'linhas': [tuple(linha) for linha in linhas]
+    }
+
+
+def _desenhar_mensalidades(estilos, dados):
+    from reportlab.platypus import Spacer
+    from reportlab.lib.units import cm
+    stats = dados['stats']
+    resumo = [
+        ['Desbravadores', 'Pagas', 'Pendentes', 'Atrasadas', 'Arrecadado', '% pago'],
+        [stats['total_desbravadores'], stats['pagas'], stats['pendentes'], stats['atrasadas'],
+         _moeda(stats['valor_pago']), f"{stats['percentual_pago']:.1f}%"]
+    ]
+    tabela = [['Desbravador', 'Unidade', 'Valor', 'Status', 'Pagamento']]
+    for nome, unidade, valor, status, data_pagamento in dados['linhas']:
+        tabela.append([nome, unidade, _moeda(valor), (status or 'pendente').title(), _data(data_pagamento)])
+    return [_tabela(resumo), Spacer(1, 0.6 * cm), _tabela(tabela, [6 * cm, 3.5 * cm, 2.5 * cm, 2.5 * cm, 2.5 * cm])]
+
+
+# Fluxo de caixa
+
+def _coletar_fluxo_caixa(ano, mes):
+    inicio, fim = intervalo_mes(ano, mes)
+    linhas = db.session.execute(
+        select(Transacao.data_transacao, Transacao.descricao, Transacao.categoria,
+               Transacao.tipo, Transacao.valor)
+        .where(Transacao.data_transacao >= inicio, Transacao.data_transacao < fim)
+        .order_by(Transacao.data_transacao, Transacao.id)
+    ).all()
+    return {'saldo_inicial': saldo_inicial(ano, mes), 'linhas': [tuple(linha) for linha in linhas]}
+
+
+def _desenhar_fluxo_caixa(estilos, dados):
+    from reportlab.platypus import Paragraph, Spacer
+    from reportlab.lib.units import cm
+    saldo = dados['saldo_inicial']
+    receitas = despesas = 0.0
+    tabela = [['Data', 'Descrição', 'Categoria', 'Valor', 'Saldo']]
+    for data, descricao, categoria, tipo, valor in dados['linhas']:
+        if tipo == 'receita':
+            receitas += valor
+            saldo += valor
+        else:
+            despesas += valor
+            saldo -= valor
+        sinal = '' if tipo == 'receita' else '- '
+        tabela.append([_data(data), Paragraph(escape(descricao), estilos['BodyText']), categoria,
+                       sinal + _moeda(valor), _moeda(saldo)])
+
+    resumo = [
+        ['Saldo inicial', 'Receitas', 'Despesas', 'Saldo final'],
+        [_moeda(dados['saldo_inicial']), _moeda(receitas), _moeda(despesas), _moeda(saldo)]
+    ]
+    return [_tabela(resumo), Spacer(1, 0.6 * cm), _tabela(tabela, [2.3 * cm, 7 * cm, 2.7 * cm, 2.8 * cm, 2.8 * cm])]
+
+
+def _tabela(linhas, larguras=None):
+    from reportlab.lib import colors
+    from reportlab.platypus import Table, TableStyle
+    tabela = Table(linhas, colWidths=larguras, repeatRows=1)
+    tabela.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1e3a8a')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 9),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f3f4f6')]),
+        ('GRID', (0, 0), (-1, -1), 0.25, colors.HexColor('#9ca3af')),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ]))
+    return tabela
+
+
+RELATORIOS = {
+    'mensalidades': Relatorio('Relatório de Mensalidades', ('mensalidade', 'desbravador'),
+                              _coletar_mensalidades, _desenhar_mensalidades),
+    'fluxo-caixa': Relatorio('Fluxo de Caixa', ('transacao',),
+                             _coletar_fluxo_caixa, _desenhar_fluxo_caixa),
+}
+
+
+def _caminho(tipo, ano, mes):
+    """Arquivo do relatório para os parâmetros e as versões atuais dos dados"""
+    marca = versoes(*RELATORIOS[tipo].tabelas)
+    chave = json.dumps([LAYOUT, tipo, ano, mes, sorted(marca.items())])
+    resumo = hashlib.sha256(chave.encode()).hexdigest()[:32]
+    return os.path.join(_pasta(), f'{tipo}_{ano}_{mes:02d}_{resumo}.pdf')
+
+
+def _desenhar(tipo, ano, mes, dados, caminho):
+    """Grava o PDF em arquivo temporário e o move para o destino"""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import cm
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+
+    relatorio = RELATORIOS[tipo]
+    pasta = os.path.dirname(caminho)
+    os.makedirs(pasta, exist_ok=True)
+
+    descritor, temporario = tempfile.mkstemp(dir=pasta, suffix='.tmp')
+    os.close(descritor)
+    try:
+        documento = SimpleDocTemplate(temporario, pagesize=A4, title=f'{relatorio.titulo} - {mes:02d}/{ano}',
+                                      leftMargin=1.5 * cm, rightMargin=1.5 * cm,
+                                      topMargin=1.5 * cm, bottomMargin=1.5 * cm)
+        estilos = getSampleStyleSheet()
+        elementos = [
+            Paragraph(f'{relatorio.titulo} - {mes:02d}/{ano}', estilos['Title']),
+            Paragraph(f'Gerado em {datetime.now().strftime("%d/%m/%Y %H:%M")}', estilos['Normal']),
+            Spacer(1, 0.6 * cm),
+        ]
+        elementos += relatorio.desenhar(estilos, dados)
+        documento.build(elementos)
+        os.replace(temporario, caminho)
+    except BaseException:
+        os.unlink(temporario)
+        raise
+
+    # Versões anteriores do mesmo relatório não serão mais servidas
+    for antigo in glob.glob(os.path.join(pasta, f'{tipo}_{ano}_{mes:02d}_*.pdf')):
+        if antigo != caminho:
+            try:
+                os.remove(antigo)
+            except OSError:
+                pass
+
+
+def gerar(tipo, ano, mes):
+    """Gera o relatório na thread atual (se ainda não existir) e retorna o caminho"""
+    caminho = _caminho(tipo, ano, mes)
+    if not os.path.exists(caminho):
+        dados = RELATORIOS[tipo].coletar(ano, mes)
+        _desenhar(tipo, ano, mes, dados, caminho)
+    return caminho
+
+
+def solicitar(tipo, ano, mes):
+    """(caminho, situação): enfileira a geração se o PDF não existir"""
+    caminho = _caminho(tipo, ano, mes)
+    if os.path.exists(caminho):
+        return caminho, PRONTO
+
+    # Uma tarefa por arquivo: pedidos repetidos acompanham a mesma
+    linha = tarefas.enfileirar('relatorio_pdf', {'tipo': tipo, 'ano': ano, 'mes': mes},
+                               prioridade=tarefas.ALTA, chave=f'relatorio_pdf:{os.path.basename(caminho)}',
+                               max_tentativas=1)
+    if linha.situacao == tarefas.FALHOU:
+        if datetime.now() - linha.concluida_em < timedelta(seconds=ESPERA_APOS_FALHA):
+            return caminho, FALHOU
+        linha = tarefas.reenfileirar(linha.id)
+    elif linha.situacao == tarefas.CONCLUIDA and not os.path.exists(caminho):
+        # Arquivo apagado depois de gerado
+        linha = tarefas.reenfileirar(linha.id)
+
+    if os.path.exists(caminho):
+        return caminho, PRONTO
+    return caminho, FALHOU if linha.situacao == tarefas.FALHOU else GERANDO
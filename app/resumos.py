@@ -0,0 +1,202 @@
+"""
+Resumo incremental das mensalidades por (ano, mês, status).
+
+A tabela ResumoMensalidade é atualizada na mesma transação em que uma
+Mensalidade é inserida, paga, alterada ou removida pela sessão do ORM, de
+modo que os dashboards leem poucas linhas indexadas em vez de varrer a
+tabela de mensalidades. Operações em lote feitas com SQL direto devem
+chamar reconstruir() para os meses afetados.
+"""
+
+from collections import namedtuple
+from sqlalchemy import event, inspect, select, delete, update, insert, func
+from sqlalchemy.orm import Session
+from app import db
+from app.models import Mensalidade, ResumoMensalidade
+
+Totais = namedtuple('Totais', ['quantidade', 'valor'])
+VAZIO = Totais(0, 0.0)
+
+STATUS_PADRAO = 'pendente'
+
+
+def _valores_atuais(mensalidade):
+    """Chave (ano, mês, status) e valor de uma mensalidade como está na sessão"""
+    chave = (
+        mensalidade.ano_referencia,
+        mensalidade.mes_referencia,
+        mensalidade.status or STATUS_PADRAO
+    )
+    return chave, mensalidade.valor or 0.0
+
+
+def _valores_anteriores(session, mensalidade):
+    """Chave e valor da mensalidade como estão gravados no banco"""
+    estado = inspect(mensalidade)
+    anteriores = {}
+    for campo in ('ano_referencia', 'mes_referencia', 'status', 'valor'):
+        historico = estado.attrs[campo].history
+        if historico.deleted:
+            anteriores[campo] = historico.deleted[0]
+        elif historico.unchanged:
+            anteriores[campo] = historico.unchanged[0]
+        elif not historico.added:
+            anteriores[campo] = getattr(mensalidade, campo)
+
+    if len(anteriores) < 4:
+        # Atributo expirado e sobrescrito sem ser carregado: consultar o banco
+        with session.no_autoflush:
+            linha = session.execute(
+                select(
+                    Mensalidade.ano_referencia,
+                    Mensalidade.mes_referencia,
+                    Mensalidade.status,
+                    Mensalidade.valor
+                ).where(Mensalidade.id == estado.identity[0])
+            ).one()
+        anteriores = linha._asdict()
+
+    chave = (
+        anteriores['ano_referencia'],
+        anteriores['mes_referencia'],
+        anteriores['status'] or STATUS_PADRAO
+    )
+    return chave, anteriores['valor'] or 0.0
+
+
+def _acumular(deltas, chave, quantidade, valor):
+    atual = deltas.get(chave, VAZIO)
+    deltas[chave] = Totais(atual.quantidade + quantidade, atual.valor + valor)
+
+
+@event.listens_for(Session, 'before_flush')
+def _coletar_deltas(session, flush_context, instances):
+    """Calcula as variações do resumo a partir das mensalidades pendentes de flush"""
+    deltas = session.info.setdefault('resumo_mensalidade', {})
+
+    for obj in session.new:
+        if isinstance(obj, Mensalidade):
+            chave, valor = _valores_atuais(obj)
+            _acumular(deltas, chave, 1, valor)
+
+    for obj in session.deleted:
+        if isinstance(obj, Mensalidade):
+            chave, valor = _valores_anteriores(session, obj)
+            _acumular(deltas, chave, -1, -valor)
+
+    for obj in session.dirty:
+        if isinstance(obj, Mensalidade) and session.is_modified(obj):
+            chave_antiga, valor_antigo = _valores_anteriores(session, obj)
+            chave_nova, valor_novo = _valores_atuais(obj)
+            if chave_antiga == chave_nova and valor_antigo == valor_novo:
+                continue
+            _acumular(deltas, chave_antiga, -1, -valor_antigo)
+            _acumular(deltas, chave_nova, 1, valor_novo)
+
+
+@event.listens_for(Session, 'after_flush')
+def _aplicar_deltas(session, flush_context):
+    """Grava as variações do resumo na mesma transação do flush"""
+    deltas = session.info.pop('resumo_mensalidade', None)
+    if not deltas:
+        return
+
+    conexao = session.connection()
+    for (ano, mes, status), delta in deltas.items():
+        if delta.quantidade == 0 and delta.valor == 0:
+            continue
+        resultado = conexao.execute(
+            update(ResumoMensalidade)
+            .where(
+                ResumoMensalidade.ano == ano,
+                ResumoMensalidade.mes == mes,
+                ResumoMensalidade.status == status
+            )
+            .values(
+                quantidade=ResumoMensalidade.quantidade + delta.quantidade,
+                valor_total=ResumoMensalidade.valor_total + delta.valor
+            )
+        )
+        if resultado.rowcount == 0:
+            conexao.execute(
+                insert(ResumoMensalidade).values(
+                    ano=ano,
+                    mes=mes,
+                    status=status,
+                    quantidade=delta.quantidade,
+                    valor_total=delta.valor
+                )
+            )
+
+
+@event.listens_for(Session, 'after_rollback')
+def _descartar_deltas(session):
+    session.info.pop('resumo_mensalidade', None)
+
+
+def _agregar(*criterios):
+    """INSERT ... SELECT com os totais das mensalidades que atendem aos critérios"""
+    status = func.coalesce(Mensalidade.status, STATUS_PADRAO)
+    agregado = (
+        select(
+            Mensalidade.ano_referencia,
+            Mensalidade.mes_referencia,
+            status,
+            func.count(Mensalidade.id),
+            func.coalesce(func.sum(Mensalidade.valor), 0.0)
+        )
+        .where(*criterios)
+        .group_by(Mensalidade.ano_referencia, Mensalidade.mes_referencia, status)
+    )
+    return insert(ResumoMensalidade).from_select(
+        ['ano', 'mes', 'status', 'quantidade', 'valor_total'],
+        agregado
+    )
+
+
+@event.listens_for(db.metadata, 'after_create')
+def _popular_resumo(metadata, conexao, tables=(), **kw):
+    """Preenche o resumo quando a tabela é criada num banco já em uso"""
+    if ResumoMensalidade.__table__ in tables:
+        conexao.execute(_agregar())
+
+
+def reconstruir(ano=None, mes=None):
+    """Recalcula o resumo a partir das mensalidades (todas ou de um mês/ano)"""
+    criterios_resumo = []
+    criterios_mensalidade = []
+    if ano is not None:
+        criterios_resumo.append(ResumoMensalidade.ano == ano)
+        criterios_mensalidade.append(Mensalidade.ano_referencia == ano)
+    if mes is not None:
+        criterios_resumo.append(ResumoMensalidade.mes == mes)
+        criterios_mensalidade.append(Mensalidade.mes_referencia == mes)
+
+    db.session.execute(delete(ResumoMensalidade).where(*criterios_resumo))
+    db.session.execute(_agregar(*criterios_mensalidade))
+
+
+def resumo_mes(ano, mes):
+    """Totais do mês por status: {status: Totais(quantidade, valor)}"""
+    linhas = db.session.execute(
+        select(
+            ResumoMensalidade.status,
+            ResumoMensalidade.quantidade,
+            ResumoMensalidade.valor_total
+        ).where(
+            ResumoMensalidade.ano == ano,
+            ResumoMensalidade.mes == mes
+        )
+    )
+    return {status: Totais(quantidade, valor) for status, quantidade, valor in linhas}
+
+
+def total_status(status):
+    """Totais de um status somando todos os meses"""
+    quantidade, valor = db.session.execute(
+        select(
+            func.coalesce(func.sum(ResumoMensalidade.quantidade), 0),
+            func.coalesce(func.sum(ResumoMensalidade.valor_total), 0.0)
+        ).where(ResumoMensalidade.status == status)
+    ).one()
+    return Totais(quantidade, valor)
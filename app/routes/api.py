@@ -0,0 +1,341 @@
+"""
+API JSON (/api/v1) para atualizações parciais das páginas.
+
+As telas enviam as ações (pagar uma mensalidade, lançar uma transação,
+inativar um desbravador) por fetch e atualizam apenas as linhas afetadas,
+em vez de seguir um redirect que renderiza a página inteira de novo.
+
+Listagens aceitam ?campos=a,b (apenas essas colunas são lidas do banco),
+?por_pagina= e ?cursor= (paginação por chave de app.paginacao) e
+respondem {"dados": [...], "proximo": cursor, "anterior": cursor}. O JSON
+vai sem espaços nem escapes de acentos (também com DEBUG) e as datas em
+ISO 8601. Leituras usam o ETag de app.condicional.
+
+Somente administradores; sem login a resposta é 401 em JSON, não um
+redirect. Escritas exigem corpo JSON (Content-Type: application/json), que
+um formulário de outro site não consegue enviar.
+"""
+
+import math
+from datetime import date, datetime, timedelta
+from flask import Blueprint, current_app, request, abort
+from flask_login import current_user
+from werkzeug.exceptions import HTTPException
+from app import db, busca
+from app.models import User, Desbravador, Mensalidade, Transacao, Evento
+from app.mensalidades import pagar_mensalidades
+from app.resumos import resumo_mes
+from app.consultas import estatisticas_mensalidades
+from app.paginacao import paginar, paginar_por_posicao
+from app.condicional import depende_de
+
+api_bp = Blueprint('api', __name__)
+
+POR_PAGINA = 20
+POR_PAGINA_MAXIMO = 100
+
+# Campos de cada recurso (nome na resposta: coluna) e os enviados sem ?campos=
+CAMPOS_DESBRAVADOR = {coluna.key: coluna for coluna in (
+    Desbravador.id, Desbravador.nome, Desbravador.idade, Desbravador.data_nascimento,
+    Desbravador.unidade, Desbravador.classe, Desbravador.telefone, Desbravador.email,
+    Desbravador.endereco, Desbravador.nome_responsavel, Desbravador.telefone_responsavel,
+    Desbravador.data_cadastro, Desbravador.ativo,
+)}
+PADRAO_DESBRAVADOR = ('id', 'nome', 'unidade', 'classe')
+
+# nome, unidade e classe vêm do desbravador (JOIN apenas quando pedidos)
+CAMPOS_MENSALIDADE = {coluna.key: coluna for coluna in (
+    Mensalidade.id, Mensalidade.desbravador_id, Mensalidade.mes_referencia,
+    Mensalidade.ano_referencia, Mensalidade.valor, Mensalidade.status,
+    Mensalidade.data_pagamento, Mensalidade.observacoes,
+    Desbravador.nome, Desbravador.unidade, Desbravador.classe,
+)}
+PADRAO_MENSALIDADE = ('id', 'desbravador_id', 'valor', 'status', 'data_pagamento')
+
+CAMPOS_TRANSACAO = {coluna.key: coluna for coluna in (
+    Transacao.id, Transacao.tipo, Transacao.categoria, Transacao.descricao,
+    Transacao.valor, Transacao.data_transacao, Transacao.observacoes,
+)}
+PADRAO_TRANSACAO = ('id', 'tipo', 'categoria', 'descricao', 'valor', 'data_transacao')
+
+CAMPOS_EVENTO = {coluna.key: coluna for coluna in (
+    Evento.id, Evento.nome, Evento.descricao, Evento.data_inicio, Evento.data_fim,
+    Evento.local, Evento.tipo, Evento.custo,
+)}
+PADRAO_EVENTO = ('id', 'nome', 'data_inicio', 'local', 'tipo')
+
+TIPOS_TRANSACAO = ('receita', 'despesa')
+
+
+@api_bp.before_request
+def exigir_administrador():
+    if not current_user.is_authenticated:
+        abort(401, description='Faça login para usar a API.')
+    if not isinstance(current_user, User):
+        abort(403, description='Acesso restrito aos administradores.')
+
+
+@api_bp.errorhandler(HTTPException)
+def erro_http(erro):
+    return _json({'erro': erro.description}, erro.code)
+
+
+# Leitura dos parâmetros e montagem das respostas
+
+def _campos(disponiveis, padrao):
+    """Campos pedidos em ?campos=a,b (ou os padrão); 400 para campos desconhecidos"""
+    pedidos = request.args.get('campos', '', type=str)
+    if not pedidos:
+        return list(padrao)
+    campos = list(dict.fromkeys(campo.strip() for campo in pedidos.split(',') if campo.strip()))
+    desconhecidos = [campo for campo in campos if campo not in disponiveis]
+    if desconhecidos or not campos:
+        abort(400, description=f'Campos disponíveis: {", ".join(disponiveis)}.')
+    return campos
+
+
+def _colunas(disponiveis, campos, chave):
+    """Colunas a selecionar: os campos pedidos mais as da chave de ordenação"""
+    colunas = [disponiveis[campo] for campo in campos]
+    return colunas + [coluna for coluna in chave if coluna.key not in campos]
+
+
+def _json(dados, status=200):
+    corpo = current_app.json.dumps(dados, ensure_ascii=False, separators=(',', ':'))
+    return current_app.response_class(corpo, status=status, mimetype='application/json')
+
+
+def _valor(valor):
+    if isinstance(valor, datetime):
+        return valor.isoformat(timespec='seconds')
+    if isinstance(valor, date):
+        return valor.isoformat()
+    return valor
+
+
+def _serializar(item, campos):
+    return {campo: _valor(getattr(item, campo)) for campo in campos}
+
+
+def _pagina(pagina, campos):
+    return _json({
+        'dados': [_serializar(item, campos) for item in pagina.itens],
+        'proximo': pagina.proximo,
+        'anterior': pagina.anterior,
+    })
+
+
+def _por_pagina():
+    por_pagina = request.args.get('por_pagina', POR_PAGINA, type=int)
+    return min(max(por_pagina, 1), POR_PAGINA_MAXIMO)
+
+
+def _data(texto, campo):
+    """date/datetime de um texto ISO 8601 (AAAA-MM-DD); 400 se inválido"""
+    try:
+        return datetime.fromisoformat(texto)
+    except (TypeError, ValueError):
+        abort(400, description=f'{campo}: use uma data no formato AAAA-MM-DD.')
+
+
+def _dados():
+    """Corpo JSON da requisição (objeto); 415 se não for JSON"""
+    if not request.is_json:
+        abort(415, description='Envie os dados em JSON (Content-Type: application/json).')
+    dados = request.get_json(silent=True)
+    if dados is None:
+        dados = {}
+    if not isinstance(dados, dict):
+        abort(400, description='O corpo deve ser um objeto JSON.')
+    return dados
+
+
+# Desbravadores
+
+@api_bp.route('/desbravadores')
+@depende_de('desbravador')
+def listar_desbravadores():
+    """Desbravadores ativos por nome (?busca= ordena por relevância)"""
+    campos = _campos(CAMPOS_DESBRAVADOR, PADRAO_DESBRAVADOR)
+    chave = [Desbravador.nome, Desbravador.id]
+    query = db.session.query(*_colunas(CAMPOS_DESBRAVADOR, campos, chave)).filter(Desbravador.ativo == True)
+    cursor = request.args.get('cursor', '', type=str)
+    termo = request.args.get('busca', '', type=str).strip()
+
+    if termo:
+        pagina = paginar_por_posicao(busca.filtrar(query, termo), cursor=cursor, por_pagina=_por_pagina())
+    else:
+        pagina = paginar(query, chave, cursor=cursor, por_pagina=_por_pagina())
+    return _pagina(pagina, campos)
+
+
+@api_bp.route('/desbravadores/<int:id>')
+@depende_de('desbravador')
+def obter_desbravador(id):
+    campos = _campos(CAMPOS_DESBRAVADOR, PADRAO_DESBRAVADOR)
+    item = db.session.query(*[CAMPOS_DESBRAVADOR[campo] for campo in campos]).filter(Desbravador.id == id).first()
+    if item is None:
+        abort(404, description='Desbravador não encontrado.')
+    return _json(_serializar(item, campos))
+
+
+@api_bp.route('/desbravadores/<int:id>/inativar', methods=['POST'])
+def inativar_desbravador(id):
+    _dados()
+    desbravador = db.session.get(Desbravador, id)
+    if desbravador is None:
+        abort(404, description='Desbravador não encontrado.')
+    desbravador.ativo = False
+    db.session.commit()
+    return _json({'id': id, 'ativo': False})
+
+
+# Mensalidades
+
+@api_bp.route('/mensalidades')
+@depende_de('mensalidade', 'desbravador')
+def listar_mensalidades():
+    """Mensalidades de um mês (?ano=&mes=, padrão o atual), ?status= e ?desbravador_id="""
+    hoje = date.today()
+    ano = request.args.get('ano', hoje.year, type=int)
+    mes = request.args.get('mes', hoje.month, type=int)
+    status = request.args.get('status', '', type=str)
+    desbravador_id = request.args.get('desbravador_id', type=int)
+
+    campos = _campos(CAMPOS_MENSALIDADE, PADRAO_MENSALIDADE)
+    chave = [Mensalidade.id]
+    query = db.session.query(*_colunas(CAMPOS_MENSALIDADE, campos, chave)).select_from(Mensalidade).filter(
+        Mensalidade.ano_referencia == ano,
+        Mensalidade.mes_referencia == mes
+    )
+    if any(CAMPOS_MENSALIDADE[campo].class_ is Desbravador for campo in campos):
+        query = query.join(Desbravador, Mensalidade.desbravador_id == Desbravador.id)
+    if status:
+        query = query.filter(Mensalidade.status == status)
+    if desbravador_id is not None:
+        query = query.filter(Mensalidade.desbravador_id == desbravador_id)
+
+    pagina = paginar(query, chave, cursor=request.args.get('cursor', '', type=str), por_pagina=_por_pagina())
+    return _pagina(pagina, campos)
+
+
+def _resposta_pagamento(resultado):
+    """Mensalidades pagas e os novos totais de cada mês afetado (tabela de resumo)"""
+    meses = []
+    for ano, mes in resultado['meses']:
+        stats = estatisticas_mensalidades(resumo_mes(ano, mes))
+        meses.append({
+            'ano': ano,
+            'mes': mes,
+            'pagas': stats['pagas'],
+            'pendentes': stats['pendentes'],
+            'atrasadas': stats['atrasadas'],
+            'valor_pago': stats['valor_pago'],
+            'valor_total': stats['valor_total'],
+        })
+    return _json({
+        'pagas': resultado['pagas'],
+        'valor_total': resultado['valor_total'],
+        'ids': resultado['ids'],
+        'data_pagamento': _valor(resultado['data_pagamento']),
+        'meses': meses,
+    })
+
+
+@api_bp.route('/mensalidades/<int:id>/pagar', methods=['POST'])
+def pagar_mensalidade(id):
+    _dados()
+    resultado = pagar_mensalidades(ids=[id])
+    if not resultado['pagas']:
+        if db.session.get(Mensalidade, id) is None:
+            abort(404, description='Mensalidade não encontrada.')
+        abort(409, description='Esta mensalidade já estava paga.')
+    return _resposta_pagamento(resultado)
+
+
+@api_bp.route('/mensalidades/pagar', methods=['POST'])
+def pagar_mensalidades_lote():
+    """Paga {"ids": [...]} ou todas as pendentes de {"mes": m, "ano": a}; "ids": [] não paga nada"""
+    dados = _dados()
+    ids = dados.get('ids')
+    if ids is not None and not (isinstance(ids, list) and all(type(i) is int for i in ids)):
+        abort(400, description='ids: envie uma lista de números inteiros.')
+    try:
+        mes = int(dados['mes']) if dados.get('mes') is not None else None
+        ano = int(dados['ano']) if dados.get('ano') is not None else None
+        resultado = pagar_mensalidades(ids=ids, ano=ano, mes=mes)
+    except (TypeError, ValueError) as e:
+        abort(400, description=str(e))
+    return _resposta_pagamento(resultado)
+
+
+# Transações
+
+@api_bp.route('/transacoes')
+@depende_de('transacao')
+def listar_transacoes():
+    """Transações da mais recente para a mais antiga (?tipo=receita|despesa)"""
+    tipo = request.args.get('tipo', '', type=str)
+    campos = _campos(CAMPOS_TRANSACAO, PADRAO_TRANSACAO)
+    chave = [Transacao.data_transacao, Transacao.id]
+    query = db.session.query(*_colunas(CAMPOS_TRANSACAO, campos, chave))
+    if tipo:
+        query = query.filter(Transacao.tipo == tipo)
+
+    pagina = paginar(query, chave, cursor=request.args.get('cursor', '', type=str),
+                     por_pagina=_por_pagina(), decrescente=True)
+    return _pagina(pagina, campos)
+
+
+@api_bp.route('/transacoes', methods=['POST'])
+def criar_transacao():
+    dados = _dados()
+    if dados.get('tipo') not in TIPOS_TRANSACAO:
+        abort(400, description='tipo: use receita ou despesa.')
+    for campo in ('categoria', 'descricao'):
+        if not str(dados.get(campo) or '').strip():
+            abort(400, description=f'{campo}: campo obrigatório.')
+    try:
+        valor = float(dados.get('valor'))
+    except (TypeError, ValueError):
+        valor = 0.0
+    if not (math.isfinite(valor) and valor > 0):
+        abort(400, description='valor: informe um valor positivo.')
+    observacoes = dados.get('observacoes', '')
+    if observacoes is not None and not isinstance(observacoes, str):
+        abort(400, description='observacoes: envie um texto.')
+
+    transacao = Transacao(
+        tipo=dados['tipo'],
+        categoria=str(dados['categoria']).strip(),
+        descricao=str(dados['descricao']).strip(),
+        valor=valor,
+        data_transacao=_data(dados.get('data_transacao'), 'data_transacao'),
+        observacoes=observacoes
+    )
+    db.session.add(transacao)
+    db.session.flush()
+    # Serializada antes do commit, que expira os atributos (evita recarregá-los)
+    corpo = _serializar(transacao, _campos(CAMPOS_TRANSACAO, PADRAO_TRANSACAO))
+    db.session.commit()
+    return _json(corpo, 201)
+
+
+# Eventos
+
+@api_bp.route('/eventos')
+@depende_de('evento')
+def listar_eventos():
+    """Eventos ativos a partir de ?de= (padrão: hoje) e até ?ate= (inclusive), se informado"""
+    de = _data(request.args['de'], 'de') if request.args.get('de') else datetime.combine(date.today(), datetime.min.time())
+    campos = _campos(CAMPOS_EVENTO, PADRAO_EVENTO)
+    chave = [Evento.data_inicio, Evento.id]
+    query = db.session.query(*_colunas(CAMPOS_EVENTO, campos, chave)).filter(
+        Evento.ativo == True,
+        Evento.data_inicio >= de
+    )
+    if request.args.get('ate'):
+        query = query.filter(Evento.data_inicio < _data(request.args['ate'], 'ate') + timedelta(days=1))
+
+    pagina = paginar(query, chave, cursor=request.args.get('cursor', '', type=str), por_pagina=_por_pagina())
+    return _pagina(pagina, campos)
@@ -1,12 +1,16 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_user, logout_user, login_required, current_user
-from werkzeug.security import check_password_hash, generate_password_hash
 from app.models import User, Desbravador, Mensalidade, Transacao
-from app import db
+from app import db, senhas
 from datetime import datetime, date
 
 auth_bp = Blueprint('auth', __name__)
 
+def _ocupado(template):
+    """Resposta quando a fila de verificação de senhas está cheia"""
+    flash('Muitos acessos ao mesmo tempo. Tente novamente em alguns segundos.', 'warning')
+    return render_template(template), 503, {'Retry-After': '5'}
+
 @auth_bp.route('/login', methods=['GET', 'POST'])
 def login():
     """Rota para login de usuários"""
@@ -16,7 +20,13 @@ def login():
         
         user = User.query.filter_by(username=username).first()
         
-        if user and check_password_hash(user.password_hash, password):
+        try:
+            senha_confere = user is not None and senhas.verificar(user.password_hash, password)
+        except senhas.Ocupado:
+            return _ocupado('auth/login.html')
+        
+        if senha_confere:
+            senhas.atualizar_se_preciso(user, password)
             login_user(user)
             flash('Login realizado com sucesso!', 'success')
             return redirect(url_for('main.dashboard'))
@@ -52,11 +62,16 @@ def register():
             flash('Email já cadastrado!', 'error')
             return render_template('auth/register.html')
         
+        try:
+            password_hash = senhas.gerar(password)
+        except senhas.Ocupado:
+            return _ocupado('auth/register.html')
+        
         # Criar novo usuário
         new_user = User(
             username=username,
             email=email,
-            password_hash=generate_password_hash(password),
+            password_hash=password_hash,
             nome_completo=nome_completo,
             cargo=cargo
         )
@@ -78,7 +93,14 @@ def desbravador_login():
         
         desbravador = Desbravador.query.filter_by(username=username).first()
         
-        if desbravador and desbravador.pode_fazer_login and check_password_hash(desbravador.password_hash, password):
+        try:
+            senha_confere = (desbravador is not None and desbravador.pode_fazer_login
+                             and senhas.verificar(desbravador.password_hash, password))
+        except senhas.Ocupado:
+            return _ocupado('auth/desbravador_login.html')
+        
+        if senha_confere:
+            senhas.atualizar_se_preciso(desbravador, password)
             login_user(desbravador)
             flash(f'Bem-vindo, {desbravador.nome}!', 'success')
             return redirect(url_for('desbravador.dashboard'))
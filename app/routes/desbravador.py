@@ -2,6 +2,7 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_required, current_user
 from app.models import Desbravador, Evento
 from app import db
+from app.condicional import depende_de
 from datetime import datetime, date
 import calendar
 
@@ -9,6 +10,7 @@ desbravador_bp = Blueprint('desbravador', __name__)
 
 @desbravador_bp.route('/desbravador/dashboard')
 @login_required
+@depende_de('evento')
 def dashboard():
     """Dashboard para desbravadores com acesso restrito"""
     # Verificar se é um desbravador logado
@@ -58,6 +60,7 @@ def dashboard():
 
 @desbravador_bp.route('/desbravador/calendario')
 @login_required
+@depende_de('evento')
 def calendario():
     """Página de calendário completo para desbravadores"""
     # Verificar se é um desbravador logado
@@ -114,6 +117,7 @@ def calendario():
 
 @desbravador_bp.route('/desbravador/perfil')
 @login_required
+@depende_de('especialidade')
 def perfil():
     """Perfil do desbravador"""
     # Verificar se é um desbravador logado
@@ -1,31 +1,61 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
-from flask_login import login_required
-from app.models import Desbravador, Mensalidade
-from app import db
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, abort
+from flask_login import login_required, current_user
+from app.models import Desbravador, Mensalidade, User
+from app import db, busca, referencias, importacao
+from app.paginacao import paginar, paginar_por_posicao, total_aproximado
+from app.condicional import depende_de
+from sqlalchemy.orm import selectinload
 from datetime import datetime, date
-import json
 
 desbravadores_bp = Blueprint('desbravadores', __name__)
 
 @desbravadores_bp.route('/')
 @login_required
+@depende_de('desbravador', 'especialidade')
 def listar():
     """Lista todos os desbravadores"""
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor', '', type=str)
     search = request.args.get('search', '', type=str)
+    especialidade = request.args.get('especialidade', '', type=str)
     
     query = Desbravador.query.filter_by(ativo=True)
     
-    if search:
-        query = query.filter(Desbravador.nome.contains(search))
+    if especialidade:
+        query = referencias.com_especialidade(query, especialidade)
     
-    desbravadores = query.order_by(Desbravador.nome).paginate(
-        page=page, per_page=10, error_out=False
-    )
+    if search:
+        # Resultados de busca seguem a ordem de relevância
+        desbravadores = paginar_por_posicao(busca.filtrar(query, search),
+                                            cursor=cursor, por_pagina=10)
+    else:
+        desbravadores = paginar(query, [Desbravador.nome, Desbravador.id],
+                                cursor=cursor, por_pagina=10)
+        desbravadores = desbravadores._replace(
+            total=total_aproximado(query, 'desbravador', f'ativos:{especialidade}'))
     
     return render_template('desbravadores/listar.html', 
                          desbravadores=desbravadores, 
-                         search=search)
+                         search=search,
+                         especialidade=especialidade,
+                         especialidades=referencias.especialidades())
+
+@desbravadores_bp.route('/sugestoes')
+@login_required
+def sugestoes():
+    """Sugestões de desbravadores para o campo de busca (JSON)"""
+    termo = request.args.get('q', '', type=str).strip()
+    if len(termo) < 2:
+        return jsonify([])
+    
+    return jsonify([
+        {
+            'id': id,
+            'nome': nome,
+            'unidade': unidade,
+            'url': url_for('desbravadores.visualizar', id=id)
+        }
+        for id, nome, unidade in busca.sugerir(termo)
+    ])
 
 @desbravadores_bp.route('/cadastrar', methods=['GET', 'POST'])
 @login_required
@@ -50,7 +80,7 @@ def cadastrar():
                 data_nascimento=data_nascimento,
                 unidade=request.form['unidade'],
                 classe=request.form['classe'],
-                especialidades=json.dumps(especialidades),
+                especialidades=referencias.por_nome(especialidades),
                 telefone=request.form.get('telefone', ''),
                 email=request.form.get('email', ''),
                 endereco=request.form.get('endereco', ''),
@@ -68,31 +98,67 @@ def cadastrar():
             db.session.rollback()
             flash(f'Erro ao cadastrar desbravador: {str(e)}', 'error')
     
-    # Lista de especialidades disponíveis (baseada no site MDA)
-    especialidades_disponiveis = [
-        'ADRA', 'Artes e Habilidades Manuais', 'Atividades Agrícolas',
-        'Atividades Missionárias e Comunitárias', 'Atividades Profissionais',
-        'Atividades Recreativas', 'Ciência e Saúde', 'Estudos da Natureza',
-        'Habilidades Domésticas'
-    ]
-    
-    unidades_disponiveis = [
-        'Amigo', 'Companheiro', 'Pesquisador', 'Pioneiro', 
-        'Excursionista', 'Guia', 'Líder', 'Líder Master', 'Líder Master Avançado'
-    ]
-    
     return render_template('desbravadores/cadastrar.html',
-                         especialidades=especialidades_disponiveis,
-                         unidades=unidades_disponiveis)
+                         especialidades=referencias.especialidades(),
+                         unidades=referencias.unidades(),
+                         classes=referencias.CLASSES)
+
+@desbravadores_bp.route('/importar', methods=['GET', 'POST'])
+@login_required
+def importar():
+    """Importação de desbravadores em lote a partir de CSV ou XLSX (somente administradores)"""
+    if not isinstance(current_user, User):
+        abort(403)
+    if request.method == 'POST':
+        arquivo = request.files.get('arquivo')
+        if arquivo is None or not arquivo.filename:
+            flash('Selecione o arquivo a importar.', 'error')
+        else:
+            try:
+                identificador = importacao.iniciar(arquivo, simular=bool(request.form.get('simular')))
+                return redirect(url_for('desbravadores.acompanhar_importacao', identificador=identificador))
+            except ValueError as e:
+                flash(str(e), 'error')
+    
+    return render_template('desbravadores/importar.html',
+                         xlsx=importacao.disponivel_xlsx(),
+                         unidades=referencias.unidades(),
+                         classes=referencias.CLASSES,
+                         especialidades=referencias.especialidades())
+
+@desbravadores_bp.route('/importar/<identificador>')
+@login_required
+def acompanhar_importacao(identificador):
+    """Andamento e resultado de uma importação (somente administradores)"""
+    if not isinstance(current_user, User):
+        abort(403)
+    estado = importacao.situacao(identificador)
+    if estado is None:
+        abort(404)
+    return render_template('desbravadores/importacao.html', identificador=identificador, estado=estado)
+
+@desbravadores_bp.route('/importar/<identificador>/progresso')
+@login_required
+def progresso_importacao(identificador):
+    """Andamento de uma importação (JSON, somente administradores)"""
+    if not isinstance(current_user, User):
+        abort(403)
+    estado = importacao.situacao(identificador)
+    if estado is None:
+        abort(404)
+    return jsonify(estado)
 
 @desbravadores_bp.route('/<int:id>')
 @login_required
+@depende_de('desbravador', 'mensalidade', 'especialidade')
 def visualizar(id):
     """Visualizar detalhes de um desbravador"""
-    desbravador = Desbravador.query.get_or_404(id)
-    
-    # Carregar especialidades
-    especialidades = json.loads(desbravador.especialidades) if desbravador.especialidades else []
+    # Especialidades em uma segunda consulta pela chave da associação (um JOIN
+    # aninhado com a associação levaria o SQLite a percorrê-la inteira)
+    desbravador = Desbravador.query.options(
+        selectinload(Desbravador.especialidades)
+    ).get_or_404(id)
+    especialidades = [especialidade.nome for especialidade in desbravador.especialidades]
     
     # Carregar mensalidades
     mensalidades = Mensalidade.query.filter_by(desbravador_id=id).order_by(
@@ -129,7 +195,7 @@ def editar(id):
             desbravador.data_nascimento = data_nascimento
             desbravador.unidade = request.form['unidade']
             desbravador.classe = request.form['classe']
-            desbravador.especialidades = json.dumps(especialidades)
+            desbravador.especialidades = referencias.por_nome(especialidades)
             desbravador.telefone = request.form.get('telefone', '')
             desbravador.email = request.form.get('email', '')
             desbravador.endereco = request.form.get('endereco', '')
@@ -146,25 +212,14 @@ def editar(id):
             flash(f'Erro ao atualizar desbravador: {str(e)}', 'error')
     
     # Carregar especialidades atuais
-    especialidades_atuais = json.loads(desbravador.especialidades) if desbravador.especialidades else []
-    
-    especialidades_disponiveis = [
-        'ADRA', 'Artes e Habilidades Manuais', 'Atividades Agrícolas',
-        'Atividades Missionárias e Comunitárias', 'Atividades Profissionais',
-        'Atividades Recreativas', 'Ciência e Saúde', 'Estudos da Natureza',
-        'Habilidades Domésticas'
-    ]
-    
-    unidades_disponiveis = [
-        'Amigo', 'Companheiro', 'Pesquisador', 'Pioneiro', 
-        'Excursionista', 'Guia', 'Líder', 'Líder Master', 'Líder Master Avançado'
-    ]
+    especialidades_atuais = {especialidade.nome for especialidade in desbravador.especialidades}
     
     return render_template('desbravadores/editar.html',
                          desbravador=desbravador,
-                         especialidades_disponiveis=especialidades_disponiveis,
+                         especialidades_disponiveis=referencias.especialidades(),
                          especialidades_atuais=especialidades_atuais,
-                         unidades=unidades_disponiveis)
+                         unidades=referencias.unidades(),
+                         classes=referencias.CLASSES)
 
 @desbravadores_bp.route('/<int:id>/inativar', methods=['POST'])
 @login_required
@@ -1,131 +1,160 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, abort
 from flask_login import login_required
 from app.models import Desbravador, Mensalidade, Transacao
-from app import db
+from app import db, cache, extratos, importacao, tarefas
+from app.resumos import resumo_mes, VAZIO
+from app.consultas import totais_mensalidades_mes, estatisticas_mensalidades
+from app import saldos
+from app.mensalidades import pagar_mensalidades
+from app.saldos import intervalo_mes
+from app.paginacao import paginar, total_aproximado
+from app.condicional import depende_de
+from sqlalchemy import select
+from sqlalchemy.orm import contains_eager
 from datetime import datetime, date
 import calendar
+import json
+import os
 
 financeiro_bp = Blueprint('financeiro', __name__)
 
-@financeiro_bp.route('/')
-@login_required
-def dashboard():
-    """Dashboard financeiro"""
-    mes_atual = datetime.now().month
-    ano_atual = datetime.now().year
-    
+def _dados_dashboard(ano_atual, mes_atual):
+    """Estatísticas do dashboard financeiro (guardadas em cache)"""
     # Estatísticas do mês atual
-    mensalidades_pagas = Mensalidade.query.filter_by(
-        mes_referencia=mes_atual,
-        ano_referencia=ano_atual,
-        status='pago'
-    ).count()
-    
-    mensalidades_pendentes = Mensalidade.query.filter_by(
-        mes_referencia=mes_atual,
-        ano_referencia=ano_atual,
-        status='pendente'
-    ).count()
-    
-    total_arrecadado = db.session.query(db.func.sum(Mensalidade.valor)).filter_by(
-        mes_referencia=mes_atual,
-        ano_referencia=ano_atual,
-        status='pago'
-    ).scalar() or 0
+    resumo = resumo_mes(ano_atual, mes_atual)
     
     # Transações recentes
-    transacoes_recentes = Transacao.query.order_by(
-        Transacao.data_transacao.desc()
-    ).limit(10).all()
+    transacoes_recentes = db.session.execute(
+        select(Transacao.data_transacao, Transacao.descricao, Transacao.tipo,
+               Transacao.categoria, Transacao.valor)
+        .order_by(Transacao.data_transacao.desc())
+        .limit(10)
+    ).all()
     
     stats = {
-        'mensalidades_pagas': mensalidades_pagas,
-        'mensalidades_pendentes': mensalidades_pendentes,
-        'total_arrecadado': total_arrecadado,
+        'mensalidades_pagas': resumo.get('pago', VAZIO).quantidade,
+        'mensalidades_pendentes': resumo.get('pendente', VAZIO).quantidade,
+        'total_arrecadado': resumo.get('pago', VAZIO).valor,
         'mes_atual': calendar.month_name[mes_atual],
         'ano_atual': ano_atual
     }
     
-    return render_template('financeiro/dashboard.html',
-                         stats=stats,
-                         transacoes_recentes=transacoes_recentes)
+    return {
+        'stats': stats,
+        'transacoes_recentes': [linha._asdict() for linha in transacoes_recentes]
+    }
+
+@financeiro_bp.route('/')
+@login_required
+@depende_de('mensalidade', 'transacao')
+def dashboard():
+    """Dashboard financeiro"""
+    mes_atual = datetime.now().month
+    ano_atual = datetime.now().year
+    dados = cache.memorizar('financeiro', ('mensalidade', 'transacao'),
+                            lambda: _dados_dashboard(ano_atual, mes_atual), ano_atual, mes_atual)
+    
+    return render_template('financeiro/dashboard.html', **dados)
 
 @financeiro_bp.route('/mensalidades')
 @login_required
+@depende_de('mensalidade', 'desbravador')
 def mensalidades():
     """Controle de mensalidades"""
     mes = request.args.get('mes', datetime.now().month, type=int)
     ano = request.args.get('ano', datetime.now().year, type=int)
     
-    # Buscar mensalidades do mês/ano especificado
+    # Buscar mensalidades do mês/ano especificado (desbravador carregado no mesmo JOIN)
     mensalidades = Mensalidade.query.filter_by(
         mes_referencia=mes,
         ano_referencia=ano
-    ).join(Desbravador).order_by(Desbravador.nome).all()
-    
-    # Se não existirem mensalidades para este mês, criar para todos os desbravadores ativos
-    if not mensalidades:
-        desbravadores_ativos = Desbravador.query.filter_by(ativo=True).all()
-        for desbravador in desbravadores_ativos:
-            mensalidade = Mensalidade(
-                desbravador_id=desbravador.id,
-                mes_referencia=mes,
-                ano_referencia=ano,
-                valor=50.0,  # Valor padrão da mensalidade
-                status='pendente'
-            )
-            db.session.add(mensalidade)
-        
-        db.session.commit()
-        
-        # Recarregar mensalidades
-        mensalidades = Mensalidade.query.filter_by(
-            mes_referencia=mes,
-            ano_referencia=ano
-        ).join(Desbravador).order_by(Desbravador.nome).all()
-    
-    # Calcular totais
-    total_pago = sum(m.valor for m in mensalidades if m.status == 'pago')
-    total_pendente = sum(m.valor for m in mensalidades if m.status == 'pendente')
-    total_geral = sum(m.valor for m in mensalidades)
+    ).join(Desbravador).options(
+        contains_eager(Mensalidade.desbravador)
+    ).order_by(Desbravador.nome).all()
+    
+    # Calcular totais no banco em uma única consulta agrupada
+    stats = estatisticas_mensalidades(totais_mensalidades_mes(ano, mes))
+    stats['mes_atual'] = mes
+    stats['ano_atual'] = ano
     
     return render_template('financeiro/mensalidades.html',
                          mensalidades=mensalidades,
                          mes=mes,
                          ano=ano,
-                         total_pago=total_pago,
-                         total_pendente=total_pendente,
-                         total_geral=total_geral)
+                         stats=stats,
+                         total_pago=stats['valor_pago'],
+                         total_pendente=stats['valor_pendente'],
+                         total_geral=stats['valor_total'])
+
+@financeiro_bp.route('/mensalidades/gerar', methods=['POST'])
+@login_required
+def gerar_mensalidades():
+    """Gerar as mensalidades do mês para os desbravadores ativos"""
+    mes = request.form.get('mes', datetime.now().month, type=int)
+    ano = request.form.get('ano', datetime.now().year, type=int)
+    
+    # Em segundo plano: com muitos desbravadores a geração não prende a requisição
+    linha = tarefas.enfileirar('gerar_mensalidades', {'ano': ano, 'mes': mes}, prioridade=tarefas.ALTA)
+    
+    if linha.situacao == tarefas.CONCLUIDA:
+        criadas = json.loads(linha.resultado)['criadas']
+        flash(f'{criadas} mensalidade(s) gerada(s) para {mes}/{ano}.', 'success')
+    else:
+        flash(f'As mensalidades de {mes}/{ano} serão geradas em instantes.', 'info')
+    return redirect(url_for('financeiro.mensalidades', mes=mes, ano=ano))
 
 @financeiro_bp.route('/mensalidades/<int:id>/pagar', methods=['POST'])
 @login_required
 def pagar_mensalidade(id):
     """Registrar pagamento de mensalidade"""
-    mensalidade = Mensalidade.query.get_or_404(id)
+    resultado = pagar_mensalidades(ids=[id])
     
-    mensalidade.status = 'pago'
-    mensalidade.data_pagamento = datetime.now()
+    if resultado['pagas']:
+        flash('Pagamento registrado com sucesso!', 'success')
+    elif db.session.get(Mensalidade, id) is None:
+        abort(404)
+    else:
+        flash('Esta mensalidade já estava paga.', 'info')
+    return redirect(url_for('financeiro.mensalidades'))
+
+@financeiro_bp.route('/mensalidades/pagar-lote', methods=['POST'])
+@login_required
+def pagar_mensalidades_lote():
+    """Registrar pagamento de várias mensalidades em uma única transação
     
-    # Criar transação de receita
-    transacao = Transacao(
-        tipo='receita',
-        categoria='mensalidade',
-        descricao=f'Mensalidade - {mensalidade.desbravador.nome} - {mensalidade.mes_referencia}/{mensalidade.ano_referencia}',
-        valor=mensalidade.valor,
-        data_transacao=datetime.now()
-    )
+    Aceita JSON com {"ids": [...]} ou {"mes": m, "ano": a} para pagar todas
+    as pendentes do mês, e responde com um resumo em JSON. Uma lista de ids
+    vazia não paga nada.
+    """
+    if request.is_json:
+        dados = request.get_json(silent=True)
+        if not isinstance(dados, dict):
+            return jsonify({'erro': 'O corpo deve ser um objeto JSON.'}), 400
+        ids = dados.get('ids')
+        if ids is not None and not (isinstance(ids, list) and all(type(i) is int for i in ids)):
+            return jsonify({'erro': 'ids deve ser uma lista de números inteiros.'}), 400
+    else:
+        dados = request.form
+        ids = dados.getlist('ids') or None
+    mes = dados.get('mes')
+    ano = dados.get('ano')
     
-    db.session.add(transacao)
-    db.session.commit()
+    try:
+        ids = [int(i) for i in ids] if ids is not None else None
+        mes = int(mes) if mes is not None else None
+        ano = int(ano) if ano is not None else None
+        resultado = pagar_mensalidades(ids=ids, ano=ano, mes=mes)
+    except (TypeError, ValueError) as e:
+        return jsonify({'erro': str(e)}), 400
     
-    flash('Pagamento registrado com sucesso!', 'success')
-    return redirect(url_for('financeiro.mensalidades'))
+    return jsonify(resultado)
 
 @financeiro_bp.route('/transacoes')
 @login_required
+@depende_de('transacao')
 def transacoes():
     """Lista de transações financeiras"""
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor', '', type=str)
     tipo = request.args.get('tipo', '', type=str)
     
     query = Transacao.query
@@ -133,9 +162,9 @@ def transacoes():
     if tipo:
         query = query.filter_by(tipo=tipo)
     
-    transacoes = query.order_by(Transacao.data_transacao.desc()).paginate(
-        page=page, per_page=20, error_out=False
-    )
+    transacoes = paginar(query, [Transacao.data_transacao, Transacao.id],
+                         cursor=cursor, por_pagina=20, decrescente=True)
+    transacoes = transacoes._replace(total=total_aproximado(query, 'transacao', tipo))
     
     return render_template('financeiro/transacoes.html',
                          transacoes=transacoes,
@@ -178,19 +207,41 @@ def nova_transacao():
                          categorias_receita=categorias_receita,
                          categorias_despesa=categorias_despesa)
 
+@financeiro_bp.route('/extratos/importar', methods=['GET', 'POST'])
+@login_required
+def importar_extrato():
+    """Importar extrato bancário (OFX/CSV) e conciliar mensalidades"""
+    resumo = None
+    if request.method == 'POST':
+        arquivo = request.files.get('arquivo')
+        if arquivo is None or not arquivo.filename:
+            flash('Selecione o extrato a importar.', 'error')
+        else:
+            caminho = None
+            try:
+                caminho, formato = importacao.salvar_envio(arquivo, extratos.FORMATOS)
+                resumo = extratos.processar(caminho, formato, simular=bool(request.form.get('simular')))
+            except ValueError as e:
+                db.session.rollback()
+                flash(str(e), 'error')
+            finally:
+                if caminho:
+                    os.remove(caminho)
+    
+    return render_template('financeiro/importar_extrato.html', resumo=resumo)
+
 @financeiro_bp.route('/fluxo-caixa')
 @login_required
+@depende_de('transacao')
 def fluxo_caixa():
     """Relatório de fluxo de caixa"""
     mes = request.args.get('mes', datetime.now().month, type=int)
     ano = request.args.get('ano', datetime.now().year, type=int)
+    if not 1 <= mes <= 12:
+        abort(400)
     
     # Buscar transações do mês
-    inicio_mes = datetime(ano, mes, 1)
-    if mes == 12:
-        fim_mes = datetime(ano + 1, 1, 1)
-    else:
-        fim_mes = datetime(ano, mes + 1, 1)
+    inicio_mes, fim_mes = intervalo_mes(ano, mes)
     
     transacoes = Transacao.query.filter(
         Transacao.data_transacao >= inicio_mes,
@@ -198,7 +249,7 @@ def fluxo_caixa():
     ).order_by(Transacao.data_transacao).all()
     
     # Calcular saldo
-    saldo_inicial = 0  # Implementar cálculo do saldo inicial
+    saldo_inicial = saldos.saldo_inicial(ano, mes)
     saldo_atual = saldo_inicial
     
     for transacao in transacoes:
@@ -1,9 +1,13 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask import Blueprint, current_app, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
 from app.models import Desbravador, Mensalidade, Transacao, User
-from app import db
+from app import db, cache, profiling
+from app.resumos import resumo_mes, total_status, VAZIO
+from app.condicional import depende_de
+from sqlalchemy import select
 from datetime import datetime, date
 import json
+import os
 
 main_bp = Blueprint('main', __name__)
 
@@ -14,56 +18,46 @@ def index():
         return redirect(url_for('main.dashboard'))
     return redirect(url_for('auth.login'))
 
-@main_bp.route('/dashboard')
-@login_required
-def dashboard():
-    """Dashboard principal do sistema"""
-    # Estatísticas para o dashboard
+def _dados_dashboard(ano_atual, mes_atual):
+    """Estatísticas do dashboard principal (guardadas em cache)"""
     total_desbravadores = Desbravador.query.filter_by(ativo=True).count()
     
     # Mensalidades do mês atual
-    mes_atual = datetime.now().month
-    ano_atual = datetime.now().year
-    mensalidades_pagas = Mensalidade.query.filter_by(
-        mes_referencia=mes_atual,
-        ano_referencia=ano_atual,
-        status='pago'
-    ).count()
-    
-    mensalidades_pendentes = Mensalidade.query.filter_by(
-        mes_referencia=mes_atual,
-        ano_referencia=ano_atual,
-        status='pendente'
-    ).count()
-    
-    # Valor total arrecadado no mês
-    total_arrecadado = db.session.query(db.func.sum(Mensalidade.valor)).filter_by(
-        mes_referencia=mes_atual,
-        ano_referencia=ano_atual,
-        status='pago'
-    ).scalar() or 0
+    resumo = resumo_mes(ano_atual, mes_atual)
     
     # Desbravadores recentes (últimos 5 cadastrados)
-    desbravadores_recentes = Desbravador.query.filter_by(ativo=True).order_by(
-        Desbravador.data_cadastro.desc()
-    ).limit(5).all()
-    
-    # Mensalidades em atraso
-    mensalidades_atrasadas = Mensalidade.query.filter(
-        Mensalidade.status == 'atrasado'
-    ).count()
+    desbravadores_recentes = db.session.execute(
+        select(Desbravador.id, Desbravador.nome, Desbravador.unidade,
+               Desbravador.classe, Desbravador.data_cadastro)
+        .where(Desbravador.ativo == True)
+        .order_by(Desbravador.data_cadastro.desc())
+        .limit(5)
+    ).all()
     
     stats = {
         'total_desbravadores': total_desbravadores,
-        'mensalidades_pagas': mensalidades_pagas,
-        'mensalidades_pendentes': mensalidades_pendentes,
-        'total_arrecadado': total_arrecadado,
-        'mensalidades_atrasadas': mensalidades_atrasadas
+        'mensalidades_pagas': resumo.get('pago', VAZIO).quantidade,
+        'mensalidades_pendentes': resumo.get('pendente', VAZIO).quantidade,
+        'total_arrecadado': resumo.get('pago', VAZIO).valor,
+        'mensalidades_atrasadas': total_status('atrasado').quantidade
     }
     
-    return render_template('main/dashboard.html', 
-                         stats=stats, 
-                         desbravadores_recentes=desbravadores_recentes)
+    return {
+        'stats': stats,
+        'desbravadores_recentes': [linha._asdict() for linha in desbravadores_recentes]
+    }
+
+@main_bp.route('/dashboard')
+@login_required
+@depende_de('desbravador', 'mensalidade')
+def dashboard():
+    """Dashboard principal do sistema"""
+    mes_atual = datetime.now().month
+    ano_atual = datetime.now().year
+    dados = cache.memorizar('dashboard', ('desbravador', 'mensalidade'),
+                            lambda: _dados_dashboard(ano_atual, mes_atual), ano_atual, mes_atual)
+    
+    return render_template('main/dashboard.html', **dados)
 
 @main_bp.route('/profile')
 @login_required
@@ -76,3 +70,26 @@ def profile():
 def settings():
     """Configurações do sistema"""
     return render_template('main/settings.html')
+
+@main_bp.route('/desempenho', methods=['GET', 'POST'])
+@login_required
+def desempenho():
+    """Endpoints com maior tempo de banco de dados (somente administradores)"""
+    if not isinstance(current_user, User):
+        flash('Acesso restrito aos administradores.', 'error')
+        return redirect(url_for('main.dashboard'))
+    
+    if request.method == 'POST':
+        if request.form.get('acao') == 'cache':
+            cache.limpar()
+            flash('Cache esvaziado.', 'info')
+        else:
+            profiling.limpar()
+            flash('Estatísticas de desempenho zeradas.', 'info')
+        return redirect(url_for('main.desempenho'))
+    
+    return render_template('main/desempenho.html',
+                         endpoints=profiling.ranking(),
+                         limite_lento=current_app.config['SLOW_REQUEST_MS'],
+                         pid=os.getpid(),
+                         cache=cache.estatisticas())
@@ -1,7 +1,12 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
-from flask_login import login_required
-from app.models import Desbravador, Mensalidade, Transacao
-from app import db
+from flask import Blueprint, Response, render_template, request, redirect, url_for, flash, jsonify, abort, stream_with_context, send_file
+from flask_login import login_required, current_user
+from app.models import Desbravador, Mensalidade, Transacao, User
+from app import db, cache
+from app.consultas import totais_mensalidades_mes, estatisticas_mensalidades
+from app.saldos import patrimonio, mes_aberto
+from app import exportacao, relatorios_pdf, tabulacao, referencias
+from app.condicional import depende_de
+from sqlalchemy.orm import contains_eager
 from datetime import datetime, date
 import calendar
 
@@ -15,36 +20,27 @@ def index():
 
 @relatorios_bp.route('/mensalidades')
 @login_required
+@depende_de('mensalidade', 'desbravador')
 def relatorio_mensalidades():
     """Relatório de mensalidades"""
     mes = request.args.get('mes', datetime.now().month, type=int)
     ano = request.args.get('ano', datetime.now().year, type=int)
     
+    page = request.args.get('page', 1, type=int)
+    
+    # Estatísticas calculadas no banco em uma única consulta agrupada
+    stats = estatisticas_mensalidades(totais_mensalidades_mes(ano, mes))
+    
+    # Apenas as linhas da página atual são carregadas
     mensalidades = Mensalidade.query.filter_by(
         mes_referencia=mes,
         ano_referencia=ano
-    ).join(Desbravador).order_by(Desbravador.nome).all()
-    
-    # Estatísticas
-    total_desbravadores = len(mensalidades)
-    pagas = len([m for m in mensalidades if m.status == 'pago'])
-    pendentes = len([m for m in mensalidades if m.status == 'pendente'])
-    atrasadas = len([m for m in mensalidades if m.status == 'atrasado'])
-    
-    valor_total = sum(m.valor for m in mensalidades)
-    valor_pago = sum(m.valor for m in mensalidades if m.status == 'pago')
-    valor_pendente = sum(m.valor for m in mensalidades if m.status == 'pendente')
-    
-    stats = {
-        'total_desbravadores': total_desbravadores,
-        'pagas': pagas,
-        'pendentes': pendentes,
-        'atrasadas': atrasadas,
-        'valor_total': valor_total,
-        'valor_pago': valor_pago,
-        'valor_pendente': valor_pendente,
-        'percentual_pago': (pagas / total_desbravadores * 100) if total_desbravadores > 0 else 0
-    }
+    ).join(Desbravador).options(
+        contains_eager(Mensalidade.desbravador)
+    ).order_by(Desbravador.nome, Mensalidade.id).paginate(
+        page=page, per_page=50, error_out=False, count=False
+    )
+    mensalidades.total = stats['total_desbravadores']
     
     return render_template('relatorios/mensalidades.html',
                          mensalidades=mensalidades,
@@ -54,10 +50,13 @@ def relatorio_mensalidades():
 
 @relatorios_bp.route('/fluxo-caixa')
 @login_required
+@depende_de('transacao')
 def relatorio_fluxo_caixa():
     """Relatório de fluxo de caixa"""
     mes = request.args.get('mes', datetime.now().month, type=int)
     ano = request.args.get('ano', datetime.now().year, type=int)
+    if not 1 <= mes <= 12:
+        abort(400)
     
     # Buscar transações do mês
     inicio_mes = datetime(ano, mes, 1)
@@ -91,76 +90,100 @@ def relatorio_fluxo_caixa():
 
 @relatorios_bp.route('/patrimonio')
 @login_required
+@depende_de('transacao')
 def relatorio_patrimonio():
     """Relatório de patrimônio"""
-    # Buscar todas as transações
-    receitas = Transacao.query.filter_by(tipo='receita').all()
-    despesas = Transacao.query.filter_by(tipo='despesa').all()
-    
-    total_receitas = sum(t.valor for t in receitas)
-    total_despesas = sum(t.valor for t in despesas)
-    patrimonio_atual = total_receitas - total_despesas
-    
-    # Receitas por categoria
-    receitas_por_categoria = {}
-    for transacao in receitas:
-        categoria = transacao.categoria
-        if categoria not in receitas_por_categoria:
-            receitas_por_categoria[categoria] = 0
-        receitas_por_categoria[categoria] += transacao.valor
-    
-    # Despesas por categoria
-    despesas_por_categoria = {}
-    for transacao in despesas:
-        categoria = transacao.categoria
-        if categoria not in despesas_por_categoria:
-            despesas_por_categoria[categoria] = 0
-        despesas_por_categoria[categoria] += transacao.valor
-    
-    return render_template('relatorios/patrimonio.html',
-                         total_receitas=total_receitas,
-                         total_despesas=total_despesas,
-                         patrimonio_atual=patrimonio_atual,
-                         receitas_por_categoria=receitas_por_categoria,
-                         despesas_por_categoria=despesas_por_categoria)
+    # Totais acumulados a partir dos fechamentos mensais e do mês aberto
+    dados = cache.memorizar('patrimonio', ('transacao',), patrimonio, *mes_aberto())
+    return render_template('relatorios/patrimonio.html', **dados)
 
 @relatorios_bp.route('/desbravadores')
 @login_required
+@depende_de('desbravador', 'especialidade')
 def relatorio_desbravadores():
-    """Relatório de desbravadores"""
-    # Estatísticas gerais
-    total_desbravadores = Desbravador.query.filter_by(ativo=True).count()
-    
-    # Por unidade
-    unidades = db.session.query(
-        Desbravador.unidade,
-        db.func.count(Desbravador.id)
-    ).filter_by(ativo=True).group_by(Desbravador.unidade).all()
-    
-    # Por classe
-    classes = db.session.query(
-        Desbravador.classe,
-        db.func.count(Desbravador.id)
-    ).filter_by(ativo=True).group_by(Desbravador.classe).all()
-    
-    # Por faixa etária
-    faixas_etarias = {
-        '6-9 anos': Desbravador.query.filter(Desbravador.idade >= 6, Desbravador.idade <= 9, Desbravador.ativo == True).count(),
-        '10-12 anos': Desbravador.query.filter(Desbravador.idade >= 10, Desbravador.idade <= 12, Desbravador.ativo == True).count(),
-        '13-15 anos': Desbravador.query.filter(Desbravador.idade >= 13, Desbravador.idade <= 15, Desbravador.ativo == True).count(),
-        '16+ anos': Desbravador.query.filter(Desbravador.idade >= 16, Desbravador.ativo == True).count()
-    }
+    """Relatório de desbravadores: unidade × classe × faixa etária"""
+    # Todas as contagens vêm de um único GROUP BY; as idades mudam a cada dia
+    hoje = date.today()
+    cubo = cache.memorizar('relatorio_desbravadores', ('desbravador',),
+                           lambda: tabulacao.cubo(hoje=hoje), hoje)
+    especialidades = cache.memorizar('especialidades', ('desbravador', 'especialidade'),
+                                     referencias.contagem_por_especialidade)
+    
+    # Detalhamento: filtros e eixos da tabela cruzada pela URL, sem novas consultas
+    filtros = {nome: request.args.get(nome, '', type=str) for nome in tabulacao.DIMENSOES}
+    linhas = request.args.get('linhas', 'unidade', type=str)
+    colunas = request.args.get('colunas', 'faixa', type=str)
+    if linhas not in tabulacao.DIMENSOES:
+        linhas = 'unidade'
+    if colunas not in tabulacao.DIMENSOES or colunas == linhas:
+        colunas = next(nome for nome in ('faixa', 'classe', 'unidade') if nome != linhas)
+    
+    celulas = tabulacao.filtrar(cubo, filtros)
+    filtros = {nome: valor for nome, valor in filtros.items() if valor}
+    
+    def detalhar(**mudancas):
+        argumentos = {**filtros, 'linhas': linhas, 'colunas': colunas, **mudancas}
+        return url_for('relatorios.relatorio_desbravadores',
+                       **{nome: valor for nome, valor in argumentos.items() if valor})
     
     return render_template('relatorios/desbravadores.html',
-                         total_desbravadores=total_desbravadores,
-                         unidades=unidades,
-                         classes=classes,
-                         faixas_etarias=faixas_etarias)
+                         total_desbravadores=sum(celula[-1] for celula in celulas),
+                         unidades=tabulacao.totais(celulas, 'unidade'),
+                         classes=tabulacao.totais(celulas, 'classe'),
+                         faixas_etarias=tabulacao.totais(celulas, 'faixa'),
+                         especialidades=especialidades,
+                         pivo=tabulacao.pivotar(celulas, linhas, colunas),
+                         dimensoes=tabulacao.DIMENSOES,
+                         filtros=filtros,
+                         linhas=linhas,
+                         colunas=colunas,
+                         detalhar=detalhar)
 
 @relatorios_bp.route('/exportar/<tipo>')
 @login_required
 def exportar_relatorio(tipo):
-    """Exportar relatório em formato específico"""
-    # Implementar exportação para PDF, Excel, etc.
-    flash('Funcionalidade de exportação em desenvolvimento!', 'info')
-    return redirect(url_for('relatorios.index'))
+    """Exportar relatório em CSV ou Excel (XLSX), transmitido em partes (somente administradores)"""
+    if not isinstance(current_user, User):
+        abort(403)
+    relatorio = exportacao.RELATORIOS.get(tipo)
+    formato = request.args.get('formato', 'csv', type=str)
+    if relatorio is None or formato not in exportacao.FORMATOS:
+        abort(404)
+    
+    nome, colunas, linhas = relatorio(request.args)
+    mimetype, gerar = exportacao.FORMATOS[formato]
+    
+    return Response(
+        stream_with_context(gerar(nome, colunas, linhas)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={nome}.{formato}'}
+    )
+
+@relatorios_bp.route('/pdf/<tipo>')
+@login_required
+def relatorio_pdf(tipo):
+    """PDF do relatório do mês; gerado em segundo plano na primeira solicitação (somente administradores)"""
+    if not isinstance(current_user, User):
+        abort(403)
+    if tipo not in relatorios_pdf.RELATORIOS:
+        abort(404)
+    if not relatorios_pdf.disponivel():
+        flash('Geração de PDF indisponível: instale o reportlab.', 'error')
+        return redirect(url_for('relatorios.index'))
+    
+    mes = request.args.get('mes', datetime.now().month, type=int)
+    ano = request.args.get('ano', datetime.now().year, type=int)
+    if not 1 <= mes <= 12:
+        abort(400)
+    
+    caminho, situacao = relatorios_pdf.solicitar(tipo, ano, mes)
+    if situacao == relatorios_pdf.PRONTO:
+        return send_file(caminho, mimetype='application/pdf', conditional=True,
+                         download_name=f'{tipo}_{ano}_{mes:02d}.pdf', max_age=0)
+    
+    resposta = render_template('relatorios/gerando_pdf.html',
+                               titulo=relatorios_pdf.RELATORIOS[tipo].titulo,
+                               falhou=situacao == relatorios_pdf.FALHOU,
+                               mes=mes,
+                               ano=ano)
+    return resposta, 202, {'Retry-After': '2'}
@@ -0,0 +1,300 @@
+"""
+Fechamento mensal do caixa.
+
+Cada mês anterior ao mês corrente é "fechado" em um SaldoMensal (saldo de
+abertura, receitas, despesas e saldo de fechamento) e em linhas de
+SaldoCategoria. O saldo inicial de qualquer mês e o patrimônio passam a
+custar uma leitura por mês fechado mais uma agregação sobre o mês aberto,
+em vez de somar todas as transações já registradas.
+
+Os fechamentos são criados pela tarefa agendada fechar_saldos
+(app.tarefas) ou por flask fechar-saldos; as leituras nunca gravam. Elas
+partem do último fechamento existente e somam as transações dos meses
+seguintes. Quando uma transação com data em um período já fechado é
+inserida, alterada ou removida, os fechamentos a partir daquele mês são
+descartados e, após o commit, a tarefa é enfileirada para refazê-los; uma
+tarefa que ainda não começou é reaproveitada pelos commits seguintes.
+"""
+
+from datetime import datetime
+from sqlalchemy import event, inspect, select, delete, func, or_, and_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app import db
+from app.models import Transacao, SaldoMensal, SaldoCategoria
+
+
+def intervalo_mes(ano, mes):
+    """Datas de início (inclusive) e fim (exclusive) de um mês"""
+    inicio = datetime(ano, mes, 1)
+    if mes == 12:
+        fim = datetime(ano + 1, 1, 1)
+    else:
+        fim = datetime(ano, mes + 1, 1)
+    return inicio, fim
+
+
+def _proximo(ano, mes):
+    return (ano + 1, 1) if mes == 12 else (ano, mes + 1)
+
+
+def _anterior(ano, mes):
+    return (ano - 1, 12) if mes == 1 else (ano, mes - 1)
+
+
+def mes_aberto():
+    """Mês corrente: o único período ainda não fechado"""
+    hoje = datetime.now()
+    return hoje.year, hoje.month
+
+
+def _a_partir_de(modelo, ano, mes):
+    """Critério (ano, mes) >= (ano, mes) para as tabelas de fechamento"""
+    return or_(modelo.ano > ano, and_(modelo.ano == ano, modelo.mes >= mes))
+
+
+def _totais_por_categoria(inicio, fim=None):
+    """Totais de transações por tipo e categoria em um intervalo de datas"""
+    criterios = [Transacao.data_transacao >= inicio]
+    if fim is not None:
+        criterios.append(Transacao.data_transacao < fim)
+    return db.session.execute(
+        select(Transacao.tipo, Transacao.categoria, func.sum(Transacao.valor))
+        .where(*criterios)
+        # categoria primeiro: nenhum índice começa por ela, então o SQLite
+        # usa o intervalo de datas em vez de percorrer o índice por tipo
+        .group_by(Transacao.categoria, Transacao.tipo)
+    ).all()
+
+
+def _primeiro_mes_com_transacao():
+    primeira = db.session.execute(select(func.min(Transacao.data_transacao))).scalar()
+    if primeira is None:
+        return None
+    if isinstance(primeira, str):
+        primeira = datetime.fromisoformat(primeira)
+    return primeira.year, primeira.month
+
+
+def _fechar(ano, mes, saldo_inicial):
+    """Cria o fechamento de um mês a partir das suas transações"""
+    inicio, fim = intervalo_mes(ano, mes)
+    total_receitas = 0.0
+    total_despesas = 0.0
+    for tipo, categoria, total in _totais_por_categoria(inicio, fim):
+        db.session.add(SaldoCategoria(ano=ano, mes=mes, tipo=tipo, categoria=categoria, total=total))
+        if tipo == 'receita':
+            total_receitas += total
+        else:
+            total_despesas += total
+
+    fechamento = SaldoMensal(
+        ano=ano,
+        mes=mes,
+        saldo_inicial=saldo_inicial,
+        total_receitas=total_receitas,
+        total_despesas=total_despesas,
+        saldo_final=saldo_inicial + total_receitas - total_despesas
+    )
+    db.session.add(fechamento)
+    return fechamento
+
+
+def _ultimo_fechamento(ano, mes):
+    """Último fechamento existente até (ano, mes), inclusive (None se não houver)"""
+    return db.session.execute(
+        select(SaldoMensal)
+        .where(or_(SaldoMensal.ano < ano, and_(SaldoMensal.ano == ano, SaldoMensal.mes <= mes)))
+        .order_by(SaldoMensal.ano.desc(), SaldoMensal.mes.desc())
+        .limit(1)
+    ).scalar()
+
+
+def _inicio_apos(fechamento):
+    """Início do primeiro mês não coberto pelo fechamento (None se não houver o que somar)"""
+    if fechamento is None:
+        periodo = _primeiro_mes_com_transacao()
+        return intervalo_mes(*periodo)[0] if periodo is not None else None
+    return intervalo_mes(*_proximo(fechamento.ano, fechamento.mes))[0]
+
+
+def garantir_fechamentos(ate_ano, ate_mes):
+    """Fecha todos os meses encerrados até (ate_ano, ate_mes), inclusive
+
+    Retorna o último fechamento existente até esse mês, ou None se não
+    houver transações anteriores a ele.
+    """
+    alvo = min((ate_ano, ate_mes), _anterior(*mes_aberto()))
+
+    ultimo = _ultimo_fechamento(*alvo)
+    if ultimo is not None:
+        if (ultimo.ano, ultimo.mes) == alvo:
+            return ultimo
+        periodo = _proximo(ultimo.ano, ultimo.mes)
+        saldo = ultimo.saldo_final
+    else:
+        periodo = _primeiro_mes_com_transacao()
+        if periodo is None or periodo > alvo:
+            return None
+        saldo = 0.0
+
+    while periodo <= alvo:
+        ultimo = _fechar(periodo[0], periodo[1], saldo)
+        saldo = ultimo.saldo_final
+        periodo = _proximo(*periodo)
+
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Outro processo fechou os mesmos meses ao mesmo tempo
+        db.session.rollback()
+        return db.session.get(SaldoMensal, alvo)
+    return ultimo
+
+
+def saldo_inicial(ano, mes):
+    """Saldo de abertura de um mês qualquer"""
+    fechamento = _ultimo_fechamento(*_anterior(ano, mes))
+    saldo = fechamento.saldo_final if fechamento is not None else 0.0
+
+    # Meses depois do último fechamento (o mês aberto, meses futuros ou
+    # fechamentos ainda por refazer): somar o que foi lançado neles
+    inicio = _inicio_apos(fechamento)
+    fim, _ = intervalo_mes(ano, mes)
+    if inicio is not None and inicio < fim:
+        for tipo, _, total in _totais_por_categoria(inicio, fim):
+            saldo += total if tipo == 'receita' else -total
+    return saldo
+
+
+def patrimonio():
+    """Totais acumulados de receitas e despesas por categoria"""
+    fechamento = _ultimo_fechamento(*_anterior(*mes_aberto()))
+
+    receitas_por_categoria = {}
+    despesas_por_categoria = {}
+
+    def acumular(tipo, categoria, total):
+        destino = receitas_por_categoria if tipo == 'receita' else despesas_por_categoria
+        destino[categoria] = destino.get(categoria, 0) + total
+
+    fechados = db.session.execute(
+        select(SaldoCategoria.tipo, SaldoCategoria.categoria, func.sum(SaldoCategoria.total))
+        .group_by(SaldoCategoria.tipo, SaldoCategoria.categoria)
+    )
+    for tipo, categoria, total in fechados:
+        acumular(tipo, categoria, total)
+
+    inicio = _inicio_apos(fechamento)
+    if inicio is not None:
+        for tipo, categoria, total in _totais_por_categoria(inicio):
+            acumular(tipo, categoria, total)
+
+    total_receitas = sum(receitas_por_categoria.values())
+    total_despesas = sum(despesas_por_categoria.values())
+    return {
+        'total_receitas': total_receitas,
+        'total_despesas': total_despesas,
+        'patrimonio_atual': total_receitas - total_despesas,
+        'receitas_por_categoria': receitas_por_categoria,
+        'despesas_por_categoria': despesas_por_categoria
+    }
+
+
+def invalidar_a_partir(ano, mes, conexao=None):
+    """Descarta os fechamentos de (ano, mes) em diante
+
+    Pela sessão (sem conexao), a tarefa fechar_saldos é enfileirada após o commit.
+    """
+    if conexao is None:
+        db.session.info['saldos_refazer'] = True
+    executar = (conexao or db.session).execute
+    executar(delete(SaldoCategoria).where(_a_partir_de(SaldoCategoria, ano, mes)))
+    executar(delete(SaldoMensal).where(_a_partir_de(SaldoMensal, ano, mes)))
+
+
+def invalidar_datas(datas, conexao=None):
+    """Descarta os fechamentos afetados por transações nessas datas; True se algum foi afetado"""
+    aberto = mes_aberto()
+    periodos = [(d.year, d.month) for d in datas if d is not None]
+    fechados = [p for p in periodos if p < aberto]
+    if fechados:
+        invalidar_a_partir(*min(fechados), conexao=conexao)
+    return bool(fechados)
+
+
+def _data_anterior(transacao):
+    historico = inspect(transacao).attrs.data_transacao.history
+    if historico.deleted:
+        return historico.deleted[0]
+    if historico.unchanged:
+        return historico.unchanged[0]
+    return None
+
+
+def _alterou_totais(transacao):
+    """Se a alteração muda algum valor usado nos fechamentos"""
+    estado = inspect(transacao)
+    return any(
+        estado.attrs[campo].history.has_changes()
+        for campo in ('tipo', 'categoria', 'valor', 'data_transacao')
+    )
+
+
+@event.listens_for(Session, 'before_flush')
+def _coletar_datas(session, flush_context, instances):
+    """Registra as datas das transações alteradas neste flush"""
+    datas = session.info.setdefault('saldos_datas', [])
+
+    for obj in session.new:
+        if isinstance(obj, Transacao):
+            datas.append(obj.data_transacao)
+
+    for obj in session.deleted:
+        if isinstance(obj, Transacao):
+            datas.append(_data_anterior(obj) or obj.data_transacao)
+
+    for obj in session.dirty:
+        if isinstance(obj, Transacao) and _alterou_totais(obj):
+            anterior = _data_anterior(obj)
+            if anterior is None:
+                # Data antiga desconhecida: invalidar tudo por segurança
+                anterior = datetime(1900, 1, 1)
+            datas.extend([anterior, obj.data_transacao])
+
+
+@event.listens_for(Session, 'after_flush')
+def _invalidar_fechamentos(session, flush_context):
+    datas = session.info.pop('saldos_datas', None)
+    if datas and invalidar_datas(datas, conexao=session.connection()):
+        session.info['saldos_refazer'] = True
+
+
+# Uma tarefa pendente atende a todos os commits até começar a rodar; enquanto
+# ela roda, a próxima fica na outra chave
+CHAVES_REFAZER = ('fechar_saldos:refazer:1', 'fechar_saldos:refazer:2')
+
+
+def enfileirar_refazer():
+    """Enfileira fechar_saldos, reaproveitando a tarefa que ainda não começou"""
+    from app import tarefas
+    for chave in CHAVES_REFAZER:
+        linha = tarefas.enfileirar('fechar_saldos', chave=chave)
+        if linha.situacao == tarefas.AGUARDANDO:
+            return linha
+        if linha.situacao != tarefas.PROCESSANDO:
+            return tarefas.reenfileirar(linha.id)
+    # As duas em execução ao mesmo tempo (mais de um worker)
+    return tarefas.enfileirar('fechar_saldos')
+
+
+@event.listens_for(Session, 'after_commit')
+def _refazer_fechamentos(session):
+    if session.info.pop('saldos_refazer', None):
+        enfileirar_refazer()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _descartar_datas(session):
+    session.info.pop('saldos_datas', None)
+    session.info.pop('saldos_refazer', None)
@@ -0,0 +1,151 @@
+"""
+Hash e verificação de senhas fora da thread da requisição.
+
+PASSWORD_SCHEME define a política: 'scrypt:N:r:p', 'pbkdf2:sha256:iterações'
+(ambos do Werkzeug) ou 'bcrypt:custo'; sem parâmetros ('scrypt', 'pbkdf2',
+'bcrypt') valem os padrões abaixo. Hashes antigos de qualquer esquema
+continuam aceitos e, no login bem-sucedido, são refeitos com a política
+atual (atualizar_se_preciso).
+
+O cálculo roda em um ProcessPoolExecutor de PASSWORD_WORKERS processos
+(0: na própria thread). No máximo PASSWORD_QUEUE cálculos ficam na fila
+ou em execução por processo da aplicação, também sem pool; uma requisição
+que não consegue vaga em PASSWORD_QUEUE_TIMEOUT segundos recebe Ocupado, e
+o login responde 503 em vez de acumular requisições à espera da CPU.
+
+Os limites valem por processo da aplicação: sob o gunicorn, o total na
+máquina é workers x PASSWORD_WORKERS (o gunicorn.conf.py usa 1 por worker
+como padrão). Os processos do pool partem de um forkserver, e não de um
+fork do worker, que tem threads em andamento.
+"""
+
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+from app import db
+
+try:
+    import bcrypt
+except ImportError:  # bcrypt é opcional: sem ele, apenas scrypt e pbkdf2
+    bcrypt = None
+
+PADROES = {
+    'scrypt': 'scrypt:32768:8:1',
+    'pbkdf2': 'pbkdf2:sha256:600000',
+    'bcrypt': 'bcrypt:12',
+}
+
+_lock = threading.Lock()
+_executor = None
+_vagas = None
+
+
+class Ocupado(Exception):
+    """Fila de cálculo de senhas cheia"""
+
+
+def politica():
+    """Esquema e parâmetros dos novos hashes, por extenso"""
+    metodo = current_app.config['PASSWORD_SCHEME']
+    metodo = PADROES.get(metodo, metodo)
+    if metodo.split(':', 1)[0] not in PADROES:
+        raise ValueError(f'PASSWORD_SCHEME desconhecido: {metodo}')
+    if metodo.startswith('bcrypt') and bcrypt is None:
+        raise RuntimeError('Instale o bcrypt para usar PASSWORD_SCHEME=bcrypt.')
+    return metodo
+
+
+def metodo_do_hash(hash_senha):
+    """Esquema e parâmetros com que um hash foi gerado ('bcrypt:12', 'scrypt:32768:8:1'...)"""
+    if hash_senha.startswith('$2'):
+        return f'bcrypt:{int(hash_senha.split("$")[2])}'
+    return hash_senha.split('$', 1)[0]
+
+
+# Funções executadas nos processos do pool
+
+def _gerar(metodo, senha):
+    if metodo.startswith('bcrypt'):
+        custo = int(metodo.split(':')[1])
+        return bcrypt.hashpw(senha.encode(), bcrypt.gensalt(custo)).decode()
+    return generate_password_hash(senha, method=metodo)
+
+
+def _conferir(hash_senha, senha):
+    if hash_senha.startswith('$2'):
+        return bcrypt is not None and bcrypt.checkpw(senha.encode(), hash_senha.encode())
+    return check_password_hash(hash_senha, senha)
+
+
+# Execução
+
+def _contexto():
+    """forkserver onde existe (Linux, macOS); spawn nos demais sistemas"""
+    metodo = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return multiprocessing.get_context(metodo)
+
+
+def _pool():
+    global _executor, _vagas
+    with _lock:
+        if _vagas is None:
+            _vagas = threading.BoundedSemaphore(current_app.config['PASSWORD_QUEUE'])
+        if _executor is None and current_app.config['PASSWORD_WORKERS']:
+            _executor = ProcessPoolExecutor(max_workers=current_app.config['PASSWORD_WORKERS'],
+                                            mp_context=_contexto())
+        return _executor, _vagas
+
+
+def _executar(funcao, *argumentos):
+    executor, vagas = _pool()
+    if not vagas.acquire(timeout=current_app.config['PASSWORD_QUEUE_TIMEOUT']):
+        raise Ocupado()
+    try:
+        if executor is None:
+            return funcao(*argumentos)
+        return executor.submit(funcao, *argumentos).result()
+    except BrokenProcessPool:
+        # Um processo do pool morreu: recria o pool na próxima chamada
+        _descartar_pool(executor)
+        return funcao(*argumentos)
+    finally:
+        vagas.release()
+
+
+def _descartar_pool(executor):
+    global _executor
+    with _lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False)
+
+
+def gerar(senha):
+    """Hash da senha com a política atual"""
+    return _executar(_gerar, politica(), senha)
+
+
+def verificar(hash_senha, senha):
+    """Se a senha confere com o hash (False para contas sem senha)"""
+    if not hash_senha or not senha:
+        return False
+    return _executar(_conferir, hash_senha, senha)
+
+
+def precisa_atualizar(hash_senha):
+    return metodo_do_hash(hash_senha) != politica()
+
+
+def atualizar_se_preciso(conta, senha):
+    """Refaz o hash da conta com a política atual, após um login bem-sucedido"""
+    if not precisa_atualizar(conta.password_hash):
+        return False
+    try:
+        conta.password_hash = gerar(senha)
+    except Ocupado:
+        return False  # fica para o próximo login
+    db.session.commit()
+    return True
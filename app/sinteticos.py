@@ -0,0 +1,235 @@
+"""
+Dados sintéticos em volume para testes de carga (flask gerar-dados).
+
+Gera desbravadores, anos de mensalidades, transações e eventos em
+quantidades configuráveis. Tudo deriva de random.Random(semente) e do mês
+final (padrão: o mês atual): os mesmos parâmetros sobre o mesmo banco
+produzem os mesmos dados, de modo que medições feitas em commits diferentes
+(benchmarks/carga.py) são comparáveis.
+
+As linhas são gravadas com INSERT em lote, sem o flush do ORM; por isso o
+resumo de mensalidades é reconstruído e os saldos fechados são invalidados
+ao final.
+"""
+
+import random
+from itertools import islice
+from datetime import datetime, date, timedelta
+from flask import current_app
+from sqlalchemy import select, insert, func
+from app import db, senhas, resumos, saldos, referencias
+from app.models import Desbravador, Especialidade, Mensalidade, Transacao, Evento, desbravador_especialidade
+from app.mensalidades import VALOR_PADRAO
+
+# Linhas por INSERT em lote (e por transação)
+LOTE = 1000
+
+# Senha dos desbravadores sintéticos com login (um a cada PROPORCAO_LOGIN)
+SENHA = 'desbravador'
+PROPORCAO_LOGIN = 10
+
+NOMES = (
+    'Ana', 'Beatriz', 'Bruno', 'Caio', 'Camila', 'Daniel', 'Davi', 'Eduarda', 'Enzo', 'Felipe',
+    'Gabriel', 'Giovana', 'Heitor', 'Helena', 'Isabela', 'João', 'Júlia', 'Laura', 'Lucas', 'Luísa',
+    'Manuela', 'Mariana', 'Mateus', 'Miguel', 'Nicolas', 'Pedro', 'Rafael', 'Samuel', 'Sofia', 'Valentina',
+)
+SOBRENOMES = (
+    'Almeida', 'Alves', 'Barbosa', 'Cardoso', 'Carvalho', 'Castro', 'Costa', 'Dias', 'Fernandes', 'Ferreira',
+    'Gomes', 'Lima', 'Martins', 'Melo', 'Moreira', 'Nascimento', 'Oliveira', 'Pereira', 'Ribeiro', 'Rocha',
+    'Rodrigues', 'Santos', 'Silva', 'Soares', 'Souza', 'Teixeira', 'Vieira',
+)
+RUAS = ('Rua das Flores', 'Av. Principal', 'Rua do Sol', 'Rua da Paz', 'Av. Brasil', 'Rua São João')
+# Classes dos desbravadores (sem as de liderança)
+CLASSES = referencias.CLASSES[:6]
+
+# (tipo, categoria, descrições, valor mínimo, valor máximo)
+LANCAMENTOS = (
+    ('receita', 'mensalidade', ('Mensalidades em dinheiro', 'Mensalidades via PIX'), 50, 600),
+    ('receita', 'evento', ('Inscrições do acampamento', 'Inscrições do campori'), 100, 2500),
+    ('receita', 'doação', ('Oferta da igreja', 'Doação de membro'), 20, 1000),
+    ('receita', 'venda', ('Venda de uniformes', 'Cantina'), 30, 800),
+    ('despesa', 'material', ('Material de especialidades', 'Papelaria'), 10, 400),
+    ('despesa', 'evento', ('Aluguel de área de camping', 'Taxa de inscrição'), 100, 3000),
+    ('despesa', 'manutenção', ('Manutenção das barracas', 'Reparos na sede'), 30, 900),
+    ('despesa', 'alimentação', ('Lanche da reunião', 'Mantimentos do acampamento'), 20, 1200),
+    ('despesa', 'transporte', ('Ônibus fretado', 'Combustível'), 50, 2500),
+)
+EVENTOS = (
+    ('reunião', 'Reunião Semanal', 'Sede do Clube', 0),
+    ('acampamento', 'Acampamento', 'Parque Municipal', 80),
+    ('especialidade', 'Aula de Especialidade', 'Sede do Clube', 10),
+    ('campori', 'Campori Regional', 'Centro de Treinamento', 250),
+    ('missão', 'Ação Comunitária', 'Praça Central', 0),
+)
+
+
+def _meses(ate, anos):
+    """(ano, mes) dos últimos anos * 12 meses até ate, em ordem"""
+    ano, mes = ate
+    meses = []
+    for _ in range(anos * 12):
+        meses.append((ano, mes))
+        ano, mes = (ano - 1, 12) if mes == 1 else (ano, mes - 1)
+    return meses[::-1]
+
+
+def _inserir(tabela, linhas):
+    """Insere as linhas (lista ou gerador) em lotes de LOTE; retorna quantas foram inseridas"""
+    linhas = iter(linhas)
+    total = 0
+    while True:
+        lote = list(islice(linhas, LOTE))
+        if not lote:
+            return total
+        # Um contexto de aplicação por lote: com SQLALCHEMY_RECORD_QUERIES, o
+        # Flask-SQLAlchemy guarda cada comando e seus parâmetros em g até o
+        # fim do contexto
+        with current_app.app_context():
+            db.session.execute(insert(tabela), lote)
+            db.session.commit()
+        total += len(lote)
+
+
+def _momento(sorteio, ano, mes, hora_min=8, hora_max=21):
+    dia = sorteio.randint(1, 28)
+    return datetime(ano, mes, dia, sorteio.randint(hora_min, hora_max), sorteio.choice((0, 15, 30, 45)))
+
+
+def _desbravadores(sorteio, quantidade, meses, primeiro_id):
+    unidades = referencias.unidades()
+    ids_especialidades = db.session.execute(select(Especialidade.id).order_by(Especialidade.id)).scalars().all()
+    hash_senha = senhas.gerar(SENHA) if quantidade else None
+    referencia = date(*meses[-1], 1)
+
+    linhas, associacoes = [], []
+    for desbravador_id in range(primeiro_id, primeiro_id + quantidade):
+        sobrenome = sorteio.choice(SOBRENOMES)
+        nome = f'{sorteio.choice(NOMES)} {sorteio.choice(SOBRENOMES)} {sobrenome}'
+        idade = sorteio.randint(10, 16)
+        # Metade já estava no clube no início do período; os demais entram ao longo dele
+        ano, mes = meses[0] if sorteio.random() < 0.5 else sorteio.choice(meses)
+        login = (desbravador_id - primeiro_id) % PROPORCAO_LOGIN == 0
+        linhas.append({
+            'id': desbravador_id,
+            'nome': nome,
+            'idade': idade,
+            'data_nascimento': referencia - timedelta(days=idade * 365 + sorteio.randint(0, 364)),
+            'unidade': sorteio.choice(unidades),
+            'classe': sorteio.choice(CLASSES),
+            'telefone': f'(11) 9{sorteio.randint(1000, 9999)}-{sorteio.randint(1000, 9999)}',
+            'email': f'dbv{desbravador_id}@exemplo.com',
+            'endereco': f'{sorteio.choice(RUAS)}, {sorteio.randint(1, 2000)}',
+            'nome_responsavel': f'{sorteio.choice(NOMES)} {sobrenome}',
+            'telefone_responsavel': f'(11) 9{sorteio.randint(1000, 9999)}-{sorteio.randint(1000, 9999)}',
+            'data_cadastro': _momento(sorteio, ano, mes),
+            'ativo': sorteio.random() < 0.95,
+            'username': f'dbv{desbravador_id}' if login else None,
+            'password_hash': hash_senha if login else None,
+            'pode_fazer_login': login,
+        })
+        for especialidade_id in sorteio.sample(ids_especialidades, sorteio.randint(0, min(3, len(ids_especialidades)))):
+            associacoes.append({'desbravador_id': desbravador_id, 'especialidade_id': especialidade_id})
+
+    _inserir(Desbravador.__table__, linhas)
+    _inserir(desbravador_especialidade, associacoes)
+    return linhas
+
+
+def _mensalidades(sorteio, desbravadores, meses):
+    atual = meses[-1]
+    for desbravador in desbravadores:
+        cadastro = desbravador['data_cadastro']
+        for ano, mes in meses:
+            if (ano, mes) < (cadastro.year, cadastro.month):
+                continue
+            chance_pago = 0.4 if (ano, mes) == atual else 0.9
+            pago = sorteio.random() < chance_pago
+            yield {
+                'desbravador_id': desbravador['id'],
+                'mes_referencia': mes,
+                'ano_referencia': ano,
+                'valor': VALOR_PADRAO,
+                'status': 'pago' if pago else ('pendente' if (ano, mes) == atual else 'atrasado'),
+                'data_pagamento': _momento(sorteio, ano, mes) if pago else None,
+                'created_at': datetime(ano, mes, 1),
+            }
+
+
+def _transacoes(sorteio, quantidade, meses):
+    # Mês a mês, em ordem de data, com a mesma quantidade em cada mês
+    por_mes, resto = divmod(quantidade, len(meses))
+    for indice, (ano, mes) in enumerate(meses):
+        linhas = []
+        for _ in range(por_mes + (indice < resto)):
+            tipo, categoria, descricoes, minimo, maximo = sorteio.choice(LANCAMENTOS)
+            data = _momento(sorteio, ano, mes)
+            linhas.append({
+                'tipo': tipo,
+                'categoria': categoria,
+                'descricao': sorteio.choice(descricoes),
+                'valor': round(sorteio.uniform(minimo, maximo), 2),
+                'data_transacao': data,
+                'created_at': data,
+            })
+        linhas.sort(key=lambda linha: linha['data_transacao'])
+        yield from linhas
+
+
+def _eventos(sorteio, quantidade, meses):
+    # Também há eventos nos três meses seguintes ao período (calendário)
+    ano, mes = meses[-1]
+    futuros = []
+    for _ in range(3):
+        ano, mes = (ano + 1, 1) if mes == 12 else (ano, mes + 1)
+        futuros.append((ano, mes))
+
+    linhas = []
+    for _ in range(quantidade):
+        tipo, nome, local, custo = sorteio.choice(EVENTOS)
+        ano, mes = sorteio.choice(meses + futuros)
+        inicio = _momento(sorteio, ano, mes, 7, 19)
+        linhas.append({
+            'nome': nome,
+            'descricao': f'{nome} do clube',
+            'data_inicio': inicio,
+            'data_fim': inicio + timedelta(days=2) if tipo in ('acampamento', 'campori') else None,
+            'local': local,
+            'tipo': tipo,
+            'custo': float(custo),
+            'ativo': True,
+            'created_at': inicio - timedelta(days=30),
+        })
+    return linhas
+
+
+def gerar(desbravadores=500, anos=3, transacoes=20000, eventos=500, semente=1, ate=None):
+    """Acrescenta os dados sintéticos ao banco e retorna as quantidades geradas
+
+    ate: (ano, mes) do último mês com dados (padrão: mês atual).
+    """
+    if ate is None:
+        hoje = datetime.now()
+        ate = (hoje.year, hoje.month)
+    sorteio = random.Random(semente)
+    meses = _meses(ate, anos)
+
+    primeiro_id = (db.session.execute(select(func.max(Desbravador.id))).scalar() or 0) + 1
+    cadastros = _desbravadores(sorteio, desbravadores, meses, primeiro_id)
+    total_mensalidades = _inserir(Mensalidade.__table__, _mensalidades(sorteio, cadastros, meses))
+    _inserir(Transacao.__table__, _transacoes(sorteio, transacoes, meses))
+    _inserir(Evento.__table__, _eventos(sorteio, eventos, meses))
+
+    # Os INSERTs em lote não passam pelos eventos do ORM
+    resumos.reconstruir()
+    saldos.invalidar_a_partir(*meses[0])
+    db.session.commit()
+
+    return {
+        'desbravadores': desbravadores,
+        'com_login': sum(1 for cadastro in cadastros if cadastro['pode_fazer_login']),
+        'mensalidades': total_mensalidades,
+        'transacoes': transacoes,
+        'eventos': eventos,
+        'de': meses[0],
+        'ate': meses[-1],
+    }
@@ -126,8 +126,8 @@ document.addEventListener('DOMContentLoaded', function() {
     });
 
     // Validação de formulários
-    const forms = document.querySelectorAll('form[data-validate]');
-    forms.forEach(function(form) {
+    const validatedForms = document.querySelectorAll('form[data-validate]');
+    validatedForms.forEach(function(form) {
         form.addEventListener('submit', function(e) {
             if (!form.checkValidity()) {
                 e.preventDefault();
@@ -308,7 +308,58 @@ document.addEventListener('DOMContentLoaded', function() {
         };
     }
 
+    // Chamadas à API JSON (/api/v1): resolve com o corpo da resposta e
+    // rejeita com a mensagem de erro enviada pelo servidor
+    function api(url, opcoes = {}) {
+        const config = {
+            method: opcoes.method || 'GET',
+            headers: {'Accept': 'application/json'},
+            credentials: 'same-origin'
+        };
+        if (opcoes.dados !== undefined) {
+            config.headers['Content-Type'] = 'application/json';
+            config.body = JSON.stringify(opcoes.dados);
+        }
+        return fetch(url, config).then(function(resposta) {
+            return resposta.json().catch(function() {
+                return {};
+            }).then(function(corpo) {
+                if (!resposta.ok) {
+                    throw new Error(corpo.erro || 'Erro ' + resposta.status + ' ao acessar o servidor');
+                }
+                return corpo;
+            });
+        });
+    }
+
+    // Formulários com data-api="<url>" são enviados à API em JSON, sem
+    // recarregar a página; a resposta chega no evento api:sucesso do formulário
+    document.addEventListener('submit', function(e) {
+        const form = e.target.closest('form[data-api]');
+        if (!form) {
+            return;
+        }
+        e.preventDefault();
+        const botao = form.querySelector('[type="submit"]');
+        if (botao) {
+            botao.disabled = true;
+        }
+        api(form.getAttribute('data-api'), {
+            method: 'POST',
+            dados: Object.fromEntries(new FormData(form))
+        }).then(function(corpo) {
+            form.dispatchEvent(new CustomEvent('api:sucesso', {detail: corpo, bubbles: true}));
+        }).catch(function(erro) {
+            showToast(erro.message, 'danger');
+        }).finally(function() {
+            if (botao) {
+                botao.disabled = false;
+            }
+        });
+    });
+
     // Expor funções utilitárias globalmente
+    window.api = api;
     window.debounce = debounce;
     window.throttle = throttle;
 
@@ -0,0 +1,112 @@
+"""
+Tabulação cruzada dos desbravadores ativos.
+
+cubo() conta os desbravadores por combinação de dimensões (unidade, classe,
+faixa etária) em uma única consulta agrupada; a faixa etária é um CASE
+sobre data_nascimento com as datas de corte calculadas para o dia de hoje,
+de modo que a idade nunca fica desatualizada. Totais por dimensão, tabelas
+cruzadas e detalhamentos (filtros) são derivados do cubo em memória, sem
+novas consultas, e o cubo pode ser guardado em cache (app.cache).
+"""
+
+from collections import namedtuple
+from datetime import date
+from sqlalchemy import select, func, case
+from app import db
+from app.models import Desbravador
+
+# (rótulo, idade mínima) da maior para a menor; abaixo da última, MENOR_IDADE
+FAIXAS = (
+    ('16+ anos', 16),
+    ('13-15 anos', 13),
+    ('10-12 anos', 10),
+    ('6-9 anos', 6),
+)
+MENOR_IDADE = 'Menos de 6 anos'
+
+Dimensao = namedtuple('Dimensao', ['titulo', 'ordem'])
+
+DIMENSOES = {
+    'unidade': Dimensao('Unidade', None),
+    'classe': Dimensao('Classe', None),
+    'faixa': Dimensao('Faixa etária', [rotulo for rotulo, _ in reversed(FAIXAS)] + [MENOR_IDADE]),
+}
+
+Pivo = namedtuple('Pivo', ['linhas', 'colunas', 'celulas', 'total_linha', 'total_coluna', 'total'])
+
+
+def _completou(hoje, anos):
+    """Data de nascimento mais recente de quem já tem `anos` anos em `hoje`"""
+    try:
+        return hoje.replace(year=hoje.year - anos)
+    except ValueError:  # 29 de fevereiro
+        return hoje.replace(year=hoje.year - anos, day=28)
+
+
+def faixa_etaria(hoje=None):
+    """Expressão SQL com o rótulo da faixa etária na data `hoje`"""
+    hoje = hoje or date.today()
+    return case(
+        *[(Desbravador.data_nascimento <= _completou(hoje, idade), rotulo) for rotulo, idade in FAIXAS],
+        else_=MENOR_IDADE
+    )
+
+
+def _expressoes(hoje):
+    return {
+        'unidade': Desbravador.unidade,
+        'classe': Desbravador.classe,
+        'faixa': faixa_etaria(hoje),
+    }
+
+
+def cubo(dimensoes=tuple(DIMENSOES), hoje=None):
+    """Contagens [(valor de cada dimensão..., quantidade)] dos desbravadores ativos"""
+    expressoes = _expressoes(hoje or date.today())
+    colunas = [expressoes[nome].label(nome) for nome in dimensoes]
+    linhas = db.session.execute(
+        select(*colunas, func.count(Desbravador.id))
+        .where(Desbravador.ativo == True)
+        .group_by(*colunas)
+    ).all()
+    return [tuple(linha) for linha in linhas]
+
+
+def _valores(celulas, posicao, nome):
+    encontrados = {celula[posicao] for celula in celulas}
+    ordem = DIMENSOES[nome].ordem
+    if ordem:
+        return [valor for valor in ordem if valor in encontrados]
+    return sorted(encontrados, key=lambda valor: (valor is None, valor or ''))
+
+
+def filtrar(celulas, filtros, dimensoes=tuple(DIMENSOES)):
+    """Células do cubo que atendem aos filtros {dimensão: valor}"""
+    posicoes = [(dimensoes.index(nome), valor) for nome, valor in filtros.items() if valor]
+    return [celula for celula in celulas if all(celula[i] == valor for i, valor in posicoes)]
+
+
+def totais(celulas, nome, dimensoes=tuple(DIMENSOES)):
+    """[(valor, quantidade)] de uma dimensão, somando as demais"""
+    posicao = dimensoes.index(nome)
+    soma = {}
+    for celula in celulas:
+        soma[celula[posicao]] = soma.get(celula[posicao], 0) + celula[-1]
+    return [(valor, soma[valor]) for valor in _valores(celulas, posicao, nome)]
+
+
+def pivotar(celulas, linhas, colunas, dimensoes=tuple(DIMENSOES)):
+    """Tabela cruzada de duas dimensões, com os totais de linhas e colunas"""
+    i, j = dimensoes.index(linhas), dimensoes.index(colunas)
+    soma = {}
+    for celula in celulas:
+        chave = (celula[i], celula[j])
+        soma[chave] = soma.get(chave, 0) + celula[-1]
+    return Pivo(
+        linhas=_valores(celulas, i, linhas),
+        colunas=_valores(celulas, j, colunas),
+        celulas=soma,
+        total_linha=dict(totais(celulas, linhas, dimensoes)),
+        total_coluna=dict(totais(celulas, colunas, dimensoes)),
+        total=sum(celula[-1] for celula in celulas)
+    )
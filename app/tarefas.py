@@ -0,0 +1,493 @@
+"""
+Fila de tarefas em segundo plano, guardada no próprio banco (tabela tarefa).
+
+Operações demoradas (geração de mensalidades, PDFs de relatórios,
+importação de desbravadores) são colocadas na fila com enfileirar() e
+executadas fora das threads que atendem as requisições, por quem consome a
+fila conforme JOBS_EXECUTOR:
+
+- 'local': uma thread em cada processo da aplicação (padrão em
+  desenvolvimento; nada mais a executar);
+- 'worker': os processos do `flask worker` (app.worker), padrão em produção;
+- 'imediato': na própria chamada a enfileirar, para testes.
+
+Cada tarefa é reservada com um único UPDATE ... RETURNING: dois consumidores
+nunca executam a mesma, e as de maior prioridade saem primeiro. Uma tarefa
+que falha volta para a fila após JOBS_RETRY_DELAY segundos (o dobro a cada
+nova falha), até max_tentativas; ValueError indica dado inválido e não é
+repetido. Tarefas de um processo deste host que não existe mais voltam para
+a fila (recuperar_interrompidas).
+
+As operações da fila usam conexões próprias, em transações curtas, fora da
+sessão do ORM: não se misturam às alterações feitas pela tarefa e não
+trocam versões de tabelas (app.versoes).
+
+Tarefas recorrentes (JOBS_SCHEDULE) usam expressões no formato do cron.
+Cada ocorrência é enfileirada com uma chave única, de modo que vários
+processos com o agendador ativo não a executam duas vezes.
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+import traceback
+from collections import namedtuple
+from datetime import datetime, timedelta
+from functools import lru_cache
+from flask import current_app
+from sqlalchemy import select, insert, update, delete
+from sqlalchemy.exc import IntegrityError, OperationalError
+from app import db
+from app.models import Tarefa
+
+AGUARDANDO = 'aguardando'
+PROCESSANDO = 'processando'
+CONCLUIDA = 'concluida'
+FALHOU = 'falhou'
+
+ALTA = 10
+NORMAL = 0
+BAIXA = -10
+
+# Intervalo mínimo (segundos) entre duas gravações do andamento de uma tarefa
+INTERVALO_PROGRESSO = 0.5
+
+# Horas para trás em que o agendador procura ocorrências perdidas ao iniciar
+HORAS_ATRASADAS = 24
+
+_tabela = Tarefa.__table__
+_registro = {}
+_atual = threading.local()
+_lock = threading.Lock()
+_local = None
+
+
+def tarefa(nome):
+    """Registra a função como a tarefa `nome`; os argumentos vêm do JSON enfileirado"""
+    def registrar(funcao):
+        _registro[nome] = funcao
+        return funcao
+    return registrar
+
+
+def identificacao():
+    """host:pid deste processo, gravado nas tarefas que ele executa"""
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def _json(valor):
+    return None if valor is None else json.dumps(valor, ensure_ascii=False, default=str)
+
+
+def _atualizar(tarefa_id, **valores):
+    with db.engine.begin() as conexao:
+        conexao.execute(update(_tabela).where(_tabela.c.id == tarefa_id).values(**valores))
+
+
+# Fila
+
+def obter(tarefa_id):
+    """Linha da tarefa (None se não existir)"""
+    with db.engine.connect() as conexao:
+        return conexao.execute(select(_tabela).where(_tabela.c.id == tarefa_id)).first()
+
+
+def enfileirar(tipo, argumentos=None, prioridade=NORMAL, chave=None, max_tentativas=3, executar_em=None):
+    """Coloca a tarefa na fila e devolve a linha dela
+
+    Com chave, se já existir uma tarefa com a mesma chave (em qualquer
+    situação), ela é devolvida e nada é enfileirado.
+    """
+    if tipo not in _registro:
+        raise ValueError(f'Tarefa desconhecida: {tipo}')
+
+    agora = datetime.now()
+    try:
+        with db.engine.begin() as conexao:
+            if chave is not None:
+                existente = conexao.execute(select(_tabela).where(_tabela.c.chave == chave)).first()
+                if existente is not None:
+                    return existente
+            tarefa_id = conexao.execute(insert(_tabela).values(
+                tipo=tipo,
+                argumentos=_json(argumentos or {}),
+                chave=chave,
+                prioridade=prioridade,
+                situacao=AGUARDANDO,
+                tentativas=0,
+                max_tentativas=max_tentativas,
+                executar_em=executar_em or agora,
+                progresso=0.0,
+                criada_em=agora
+            )).inserted_primary_key[0]
+    except IntegrityError:
+        if chave is None:
+            raise
+        # Outro processo enfileirou a mesma chave ao mesmo tempo
+        with db.engine.connect() as conexao:
+            return conexao.execute(select(_tabela).where(_tabela.c.chave == chave)).first()
+
+    _despachar(tarefa_id)
+    return obter(tarefa_id)
+
+
+def reenfileirar(tarefa_id):
+    """Devolve à fila uma tarefa encerrada, com as tentativas zeradas"""
+    _atualizar(tarefa_id, situacao=AGUARDANDO, tentativas=0, progresso=0.0, executar_em=datetime.now(),
+               mensagem=None, resultado=None, erro=None, worker=None, iniciada_em=None, concluida_em=None)
+    _despachar(tarefa_id)
+    return obter(tarefa_id)
+
+
+def _despachar(tarefa_id):
+    executor = current_app.config['JOBS_EXECUTOR']
+    if executor == 'imediato':
+        executar_proxima(tarefa_id)
+    elif executor == 'local':
+        _iniciar_local(current_app._get_current_object()).set()
+
+
+def reservar(tarefa_id=None):
+    """Reserva a próxima tarefa pronta (ou a tarefa indicada) para este processo"""
+    agora = datetime.now()
+    proxima = select(_tabela.c.id).where(
+        _tabela.c.situacao == AGUARDANDO,
+        _tabela.c.executar_em <= agora
+    )
+    if tarefa_id is not None:
+        proxima = proxima.where(_tabela.c.id == tarefa_id)
+    proxima = proxima.order_by(
+        _tabela.c.prioridade.desc(), _tabela.c.executar_em, _tabela.c.id
+    ).limit(1).scalar_subquery()
+
+    with db.engine.begin() as conexao:
+        return conexao.execute(
+            update(_tabela)
+            .where(_tabela.c.id == proxima, _tabela.c.situacao == AGUARDANDO)
+            .values(situacao=PROCESSANDO, tentativas=_tabela.c.tentativas + 1, worker=identificacao(),
+                    iniciada_em=agora, progresso=0.0)
+            .returning(*_tabela.c)
+        ).first()
+
+
+def executar_proxima(tarefa_id=None):
+    """Reserva e executa uma tarefa; False se não havia nenhuma pronta"""
+    linha = reservar(tarefa_id)
+    if linha is None:
+        return False
+    executar(linha)
+    return True
+
+
+def executar(linha):
+    """Executa uma tarefa já reservada e registra o resultado (ou a falha)"""
+    app = current_app._get_current_object()
+    # Contexto próprio: sessão do ORM e consultas registradas só desta tarefa
+    with app.app_context():
+        _atual.id, _atual.gravado_em = linha.id, 0.0
+        try:
+            funcao = _registro.get(linha.tipo)
+            if funcao is None:
+                raise ValueError(f'Tarefa desconhecida: {linha.tipo}')
+            resultado = funcao(**json.loads(linha.argumentos or '{}'))
+        except Exception as falha:
+            db.session.rollback()
+            _registrar_falha(app, linha, falha)
+        else:
+            _atualizar(linha.id, situacao=CONCLUIDA, progresso=1.0, resultado=_json(resultado),
+                       mensagem=None, erro=None, concluida_em=datetime.now())
+        finally:
+            _atual.id = None
+
+
+def _registrar_falha(app, linha, falha):
+    agora = datetime.now()
+    definitiva = isinstance(falha, ValueError) or linha.tentativas >= linha.max_tentativas
+    mensagem = str(falha)[:255] if isinstance(falha, ValueError) else 'Erro ao executar a tarefa.'
+    if not isinstance(falha, ValueError):
+        app.logger.exception('Falha na tarefa %s (%s), tentativa %d de %d',
+                             linha.id, linha.tipo, linha.tentativas, linha.max_tentativas)
+
+    if definitiva:
+        _atualizar(linha.id, situacao=FALHOU, mensagem=mensagem, erro=traceback.format_exc(), concluida_em=agora)
+    else:
+        espera = app.config['JOBS_RETRY_DELAY'] * 2 ** (linha.tentativas - 1)
+        _atualizar(linha.id, situacao=AGUARDANDO, mensagem=mensagem, erro=traceback.format_exc(),
+                   executar_em=agora + timedelta(seconds=espera), worker=None)
+
+
+def progresso(fracao, dados=None, mensagem=None):
+    """Registra o andamento da tarefa em execução; fora de uma tarefa, não faz nada
+
+    dados: resultado parcial (JSON), visível enquanto a tarefa executa.
+    """
+    tarefa_id = getattr(_atual, 'id', None)
+    if tarefa_id is None:
+        return
+    agora = time.monotonic()
+    if fracao < 1 and agora - _atual.gravado_em < INTERVALO_PROGRESSO:
+        return
+    _atual.gravado_em = agora
+
+    valores = {'progresso': min(max(float(fracao), 0.0), 1.0)}
+    if dados is not None:
+        valores['resultado'] = _json(dados)
+    if mensagem is not None:
+        valores['mensagem'] = mensagem[:255]
+    try:
+        _atualizar(tarefa_id, **valores)
+    except OperationalError:
+        pass  # banco ocupado: o andamento é informativo e fica para a próxima chamada
+
+
+def _processo_existe(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def recuperar_interrompidas():
+    """Devolve à fila as tarefas de processos deste host que não existem mais; retorna quantas"""
+    prefixo = f'{socket.gethostname()}:'
+    with db.engine.connect() as conexao:
+        linhas = conexao.execute(
+            select(_tabela.c.id, _tabela.c.worker, _tabela.c.tentativas, _tabela.c.max_tentativas)
+            .where(_tabela.c.situacao == PROCESSANDO, _tabela.c.worker.startswith(prefixo))
+        ).all()
+
+    recuperadas = 0
+    for linha in linhas:
+        pid = linha.worker[len(prefixo):]
+        if pid.isdigit() and _processo_existe(int(pid)):
+            continue
+        mensagem = 'O processo que executava a tarefa foi interrompido.'
+        if linha.tentativas >= linha.max_tentativas:
+            _atualizar(linha.id, situacao=FALHOU, mensagem=mensagem, concluida_em=datetime.now())
+        else:
+            _atualizar(linha.id, situacao=AGUARDANDO, mensagem=mensagem, executar_em=datetime.now(), worker=None)
+        recuperadas += 1
+    return recuperadas
+
+
+def contagem():
+    """Quantidade de tarefas por situação"""
+    with db.engine.connect() as conexao:
+        return dict(conexao.execute(
+            select(_tabela.c.situacao, db.func.count()).group_by(_tabela.c.situacao)
+        ).all())
+
+
+def recentes(limite=20):
+    """Últimas tarefas enfileiradas"""
+    with db.engine.connect() as conexao:
+        return conexao.execute(select(_tabela).order_by(_tabela.c.id.desc()).limit(limite)).all()
+
+
+# Agendamento (JOBS_SCHEDULE)
+
+Cron = namedtuple('Cron', ['minutos', 'horas', 'dias', 'meses', 'dias_semana', 'restringe_dia', 'restringe_semana'])
+
+# (mínimo, máximo) de cada campo; no dia da semana, 0 e 7 são domingo
+_LIMITES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+
+@lru_cache(maxsize=64)
+def interpretar(expressao):
+    """Expressão cron de 5 campos (minuto hora dia mês dia-da-semana)
+
+    Cada campo aceita *, números, listas (1,15), intervalos (1-5) e passos
+    (*/10, 8-18/2). Como no cron, se dia e dia da semana forem restritos,
+    basta um dos dois coincidir.
+    """
+    partes = expressao.split()
+    if len(partes) != 5:
+        raise ValueError(f'Expressão cron inválida (use 5 campos): {expressao!r}')
+
+    campos = []
+    for parte, (minimo, maximo) in zip(partes, _LIMITES):
+        valores = set()
+        for item in parte.split(','):
+            faixa, _, passo = item.partition('/')
+            try:
+                if faixa == '*':
+                    inicio, fim = minimo, maximo
+                elif '-' in faixa:
+                    inicio, fim = (int(valor) for valor in faixa.split('-', 1))
+                else:
+                    inicio = int(faixa)
+                    fim = maximo if passo else inicio
+                passo = int(passo) if passo else 1
+            except ValueError:
+                raise ValueError(f'Expressão cron inválida: {expressao!r}')
+            if not minimo <= inicio <= fim <= maximo or passo < 1:
+                raise ValueError(f'Expressão cron inválida: {expressao!r}')
+            valores.update(range(inicio, fim + 1, passo))
+        campos.append(frozenset(valores))
+
+    minutos, horas, dias, meses, dias_semana = campos
+    dias_semana = frozenset(dia % 7 for dia in dias_semana)
+    return Cron(minutos, horas, dias, meses, dias_semana, partes[2] != '*', partes[4] != '*')
+
+
+def corresponde(cron, momento):
+    """Se o minuto de `momento` é uma ocorrência da expressão"""
+    if (momento.minute not in cron.minutos or momento.hour not in cron.horas
+            or momento.month not in cron.meses):
+        return False
+    dia = momento.day in cron.dias
+    semana = momento.isoweekday() % 7 in cron.dias_semana
+    if cron.restringe_dia and cron.restringe_semana:
+        return dia or semana
+    return dia and semana
+
+
+def _enfileirar_ocorrencia(tipo, argumentos, momento):
+    return enfileirar(tipo, argumentos, chave=f'agenda:{tipo}:{momento:%Y-%m-%d %H:%M}')
+
+
+def agendar(momento=None):
+    """Enfileira as tarefas de JOBS_SCHEDULE com ocorrência no minuto de `momento` (padrão: agora)"""
+    momento = (momento or datetime.now()).replace(second=0, microsecond=0)
+    enfileiradas = []
+    for expressao, tipo, argumentos in current_app.config['JOBS_SCHEDULE']:
+        if corresponde(interpretar(expressao), momento):
+            enfileiradas.append(_enfileirar_ocorrencia(tipo, argumentos, momento))
+    return enfileiradas
+
+
+def agendar_desde(ultimo, agora):
+    """Enfileira as ocorrências de cada minuto depois de `ultimo` até `agora`, inclusive
+
+    O agendador chama a cada volta com o minuto da volta anterior: um minuto
+    passado enquanto uma tarefa executava não é perdido (no máximo as
+    últimas HORAS_ATRASADAS horas, se o relógio saltar).
+    """
+    agora = agora.replace(second=0, microsecond=0)
+    momento = max(ultimo.replace(second=0, microsecond=0), agora - timedelta(hours=HORAS_ATRASADAS))
+    enfileiradas = []
+    while momento < agora:
+        momento += timedelta(minutes=1)
+        enfileiradas += agendar(momento)
+    return enfileiradas
+
+
+def agendar_atrasadas(horas=HORAS_ATRASADAS):
+    """Enfileira a última ocorrência de cada agendamento nas últimas `horas`
+
+    Chamada ao iniciar o agendador: recupera a ocorrência perdida enquanto
+    nenhum processo estava ativo (as já executadas são reconhecidas pela chave).
+    """
+    agora = datetime.now().replace(second=0, microsecond=0)
+    enfileiradas = []
+    for expressao, tipo, argumentos in current_app.config['JOBS_SCHEDULE']:
+        cron = interpretar(expressao)
+        for minutos in range(horas * 60):
+            momento = agora - timedelta(minutes=minutos)
+            if corresponde(cron, momento):
+                enfileiradas.append(_enfileirar_ocorrencia(tipo, argumentos, momento))
+                break
+    return enfileiradas
+
+
+# Execução local (JOBS_EXECUTOR = 'local')
+
+def _consumir(app, acordar):
+    """Thread que consome a fila dentro do processo da aplicação"""
+    intervalo = app.config['JOBS_POLL_INTERVAL']
+    ultimo = datetime.now()
+    with app.app_context():
+        try:
+            recuperar_interrompidas()
+            agendar_atrasadas()
+        except Exception:
+            app.logger.exception('Falha ao preparar a fila de tarefas')
+
+    while True:
+        try:
+            with app.app_context():
+                agora = datetime.now()
+                agendar_desde(ultimo, agora)
+                ultimo = agora
+                executou = executar_proxima()
+        except Exception:
+            app.logger.exception('Falha ao consumir a fila de tarefas')
+            executou = False
+        if not executou:
+            acordar.wait(intervalo)
+            acordar.clear()
+
+
+def _iniciar_local(app):
+    """Inicia (uma vez por processo) a thread da fila; devolve o evento que a acorda"""
+    global _local
+    with _lock:
+        if _local is None or _local[1] != os.getpid() or not _local[0].is_alive():
+            acordar = threading.Event()
+            thread = threading.Thread(target=_consumir, args=(app, acordar), name='tarefas', daemon=True)
+            thread.start()
+            _local = (thread, os.getpid(), acordar)
+        return _local[2]
+
+
+def init_app(app):
+    """No modo 'local', inicia a thread da fila na primeira requisição de cada processo"""
+    if app.config['JOBS_EXECUTOR'] not in ('local', 'worker', 'imediato'):
+        raise ValueError(f'JOBS_EXECUTOR desconhecido: {app.config["JOBS_EXECUTOR"]}')
+    for expressao, tipo, _ in app.config['JOBS_SCHEDULE']:
+        interpretar(expressao)
+
+    @app.before_request
+    def iniciar_fila():
+        if app.config['JOBS_EXECUTOR'] == 'local' and (_local is None or _local[1] != os.getpid()):
+            _iniciar_local(app)
+
+
+# Tarefas do sistema
+
+@tarefa('gerar_mensalidades')
+def _gerar_mensalidades(ano=None, mes=None, valor=None):
+    """Mensalidades do mês (padrão: o atual) para os desbravadores ativos"""
+    from app.mensalidades import gerar_mensalidades, VALOR_PADRAO
+    hoje = datetime.now()
+    ano, mes = ano or hoje.year, mes or hoje.month
+    criadas = gerar_mensalidades(ano, mes, VALOR_PADRAO if valor is None else valor)
+    return {'ano': ano, 'mes': mes, 'criadas': criadas}
+
+
+@tarefa('fechar_saldos')
+def _fechar_saldos():
+    """Saldos de todos os meses encerrados"""
+    from app import saldos
+    fechamento = saldos.garantir_fechamentos(*saldos.mes_aberto())
+    if fechamento is None:
+        return None
+    return {'ano': fechamento.ano, 'mes': fechamento.mes, 'saldo_final': fechamento.saldo_final}
+
+
+@tarefa('relatorio_pdf')
+def _relatorio_pdf(tipo, ano, mes):
+    from app import relatorios_pdf
+    return {'arquivo': os.path.basename(relatorios_pdf.gerar(tipo, ano, mes))}
+
+
+@tarefa('importar_desbravadores')
+def _importar_desbravadores(caminho, formato, simular=False):
+    from app import importacao
+    return importacao.executar(caminho, formato, simular)
+
+
+@tarefa('limpar_tarefas')
+def _limpar_tarefas(dias=None):
+    """Apaga as tarefas encerradas há mais de JOBS_KEEP_DAYS dias"""
+    limite = datetime.now() - timedelta(days=current_app.config['JOBS_KEEP_DAYS'] if dias is None else dias)
+    with db.engine.begin() as conexao:
+        apagadas = conexao.execute(
+            delete(_tabela).where(_tabela.c.situacao.in_((CONCLUIDA, FALHOU)), _tabela.c.concluida_em < limite)
+        ).rowcount
+    return {'apagadas': apagadas}
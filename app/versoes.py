@@ -0,0 +1,118 @@
+"""
+Versões dos dados por tabela.
+
+Cada commit que altera uma tabela troca a marca de versão dela em
+VersaoTabela, na mesma transação da alteração. Quem guarda algo derivado
+dos dados (PDFs gerados, contagens, fragmentos de página) compara as
+versões das tabelas de que depende em vez de recalcular para descobrir
+se algo mudou.
+
+As alterações são detectadas nos flushes do ORM e nos INSERT/UPDATE/DELETE
+em lote executados pela sessão. Comandos executados diretamente na conexão
+(tabelas de resumo e fechamento mantidas por eventos) não contam: derivam
+de tabelas cujas versões já mudam.
+
+Módulos que mantêm caches em memória registram uma função com
+ao_alterar(); ela recebe o conjunto de tabelas alteradas após cada commit.
+Como os ouvintes só rodam no processo que fez o commit, o que é guardado
+por processo e precisa valer em todos os workers deve usar as versões na
+chave (app.cache, app.condicional).
+"""
+
+import uuid
+from flask import g, has_request_context
+from sqlalchemy import event, select, update, insert
+from sqlalchemy.orm import Session
+from app import db
+from app.models import VersaoTabela
+
+_INFO = 'versoes_tabelas'
+
+# Versões já lidas na requisição atual (em g), descartadas a cada commit
+_LIDAS = 'versoes_lidas'
+
+_ouvintes = []
+
+
+def ao_alterar(funcao):
+    """Registra funcao(tabelas) para ser chamada após cada commit com alterações"""
+    _ouvintes.append(funcao)
+    return funcao
+
+
+def versoes(*tabelas, antecipar=()):
+    """Marcas de versão atuais: {tabela: versão} ('0' se nunca alterada)
+
+    Em uma requisição, cada tabela é consultada uma vez: a rota, o ETag
+    (app.condicional) e o cache (app.cache) usam as mesmas versões. As
+    tabelas de antecipar, que a requisição deve pedir em seguida, vêm na
+    mesma consulta quando alguma das pedidas precisa ser consultada.
+    """
+    lidas = g.setdefault(_LIDAS, {}) if has_request_context() else {}
+    faltando = [tabela for tabela in tabelas if tabela not in lidas]
+    if faltando:
+        faltando += [tabela for tabela in antecipar if tabela not in lidas and tabela not in faltando]
+        encontradas = dict(db.session.execute(
+            select(VersaoTabela.tabela, VersaoTabela.versao).where(VersaoTabela.tabela.in_(faltando))
+        ).all())
+        for tabela in faltando:
+            lidas[tabela] = encontradas.get(tabela, '0')
+    return {tabela: lidas[tabela] for tabela in tabelas}
+
+
+def lembrar(marca):
+    """Guarda na requisição versões lidas por outra consulta ({tabela: versão})"""
+    if has_request_context():
+        g.setdefault(_LIDAS, {}).update(marca)
+
+
+def _registrar(session, tabela):
+    if tabela and tabela != VersaoTabela.__tablename__:
+        session.info.setdefault(_INFO, set()).add(tabela)
+
+
+@event.listens_for(Session, 'before_flush')
+def _coletar_tabelas(session, flush_context, instances):
+    for obj in list(session.new) + list(session.deleted) + list(session.dirty):
+        if obj in session.dirty and not session.is_modified(obj):
+            continue
+        _registrar(session, getattr(obj, '__tablename__', None))
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _coletar_tabelas_em_lote(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        _registrar(orm_execute_state.session, orm_execute_state.statement.table.name)
+
+
+@event.listens_for(Session, 'before_commit')
+def _trocar_versoes(session):
+    """Grava as novas marcas de versão junto com as alterações"""
+    session.flush()
+    tabelas = session.info.get(_INFO)
+    if not tabelas:
+        return
+
+    conexao = session.connection()
+    for tabela in sorted(tabelas):
+        nova = uuid.uuid4().hex
+        resultado = conexao.execute(
+            update(VersaoTabela).where(VersaoTabela.tabela == tabela).values(versao=nova)
+        )
+        if resultado.rowcount == 0:
+            conexao.execute(insert(VersaoTabela).values(tabela=tabela, versao=nova))
+
+
+@event.listens_for(Session, 'after_commit')
+def _avisar_ouvintes(session):
+    tabelas = session.info.pop(_INFO, None)
+    if tabelas:
+        if has_request_context():
+            g.pop(_LIDAS, None)
+        for funcao in _ouvintes:
+            funcao(tabelas)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _descartar_tabelas(session):
+    session.info.pop(_INFO, None)
@@ -0,0 +1,119 @@
+"""
+Pool de processos que consome a fila de tarefas (flask worker).
+
+O processo principal cria JOBS_WORKERS processos filhos (fork), recria os
+que terminarem, devolve à fila as tarefas que eles deixaram pela metade e,
+a cada minuto, enfileira as tarefas agendadas (JOBS_SCHEDULE). Cada filho
+executa uma tarefa por vez, com JOBS_EXECUTOR = 'worker'.
+
+SIGTERM ou Ctrl+C encerram o pool: cada filho termina a tarefa em
+andamento (por até ESPERA_ENCERRAMENTO segundos) e sai.
+"""
+
+import signal
+import time
+from datetime import datetime
+from multiprocessing import get_context
+from app import db
+
+# Segundos para os filhos terminarem a tarefa em andamento ao encerrar
+ESPERA_ENCERRAMENTO = 60
+
+# Segundos entre duas verificações do processo principal
+INTERVALO_PRINCIPAL = 1
+
+
+def _filho(app):
+    """Laço de um processo filho: executa tarefas até receber SIGTERM"""
+    from app import tarefas
+
+    encerrar = []
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C chega ao grupo todo; o principal coordena
+    signal.signal(signal.SIGTERM, lambda *_: encerrar.append(True))
+
+    # A aplicação vem do principal (fork); as tarefas enfileiradas aqui ficam para o pool
+    app.config['JOBS_EXECUTOR'] = 'worker'
+    with app.app_context():
+        db.engine.dispose(close=False)  # conexões herdadas pertencem ao principal
+    intervalo = app.config['JOBS_POLL_INTERVAL']
+    while not encerrar:
+        try:
+            # Um contexto por tarefa: sessão e consultas registradas não se acumulam
+            with app.app_context():
+                executou = tarefas.executar_proxima()
+        except Exception:
+            app.logger.exception('Falha ao consumir a fila de tarefas')
+            executou = False
+        if not executou:
+            # Dorme em passos curtos para atender o SIGTERM logo
+            limite = time.monotonic() + intervalo
+            while not encerrar and time.monotonic() < limite:
+                time.sleep(min(0.2, intervalo))
+
+
+def executar(app, processos=None, agendador=True, saida=print):
+    """Mantém o pool de processos até SIGTERM/SIGINT"""
+    from app import tarefas
+
+    processos = processos or app.config['JOBS_WORKERS']
+    contexto = get_context('fork')
+    encerrar = []
+
+    def sinal(numero, _):
+        encerrar.append(numero)
+
+    signal.signal(signal.SIGTERM, sinal)
+    signal.signal(signal.SIGINT, sinal)
+
+    ultimo = datetime.now()
+    with app.app_context():
+        tarefas.recuperar_interrompidas()
+        if agendador:
+            for linha in tarefas.agendar_atrasadas():
+                saida(f'Agendada: {linha.tipo} (tarefa {linha.id})')
+
+    filhos = []
+    while not encerrar:
+        vivos = [filho for filho in filhos if filho.is_alive()]
+        if len(vivos) < len(filhos):
+            for filho in filhos:
+                if not filho.is_alive():
+                    filho.join()
+                    saida(f'Processo {filho.pid} terminou (código {filho.exitcode}).')
+        filhos = vivos
+        recriar = len(filhos) < processos
+        if recriar:
+            with app.app_context():
+                # Os filhos não herdam conexões abertas pelo principal
+                db.engine.dispose()
+        while len(filhos) < processos:
+            filho = contexto.Process(target=_filho, args=(app,), name='tarefas')
+            filho.start()
+            filhos.append(filho)
+            saida(f'Processo {filho.pid} iniciado.')
+
+        try:
+            with app.app_context():
+                if recriar:
+                    tarefas.recuperar_interrompidas()
+                if agendador:
+                    agora = datetime.now()
+                    for linha in tarefas.agendar_desde(ultimo, agora):
+                        saida(f'Agendada: {linha.tipo} (tarefa {linha.id})')
+                    ultimo = agora
+        except Exception:
+            app.logger.exception('Falha no agendador de tarefas')
+        time.sleep(INTERVALO_PRINCIPAL)
+
+    saida('Encerrando: aguardando as tarefas em andamento...')
+    for filho in filhos:
+        filho.terminate()  # SIGTERM: o filho sai após a tarefa atual
+    limite = time.monotonic() + ESPERA_ENCERRAMENTO
+    for filho in filhos:
+        filho.join(max(0, limite - time.monotonic()))
+        if filho.is_alive():
+            filho.kill()
+            filho.join()
+    # Tarefas dos filhos mortos à força voltam para a fila
+    with app.app_context():
+        tarefas.recuperar_interrompidas()
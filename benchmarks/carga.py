@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+"""
+Teste de carga das rotas da aplicação, com linha de base em JSON.
+
+Prepara um banco próprio (padrão: instance/carga.db) com dados sintéticos
+(app.sinteticos, os mesmos de flask gerar-dados) e percorre as rotas de
+app.diagnostico.ROTAS, que cobrem os blueprints, além da página de login.
+Para cada rota informa:
+
+- latência p50, p95 e p99 (e a da primeira requisição, com o cache frio);
+- consultas SQL por requisição;
+- pico de memória residente (RSS) do processo que atendeu as requisições.
+
+Por padrão usa o cliente de testes do Flask no próprio processo. Com
+--gunicorn, sobe o gunicorn (gunicorn.conf.py) em localhost e faz
+requisições HTTP concorrentes; as consultas vêm do cabeçalho Server-Timing
+(app.profiling) e o RSS é o maior entre os workers.
+
+    python benchmarks/carga.py --gerar --json base.json
+    python benchmarks/carga.py --comparar base.json
+
+Com --comparar, rotas com mais consultas, outro status HTTP ou p50 acima
+da tolerância em relação à linha de base são apontadas e o comando termina
+com erro (o p50 é a medida estável com poucas dezenas de requisições; p95 e
+p99 ficam no JSON para acompanhamento).
+O pico de RSS por rota usa /proc/<pid>/clear_refs (Linux).
+"""
+
+import argparse
+import http.cookiejar
+import json
+import math
+import os
+import re
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+_CONSULTAS = re.compile(r'desc="(\d+) consultas"')
+
+# Diferenças de p50 abaixo disto (ms) são ruído, mesmo acima da tolerância
+RUIDO_MS = 2.0
+
+
+def argumentos():
+    parser = argparse.ArgumentParser(description='Teste de carga das rotas da aplicação.')
+    parser.add_argument('--banco', default=os.path.join(RAIZ, 'instance', 'carga.db'),
+                        help='Arquivo SQLite usado no teste (padrão: instance/carga.db).')
+    dados = parser.add_argument_group('dados sintéticos (com --gerar ou quando o banco não existe)')
+    dados.add_argument('--gerar', action='store_true', help='Recria o banco antes do teste.')
+    dados.add_argument('--desbravadores', type=int, default=500)
+    dados.add_argument('--anos', type=int, default=3)
+    dados.add_argument('--transacoes', type=int, default=20000)
+    dados.add_argument('--eventos', type=int, default=500)
+    dados.add_argument('--semente', type=int, default=1)
+    dados.add_argument('--ate', help='Último mês com dados, AAAA-MM (padrão: mês atual).')
+    carga = parser.add_argument_group('carga')
+    carga.add_argument('--requisicoes', type=int, default=50, help='Requisições medidas por rota.')
+    carga.add_argument('--rota', action='append', help='Mede apenas as rotas que contêm este trecho.')
+    carga.add_argument('--gunicorn', action='store_true', help='Mede um gunicorn real em localhost.')
+    carga.add_argument('--workers', type=int, default=2, help='Workers do gunicorn.')
+    carga.add_argument('--concorrencia', type=int, default=4, help='Clientes simultâneos (com --gunicorn).')
+    carga.add_argument('--porta', type=int, default=5099)
+    carga.add_argument('--senha-admin', default='admin123')
+    carga.add_argument('--senha-desbravador', default=None,
+                       help='Senha do desbravador com login (padrão: a dos dados sintéticos).')
+    saida = parser.add_argument_group('resultado')
+    saida.add_argument('--json', help='Grava o resultado (linha de base) neste arquivo.')
+    saida.add_argument('--comparar', help='Linha de base (JSON) para comparação.')
+    saida.add_argument('--tolerancia', type=float, default=0.25,
+                       help='Aumento de p50 aceito na comparação (0.25 = 25%%).')
+    return parser.parse_args()
+
+
+# Memória
+
+def _status(pid, campo):
+    try:
+        with open(f'/proc/{pid}/status') as arquivo:
+            for linha in arquivo:
+                if linha.startswith(campo + ':'):
+                    return int(linha.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def zerar_pico(pid):
+    """Reinicia o pico de RSS (VmHWM) do processo; False se o sistema não permitir"""
+    try:
+        with open(f'/proc/{pid}/clear_refs', 'w') as arquivo:
+            arquivo.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def pico_rss_kb(pid):
+    if _status(pid, 'VmHWM') is not None:
+        return _status(pid, 'VmHWM')
+    if pid == os.getpid():
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return None
+
+
+# Estatísticas
+
+def percentil(valores, p):
+    """Percentil pelo método do posto mais próximo (valores ordenados)"""
+    return valores[max(0, math.ceil(p / 100 * len(valores)) - 1)]
+
+
+def resumir(latencias, consultas, status, rss):
+    latencias = sorted(latencia * 1000 for latencia in latencias)
+    return {
+        'status': status,
+        'requisicoes': len(latencias),
+        'p50_ms': round(percentil(latencias, 50), 2),
+        'p95_ms': round(percentil(latencias, 95), 2),
+        'p99_ms': round(percentil(latencias, 99), 2),
+        'media_ms': round(statistics.fmean(latencias), 2),
+        'consultas': max(consultas) if consultas else None,
+        'rss_pico_kb': rss,
+    }
+
+
+# Preparação
+
+def _flask(*argumentos):
+    subprocess.run([sys.executable, '-m', 'flask', *argumentos], cwd=RAIZ, check=True)
+
+
+def preparar(args, existia):
+    """Cria e preenche o banco quando pedido (ou quando ainda não existe)
+
+    Roda nos comandos flask init-db, create-admin e gerar-dados, em outros
+    processos: a memória usada na geração não conta no RSS medido aqui.
+    """
+    _flask('init-db')
+    if existia and not args.gerar:
+        return False
+    _flask('create-admin', '--username', 'admin', '--email', 'admin@desbravadores.com',
+           '--nome', 'Administrador do Sistema', '--senha', args.senha_admin)
+    gerar = ['gerar-dados', '--desbravadores', args.desbravadores, '--anos', args.anos,
+             '--transacoes', args.transacoes, '--eventos', args.eventos, '--semente', args.semente]
+    if args.ate:
+        gerar += ['--ate', args.ate]
+    _flask(*map(str, gerar))
+    return True
+
+
+def rotas_medidas(args):
+    from app.diagnostico import ROTAS
+    rotas = [('/auth/login', None)] + [(url, perfil) for url, perfil, _ in ROTAS]
+    if args.rota:
+        rotas = [(url, perfil) for url, perfil in rotas if any(trecho in url for trecho in args.rota)]
+    return rotas
+
+
+# Cliente de testes
+
+def medir_cliente(app, args):
+    from app import db
+    from app.diagnostico import identidades_de_teste, cliente_autenticado, capturar_consultas
+
+    with app.app_context():
+        identidades, primeiro = identidades_de_teste()
+        engine = db.engine
+
+    resultados = {}
+    for url, perfil in rotas_medidas(args):
+        if perfil is not None and perfil not in identidades:
+            continue
+        endereco = url.format(desbravador_id=primeiro)
+        cliente = cliente_autenticado(app, identidades[perfil]) if perfil else app.test_client()
+
+        inicio = time.perf_counter()
+        status = cliente.get(endereco).status_code
+        primeira = time.perf_counter() - inicio
+
+        zerar_pico(os.getpid())
+        latencias, consultas = [], []
+        for _ in range(args.requisicoes):
+            with capturar_consultas(engine) as capturadas:
+                inicio = time.perf_counter()
+                resposta = cliente.get(endereco)
+                latencias.append(time.perf_counter() - inicio)
+            consultas.append(len(capturadas))
+            status = max(status, resposta.status_code)
+
+        resultados[url] = resumir(latencias, consultas, status, pico_rss_kb(os.getpid()))
+        resultados[url]['primeira_ms'] = round(primeira * 1000, 2)
+        mostrar(url, resultados[url])
+    return resultados
+
+
+# Gunicorn
+
+def _workers(mestre):
+    filhos = []
+    for entrada in os.listdir('/proc'):
+        if entrada.isdigit() and _status(entrada, 'PPid') == mestre:
+            filhos.append(int(entrada))
+    return filhos
+
+
+def _entrar(base, caminho, usuario, senha):
+    abridor = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+    dados = urllib.parse.urlencode({'username': usuario, 'password': senha}).encode()
+    abridor.open(base + caminho, dados).read()
+    return abridor
+
+
+def medir_gunicorn(app, args):
+    from app import db
+    from app.models import User, Desbravador
+    from app.sinteticos import SENHA
+
+    with app.app_context():
+        admin = db.session.execute(db.select(User.username).order_by(User.id).limit(1)).scalar()
+        desbravador = db.session.execute(
+            db.select(Desbravador.username).where(Desbravador.pode_fazer_login == True)
+            .order_by(Desbravador.id).limit(1)
+        ).scalar()
+        primeiro = db.session.execute(db.select(Desbravador.id).order_by(Desbravador.id).limit(1)).scalar()
+        db.session.remove()
+
+    base = f'http://127.0.0.1:{args.porta}'
+    comando = ['gunicorn', '-c', os.path.join(RAIZ, 'gunicorn.conf.py'),
+               '-b', f'127.0.0.1:{args.porta}', '-w', str(args.workers), '--log-level', 'warning']
+    mestre = subprocess.Popen(comando, cwd=RAIZ)
+    try:
+        for _ in range(300):
+            try:
+                urllib.request.urlopen(base + '/auth/login', timeout=1).read()
+                break
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.1)
+        else:
+            raise SystemExit('O gunicorn não respondeu.')
+
+        credenciais = {'admin': ('/auth/login', admin, args.senha_admin),
+                       'desbravador': ('/auth/desbravador-login', desbravador, args.senha_desbravador or SENHA)}
+        resultados = {}
+        for url, perfil in rotas_medidas(args):
+            if perfil is not None and credenciais[perfil][1] is None:
+                continue
+            endereco = base + url.format(desbravador_id=primeiro)
+            clientes = [_entrar(base, *credenciais[perfil]) if perfil else urllib.request.build_opener()
+                        for _ in range(args.concorrencia)]
+
+            inicio = time.perf_counter()
+            clientes[0].open(endereco).read()
+            primeira = time.perf_counter() - inicio
+
+            workers = _workers(mestre.pid)
+            for pid in workers:
+                zerar_pico(pid)
+
+            latencias, consultas, codigos = [], [], []
+            lock = threading.Lock()
+            por_cliente = math.ceil(args.requisicoes / args.concorrencia)
+
+            def trabalhar(cliente):
+                for _ in range(por_cliente):
+                    inicio = time.perf_counter()
+                    try:
+                        resposta = cliente.open(endereco)
+                        resposta.read()
+                        codigo, cabecalho = resposta.status, resposta.headers.get('Server-Timing', '')
+                    except urllib.error.HTTPError as erro:
+                        codigo, cabecalho = erro.code, erro.headers.get('Server-Timing', '')
+                    duracao = time.perf_counter() - inicio
+                    encontrado = _CONSULTAS.search(cabecalho)
+                    with lock:
+                        latencias.append(duracao)
+                        codigos.append(codigo)
+                        if encontrado:
+                            consultas.append(int(encontrado.group(1)))
+
+            inicio = time.perf_counter()
+            threads = [threading.Thread(target=trabalhar, args=(cliente,)) for cliente in clientes]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            duracao = time.perf_counter() - inicio
+
+            picos = [pico for pico in (pico_rss_kb(pid) for pid in workers) if pico is not None]
+            resultados[url] = resumir(latencias, consultas, max(codigos), max(picos) if picos else None)
+            resultados[url]['primeira_ms'] = round(primeira * 1000, 2)
+            resultados[url]['vazao_rps'] = round(len(latencias) / duracao, 1)
+            mostrar(url, resultados[url])
+        return resultados
+    finally:
+        mestre.terminate()
+        mestre.wait()
+
+
+# Relatório
+
+def mostrar(url, medida):
+    rss = f'{medida["rss_pico_kb"] / 1024:.0f} MB' if medida['rss_pico_kb'] else '-'
+    print(f'{url[:45]:<45} {medida["status"]:>3}  p50 {medida["p50_ms"]:7.1f}  p95 {medida["p95_ms"]:7.1f}  '
+          f'p99 {medida["p99_ms"]:7.1f} ms  {medida["consultas"] if medida["consultas"] is not None else "-":>3} '
+          f'consultas  RSS {rss}', flush=True)
+
+
+def comparar(resultado, base, tolerancia):
+    """Rotas que pioraram em relação à linha de base: (url, motivo)"""
+    pioras = []
+    for url, medida in resultado['rotas'].items():
+        anterior = base['rotas'].get(url)
+        if anterior is None:
+            continue
+        if medida['consultas'] is not None and anterior['consultas'] is not None \
+                and medida['consultas'] > anterior['consultas']:
+            pioras.append((url, f'{anterior["consultas"]} -> {medida["consultas"]} consultas'))
+        limite = anterior['p50_ms'] * (1 + tolerancia)
+        if medida['p50_ms'] > limite and medida['p50_ms'] - anterior['p50_ms'] > RUIDO_MS:
+            pioras.append((url, f'p50 {anterior["p50_ms"]} -> {medida["p50_ms"]} ms'))
+        if medida['status'] != anterior['status']:
+            pioras.append((url, f'HTTP {anterior["status"]} -> {medida["status"]}'))
+    return pioras
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ, check=True,
+                              capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    args = argumentos()
+
+    # A configuração é lida do ambiente (também pelos comandos e pelo gunicorn)
+    banco = os.path.abspath(args.banco)
+    existia = os.path.exists(banco)
+    if args.gerar and existia:
+        os.remove(banco)
+    os.makedirs(os.path.dirname(banco), exist_ok=True)
+    os.environ['FLASK_APP'] = 'wsgi.py'
+    os.environ['FLASK_CONFIG'] = 'production'
+    os.environ['DATABASE_URL'] = f'sqlite:///{banco}'
+    os.environ.setdefault('SLOW_REQUEST_MS', '600000')  # sem log de lentidão durante o teste
+    preparar(args, existia)
+
+    from app import create_app
+    app = create_app()
+    app.logger.disabled = True  # erros aparecem como HTTP 500 no resultado
+
+    with app.app_context():
+        from app import db
+        from app.models import Desbravador, Mensalidade, Transacao, Evento
+        volumes = {modelo.__tablename__: db.session.query(modelo).count()
+                   for modelo in (Desbravador, Mensalidade, Transacao, Evento)}
+        db.session.remove()
+
+    modo = 'gunicorn' if args.gunicorn else 'cliente'
+    print(f'Modo: {modo}; {args.requisicoes} requisições por rota; volumes: {volumes}')
+    rotas = medir_gunicorn(app, args) if args.gunicorn else medir_cliente(app, args)
+
+    resultado = {
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'commit': _commit(),
+        'python': sys.version.split()[0],
+        'cpus': os.cpu_count(),
+        'modo': modo,
+        'parametros': {
+            'requisicoes': args.requisicoes,
+            'workers': args.workers if args.gunicorn else None,
+            'concorrencia': args.concorrencia if args.gunicorn else 1,
+            'semente': args.semente,
+        },
+        'volumes': volumes,
+        'rotas': rotas,
+    }
+    if args.json:
+        with open(args.json, 'w') as arquivo:
+            json.dump(resultado, arquivo, indent=2, ensure_ascii=False)
+        print(f'Resultado gravado em {args.json}')
+
+    if args.comparar:
+        with open(args.comparar) as arquivo:
+            base = json.load(arquivo)
+        if base.get('modo') != modo or base.get('volumes') != volumes:
+            print('⚠️  A linha de base foi medida em outro modo ou com outros volumes de dados.')
+        pioras = comparar(resultado, base, args.tolerancia)
+        if pioras:
+            print(f'\n❌ Pioras em relação a {args.comparar} (commit {base.get("commit")}):')
+            for url, motivo in pioras:
+                print(f'   {url}: {motivo}')
+            raise SystemExit(1)
+        print(f'\n✅ Nenhuma piora em relação a {args.comparar} (commit {base.get("commit")}).')
+
+
+if __name__ == '__main__':
+    main()
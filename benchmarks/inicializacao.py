@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Tempo de inicialização a frio da aplicação.
+
+Cada repetição roda em um processo Python novo (como um worker do gunicorn
+recém-criado) e mede:
+
+- importacao: import do wsgi.py, ou seja, create_app();
+- primeira_requisicao: a primeira requisição atendida (GET /auth/login);
+- processo: o processo inteiro, incluindo a partida do interpretador.
+
+Também lista os módulos pesados que não deveriam ser carregados pelos
+workers (Alembic, openpyxl, reportlab). Uso:
+
+    python benchmarks/inicializacao.py [--repeticoes 15] [--json saida.json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PESADOS = ('alembic', 'flask_migrate', 'openpyxl', 'reportlab')
+
+FILHO = f'''
+import json, sys, time
+inicio = time.perf_counter()
+from wsgi import app
+importado = time.perf_counter()
+resposta = app.test_client().get('/auth/login')
+respondido = time.perf_counter()
+print(json.dumps({{
+    'importacao': importado - inicio,
+    'primeira_requisicao': respondido - importado,
+    'status': resposta.status_code,
+    'modulos': len(sys.modules),
+    'pesados': sorted(m for m in {PESADOS!r} if m in sys.modules),
+}}))
+'''
+
+
+def medir():
+    inicio = time.perf_counter()
+    saida = subprocess.run([sys.executable, '-c', FILHO], cwd=RAIZ, check=True,
+                           capture_output=True, text=True).stdout
+    medida = json.loads(saida.strip().splitlines()[-1])
+    medida['processo'] = time.perf_counter() - inicio
+    return medida
+
+
+def resumir(medidas, campo):
+    valores = sorted(medida[campo] * 1000 for medida in medidas)
+    return {
+        'mediana_ms': round(statistics.median(valores), 1),
+        'minimo_ms': round(valores[0], 1),
+        'maximo_ms': round(valores[-1], 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeticoes', type=int, default=15)
+    parser.add_argument('--json', help='Grava o resultado neste arquivo.')
+    argumentos = parser.parse_args()
+
+    medir()  # aquece o cache de disco e os .pyc
+    medidas = [medir() for _ in range(argumentos.repeticoes)]
+    if any(medida['status'] >= 500 for medida in medidas):
+        sys.exit('A primeira requisição falhou; o banco foi preparado (flask init-db)?')
+
+    resultado = {
+        'python': sys.version.split()[0],
+        'repeticoes': argumentos.repeticoes,
+        'modulos': medidas[-1]['modulos'],
+        'pesados': medidas[-1]['pesados'],
+    }
+    for campo in ('importacao', 'primeira_requisicao', 'processo'):
+        resultado[campo] = resumir(medidas, campo)
+        print(f"{campo:>20}: mediana {resultado[campo]['mediana_ms']:7.1f} ms "
+              f"(mín. {resultado[campo]['minimo_ms']:.1f}, máx. {resultado[campo]['maximo_ms']:.1f})")
+    print(f"{'módulos':>20}: {resultado['modulos']}")
+    print(f"{'pesados carregados':>20}: {', '.join(resultado['pesados']) or 'nenhum'}")
+
+    if argumentos.json:
+        with open(argumentos.json, 'w') as arquivo:
+            json.dump(resultado, arquivo, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,29 @@
+"""
+Configuração do gunicorn, lida automaticamente do diretório atual:
+
+    FLASK_CONFIG=production gunicorn
+
+Com preload_app o wsgi.py é importado uma única vez, no processo mestre, e
+cada worker nasce de um fork com a aplicação já montada: reiniciar um
+worker (max_requests, falha ou timeout) custa milissegundos em vez de uma
+nova importação. O mestre não abre conexões com o banco (create_app não as
+usa), então os workers não compartilham conexões herdadas.
+
+Código novo só é carregado reiniciando o mestre (não basta um HUP).
+"""
+
+import multiprocessing
+import os
+
+wsgi_app = 'wsgi:app'
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+preload_app = True
+
+# Cada worker tem seu pool de hash de senhas (app.senhas): um processo por
+# worker, para que o total na máquina acompanhe o número de workers
+os.environ.setdefault('PASSWORD_WORKERS', '1')
+
+# Recicla os workers aos poucos para conter vazamentos de memória
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = max_requests // 10
@@ -0,0 +1,184 @@
+"""esquema inicial, tabelas de resumo/fechamento e índices das consultas frequentes
+
+Bancos criados antes das migrações (via db.create_all) já possuem parte das
+tabelas; por isso cada tabela e índice só é criado quando ainda não existe.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 12:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+INDICES = [
+    # (nome, tabela, colunas, condição do índice parcial)
+    ('ix_desbravador_ativo_nome', 'desbravador', ['nome'], 'ativo'),
+    ('ix_desbravador_ativo_data_cadastro', 'desbravador', ['data_cadastro'], 'ativo'),
+    ('ix_mensalidade_referencia_status', 'mensalidade', ['ano_referencia', 'mes_referencia', 'status'], None),
+    ('ix_mensalidade_desbravador_id', 'mensalidade', ['desbravador_id'], None),
+    ('ix_transacao_data_transacao', 'transacao', ['data_transacao'], None),
+    ('ix_transacao_tipo_data_transacao', 'transacao', ['tipo', 'data_transacao'], None),
+    ('ix_evento_ativo_data_inicio', 'evento', ['data_inicio'], 'ativo'),
+]
+
+
+def _criar_tabelas(existentes):
+    if 'user' not in existentes:
+        op.create_table(
+            'user',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('username', sa.String(length=80), nullable=False),
+            sa.Column('email', sa.String(length=120), nullable=False),
+            sa.Column('password_hash', sa.String(length=120), nullable=False),
+            sa.Column('nome_completo', sa.String(length=120), nullable=False),
+            sa.Column('cargo', sa.String(length=50), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('email'),
+            sa.UniqueConstraint('username')
+        )
+
+    if 'desbravador' not in existentes:
+        op.create_table(
+            'desbravador',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('nome', sa.String(length=100), nullable=False),
+            sa.Column('idade', sa.Integer(), nullable=False),
+            sa.Column('data_nascimento', sa.Date(), nullable=False),
+            sa.Column('unidade', sa.String(length=50), nullable=False),
+            sa.Column('classe', sa.String(length=50), nullable=False),
+            sa.Column('especialidades', sa.Text(), nullable=True),
+            sa.Column('telefone', sa.String(length=20), nullable=True),
+            sa.Column('email', sa.String(length=120), nullable=True),
+            sa.Column('endereco', sa.Text(), nullable=True),
+            sa.Column('nome_responsavel', sa.String(length=100), nullable=True),
+            sa.Column('telefone_responsavel', sa.String(length=20), nullable=True),
+            sa.Column('data_cadastro', sa.DateTime(), nullable=True),
+            sa.Column('ativo', sa.Boolean(), nullable=True),
+            sa.Column('username', sa.String(length=80), nullable=True),
+            sa.Column('password_hash', sa.String(length=120), nullable=True),
+            sa.Column('pode_fazer_login', sa.Boolean(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('username')
+        )
+
+    if 'mensalidade' not in existentes:
+        op.create_table(
+            'mensalidade',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('desbravador_id', sa.Integer(), nullable=False),
+            sa.Column('mes_referencia', sa.Integer(), nullable=False),
+            sa.Column('ano_referencia', sa.Integer(), nullable=False),
+            sa.Column('valor', sa.Float(), nullable=False),
+            sa.Column('data_pagamento', sa.DateTime(), nullable=True),
+            sa.Column('status', sa.String(length=20), nullable=True),
+            sa.Column('observacoes', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['desbravador_id'], ['desbravador.id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+    if 'transacao' not in existentes:
+        op.create_table(
+            'transacao',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('tipo', sa.String(length=20), nullable=False),
+            sa.Column('categoria', sa.String(length=50), nullable=False),
+            sa.Column('descricao', sa.String(length=200), nullable=False),
+            sa.Column('valor', sa.Float(), nullable=False),
+            sa.Column('data_transacao', sa.DateTime(), nullable=False),
+            sa.Column('observacoes', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+    if 'evento' not in existentes:
+        op.create_table(
+            'evento',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('nome', sa.String(length=100), nullable=False),
+            sa.Column('descricao', sa.Text(), nullable=True),
+            sa.Column('data_inicio', sa.DateTime(), nullable=False),
+            sa.Column('data_fim', sa.DateTime(), nullable=True),
+            sa.Column('local', sa.String(length=200), nullable=True),
+            sa.Column('tipo', sa.String(length=50), nullable=True),
+            sa.Column('custo', sa.Float(), nullable=True),
+            sa.Column('ativo', sa.Boolean(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+    if 'resumo_mensalidade' not in existentes:
+        op.create_table(
+            'resumo_mensalidade',
+            sa.Column('ano', sa.Integer(), nullable=False),
+            sa.Column('mes', sa.Integer(), nullable=False),
+            sa.Column('status', sa.String(length=20), nullable=False),
+            sa.Column('quantidade', sa.Integer(), nullable=False),
+            sa.Column('valor_total', sa.Float(), nullable=False),
+            sa.PrimaryKeyConstraint('ano', 'mes', 'status')
+        )
+        op.execute(
+            "INSERT INTO resumo_mensalidade (ano, mes, status, quantidade, valor_total) "
+            "SELECT ano_referencia, mes_referencia, COALESCE(status, 'pendente'), "
+            "COUNT(id), COALESCE(SUM(valor), 0.0) FROM mensalidade "
+            "GROUP BY ano_referencia, mes_referencia, COALESCE(status, 'pendente')"
+        )
+
+    if 'saldo_mensal' not in existentes:
+        op.create_table(
+            'saldo_mensal',
+            sa.Column('ano', sa.Integer(), nullable=False),
+            sa.Column('mes', sa.Integer(), nullable=False),
+            sa.Column('saldo_inicial', sa.Float(), nullable=False),
+            sa.Column('total_receitas', sa.Float(), nullable=False),
+            sa.Column('total_despesas', sa.Float(), nullable=False),
+            sa.Column('saldo_final', sa.Float(), nullable=False),
+            sa.Column('fechado_em', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('ano', 'mes')
+        )
+
+    if 'saldo_categoria' not in existentes:
+        op.create_table(
+            'saldo_categoria',
+            sa.Column('ano', sa.Integer(), nullable=False),
+            sa.Column('mes', sa.Integer(), nullable=False),
+            sa.Column('tipo', sa.String(length=20), nullable=False),
+            sa.Column('categoria', sa.String(length=50), nullable=False),
+            sa.Column('total', sa.Float(), nullable=False),
+            sa.PrimaryKeyConstraint('ano', 'mes', 'tipo', 'categoria')
+        )
+
+
+def upgrade():
+    inspetor = sa.inspect(op.get_bind())
+    _criar_tabelas(set(inspetor.get_table_names()))
+
+    for nome, tabela, colunas, condicao in INDICES:
+        existentes = {indice['name'] for indice in inspetor.get_indexes(tabela)}
+        if nome in existentes:
+            continue
+        parcial = {}
+        if condicao:
+            parcial = {
+                'sqlite_where': sa.text(f'{condicao} = 1'),
+                'postgresql_where': sa.text(condicao)
+            }
+        op.create_index(nome, tabela, colunas, unique=False, **parcial)
+
+
+def downgrade():
+    for nome, tabela, _, _ in reversed(INDICES):
+        op.drop_index(nome, table_name=tabela)
+    op.drop_table('saldo_categoria')
+    op.drop_table('saldo_mensal')
+    op.drop_table('resumo_mensalidade')
@@ -0,0 +1,72 @@
+"""uma mensalidade por desbravador e mês de referência
+
+Remove duplicatas não pagas criadas pela antiga geração preguiçosa e cria o
+índice único usado pelo INSERT ... ON CONFLICT DO NOTHING da geração em lote.
+O índice substitui ix_mensalidade_desbravador_id, do qual é um prefixo.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 13:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+MESMA_REFERENCIA = (
+    "o.desbravador_id = m.desbravador_id "
+    "AND o.ano_referencia = m.ano_referencia "
+    "AND o.mes_referencia = m.mes_referencia "
+    "AND o.id <> m.id"
+)
+
+
+def upgrade():
+    conexao = op.get_bind()
+    indices = {indice['name'] for indice in sa.inspect(conexao).get_indexes('mensalidade')}
+
+    if 'uq_mensalidade_desbravador_referencia' not in indices:
+        # Mantém a mensalidade paga (ou a mais antiga) de cada grupo duplicado
+        op.execute(
+            "DELETE FROM mensalidade WHERE id IN ("
+            "SELECT m.id FROM mensalidade m JOIN mensalidade o ON " + MESMA_REFERENCIA + " "
+            "WHERE COALESCE(m.status, 'pendente') <> 'pago' AND (o.status = 'pago' OR o.id < m.id))"
+        )
+
+        pagas_duplicadas = conexao.execute(sa.text(
+            "SELECT COUNT(*) FROM mensalidade m JOIN mensalidade o ON " + MESMA_REFERENCIA
+        )).scalar()
+        if pagas_duplicadas:
+            raise RuntimeError(
+                'Existem mensalidades pagas em duplicidade para o mesmo desbravador e mês; '
+                'revise-as manualmente antes de aplicar esta migração.'
+            )
+
+        op.create_index(
+            'uq_mensalidade_desbravador_referencia', 'mensalidade',
+            ['desbravador_id', 'ano_referencia', 'mes_referencia'], unique=True
+        )
+
+        # As duplicatas removidas também saem do resumo
+        op.execute("DELETE FROM resumo_mensalidade")
+        op.execute(
+            "INSERT INTO resumo_mensalidade (ano, mes, status, quantidade, valor_total) "
+            "SELECT ano_referencia, mes_referencia, COALESCE(status, 'pendente'), "
+            "COUNT(id), COALESCE(SUM(valor), 0.0) FROM mensalidade "
+            "GROUP BY ano_referencia, mes_referencia, COALESCE(status, 'pendente')"
+        )
+
+    if 'ix_mensalidade_desbravador_id' in indices:
+        op.drop_index('ix_mensalidade_desbravador_id', table_name='mensalidade')
+
+
+def downgrade():
+    op.create_index('ix_mensalidade_desbravador_id', 'mensalidade', ['desbravador_id'], unique=False)
+    op.drop_index('uq_mensalidade_desbravador_referencia', table_name='mensalidade')
@@ -0,0 +1,72 @@
+"""busca textual de desbravadores (SQLite FTS5)
+
+Cria a tabela virtual desbravador_busca, os triggers que a mantêm em
+sincronia com a tabela desbravador e indexa os cadastros existentes. Em
+outros bancos a migração não faz nada e a busca usa LIKE.
+
+As instruções são copiadas aqui, e não importadas de app.busca, para que
+uma mudança posterior na aplicação não altere o que esta migração faz.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 14:00:00
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+TELEFONE_DIGITOS = (
+    "replace(replace(replace(replace(replace(coalesce({t}.telefone, ''), "
+    "'(', ''), ')', ''), '-', ''), ' ', ''), '.', '')"
+)
+
+VALORES = (
+    "{t}.id, {t}.nome, {t}.nome_responsavel, {t}.email, "
+    "coalesce({t}.telefone, '') || ' ' || " + TELEFONE_DIGITOS
+)
+
+COLUNAS = "rowid, nome, nome_responsavel, email, telefone"
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    op.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS desbravador_busca USING fts5("
+        "nome, nome_responsavel, email, telefone, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    op.execute(
+        "CREATE TRIGGER IF NOT EXISTS desbravador_busca_ai AFTER INSERT ON desbravador BEGIN "
+        f"INSERT INTO desbravador_busca ({COLUNAS}) VALUES ({VALORES.format(t='new')}); END"
+    )
+    op.execute(
+        "CREATE TRIGGER IF NOT EXISTS desbravador_busca_ad AFTER DELETE ON desbravador BEGIN "
+        "DELETE FROM desbravador_busca WHERE rowid = old.id; END"
+    )
+    op.execute(
+        "CREATE TRIGGER IF NOT EXISTS desbravador_busca_au AFTER UPDATE OF "
+        "nome, nome_responsavel, email, telefone ON desbravador BEGIN "
+        "DELETE FROM desbravador_busca WHERE rowid = old.id; "
+        f"INSERT INTO desbravador_busca ({COLUNAS}) VALUES ({VALORES.format(t='new')}); END"
+    )
+    op.execute("DELETE FROM desbravador_busca")
+    op.execute(f"INSERT INTO desbravador_busca ({COLUNAS}) SELECT {VALORES.format(t='desbravador')} FROM desbravador")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    op.execute("DROP TRIGGER IF EXISTS desbravador_busca_au")
+    op.execute("DROP TRIGGER IF EXISTS desbravador_busca_ad")
+    op.execute("DROP TRIGGER IF EXISTS desbravador_busca_ai")
+    op.execute("DROP TABLE IF EXISTS desbravador_busca")
@@ -0,0 +1,36 @@
+"""marcas de versão dos dados por tabela
+
+Usadas para saber se artefatos derivados (PDFs de relatórios) ainda
+correspondem aos dados atuais.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 15:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'versao_tabela' in sa.inspect(op.get_bind()).get_table_names():
+        return
+
+    op.create_table(
+        'versao_tabela',
+        sa.Column('tabela', sa.String(length=50), nullable=False),
+        sa.Column('versao', sa.String(length=32), nullable=False),
+        sa.Column('alterada_em', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('tabela')
+    )
+
+
+def downgrade():
+    op.drop_table('versao_tabela')
@@ -0,0 +1,139 @@
+"""especialidades e unidades em tabelas próprias
+
+Cria as listas de referência especialidade e unidade e a associação
+desbravador_especialidade, copia para ela as especialidades guardadas em
+JSON na coluna desbravador.especialidades e remove a coluna. Nomes do JSON
+que não estão na lista padrão são cadastrados como novas especialidades.
+
+A coluna é removida com ALTER TABLE ... DROP COLUMN (SQLite 3.35 ou
+posterior), sem recriar a tabela: os gatilhos da busca textual e os
+índices parciais de desbravador são preservados.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 17:00:00
+
+"""
+import json
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+# Valores padrão desta versão, copiados aqui para que mudanças posteriores em
+# app.referencias não alterem o que a migração grava
+ESPECIALIDADES = (
+    'ADRA', 'Artes e Habilidades Manuais', 'Atividades Agrícolas',
+    'Atividades Missionárias e Comunitárias', 'Atividades Profissionais',
+    'Atividades Recreativas', 'Ciência e Saúde', 'Estudos da Natureza',
+    'Habilidades Domésticas'
+)
+
+UNIDADES = (
+    'Amigo', 'Companheiro', 'Pesquisador', 'Pioneiro',
+    'Excursionista', 'Guia', 'Líder', 'Líder Master', 'Líder Master Avançado'
+)
+
+especialidade = sa.table('especialidade', sa.column('id', sa.Integer), sa.column('nome', sa.String))
+unidade = sa.table('unidade', sa.column('nome', sa.String), sa.column('ordem', sa.Integer))
+associacao = sa.table('desbravador_especialidade',
+                      sa.column('desbravador_id', sa.Integer), sa.column('especialidade_id', sa.Integer))
+
+
+def _criar_tabelas(existentes):
+    # As tabelas podem já ter sido criadas (vazias ou com os valores padrão) pelo create_all
+    if 'especialidade' not in existentes:
+        op.create_table(
+            'especialidade',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('nome', sa.String(length=100), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('nome')
+        )
+    if 'unidade' not in existentes:
+        op.create_table(
+            'unidade',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('nome', sa.String(length=50), nullable=False),
+            sa.Column('ordem', sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('nome')
+        )
+    if 'desbravador_especialidade' not in existentes:
+        op.create_table(
+            'desbravador_especialidade',
+            sa.Column('desbravador_id', sa.Integer(), nullable=False),
+            sa.Column('especialidade_id', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['desbravador_id'], ['desbravador.id'], ondelete='CASCADE'),
+            sa.ForeignKeyConstraint(['especialidade_id'], ['especialidade.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('desbravador_id', 'especialidade_id')
+        )
+        op.create_index('ix_desbravador_especialidade_especialidade', 'desbravador_especialidade',
+                        ['especialidade_id', 'desbravador_id'])
+
+
+def upgrade():
+    conexao = op.get_bind()
+    inspetor = sa.inspect(conexao)
+    _criar_tabelas(set(inspetor.get_table_names()))
+
+    colunas = {coluna['name'] for coluna in inspetor.get_columns('desbravador')}
+    cadastros = []
+    if 'especialidades' in colunas:
+        for desbravador_id, texto in conexao.execute(sa.text(
+                "SELECT id, especialidades FROM desbravador "
+                "WHERE especialidades IS NOT NULL AND especialidades NOT IN ('', '[]')")):
+            try:
+                nomes = json.loads(texto)
+            except ValueError:
+                continue
+            if isinstance(nomes, list):
+                cadastros.append((desbravador_id, {str(nome).strip() for nome in nomes if str(nome).strip()}))
+
+    # Valores padrão e nomes encontrados nos cadastros que ainda não existem
+    existentes = set(conexao.execute(sa.select(especialidade.c.nome)).scalars())
+    novos = set(ESPECIALIDADES).union(*[nomes for _, nomes in cadastros]) - existentes
+    if novos:
+        op.bulk_insert(especialidade, [{'nome': nome} for nome in sorted(novos)])
+
+    unidades_existentes = set(conexao.execute(sa.text('SELECT nome FROM unidade')).scalars())
+    faltantes = [{'nome': nome, 'ordem': ordem} for ordem, nome in enumerate(UNIDADES)
+                 if nome not in unidades_existentes]
+    if faltantes:
+        op.bulk_insert(unidade, faltantes)
+
+    ids = dict(conexao.execute(sa.select(especialidade.c.nome, especialidade.c.id)).all())
+    ja_associadas = set(conexao.execute(
+        sa.select(associacao.c.desbravador_id, associacao.c.especialidade_id)).all())
+    linhas = [{'desbravador_id': desbravador_id, 'especialidade_id': ids[nome]}
+              for desbravador_id, nomes in cadastros for nome in sorted(nomes)
+              if (desbravador_id, ids[nome]) not in ja_associadas]
+    if linhas:
+        op.bulk_insert(associacao, linhas)
+
+    if 'especialidades' in colunas:
+        op.execute('ALTER TABLE desbravador DROP COLUMN especialidades')
+
+
+def downgrade():
+    conexao = op.get_bind()
+    op.execute('ALTER TABLE desbravador ADD COLUMN especialidades TEXT')
+
+    por_desbravador = {}
+    for desbravador_id, nome in conexao.execute(sa.text(
+            'SELECT a.desbravador_id, e.nome FROM desbravador_especialidade a '
+            'JOIN especialidade e ON e.id = a.especialidade_id ORDER BY e.nome')):
+        por_desbravador.setdefault(desbravador_id, []).append(nome)
+    for desbravador_id, nomes in por_desbravador.items():
+        conexao.execute(sa.text('UPDATE desbravador SET especialidades = :texto WHERE id = :id'),
+                        {'texto': json.dumps(nomes), 'id': desbravador_id})
+
+    op.drop_table('desbravador_especialidade')
+    op.drop_table('unidade')
+    op.drop_table('especialidade')
@@ -0,0 +1,39 @@
+"""impressão digital dos lançamentos de extrato bancário
+
+Adiciona transacao.hash_extrato e o índice único usado pelo INSERT ... ON
+CONFLICT DO NOTHING da importação de extratos (app.extratos): um lançamento
+já importado não é gravado de novo. Transações digitadas ficam com NULL,
+que não conflita no índice único.
+
+A coluna é adicionada com ALTER TABLE ... ADD COLUMN, sem recriar a tabela.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 18:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspetor = sa.inspect(op.get_bind())
+    colunas = {coluna['name'] for coluna in inspetor.get_columns('transacao')}
+    if 'hash_extrato' not in colunas:
+        op.execute('ALTER TABLE transacao ADD COLUMN hash_extrato VARCHAR(64)')
+
+    indices = {indice['name'] for indice in inspetor.get_indexes('transacao')}
+    if 'uq_transacao_hash_extrato' not in indices:
+        op.create_index('uq_transacao_hash_extrato', 'transacao', ['hash_extrato'], unique=True)
+
+
+def downgrade():
+    op.drop_index('uq_transacao_hash_extrato', table_name='transacao')
+    op.execute('ALTER TABLE transacao DROP COLUMN hash_extrato')
@@ -0,0 +1,43 @@
+"""password_hash com até 255 caracteres
+
+Os hashes scrypt do Werkzeug ('scrypt:32768:8:1$sal$hash') têm cerca de 160
+caracteres, acima das 120 da coluna original; bcrypt e pbkdf2 também cabem
+em 255 (app.senhas).
+
+No SQLite o tamanho de VARCHAR não é imposto, e alterar a coluna recriaria
+as tabelas (perdendo os gatilhos da busca textual de desbravador): a
+migração só altera o tipo nos demais bancos.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 19:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+TABELAS = (('user', False), ('desbravador', True))
+
+
+def _alterar(tamanho_atual, novo_tamanho):
+    if op.get_bind().dialect.name == 'sqlite':
+        return
+    for tabela, anulavel in TABELAS:
+        op.alter_column(tabela, 'password_hash', existing_type=sa.String(tamanho_atual),
+                        type_=sa.String(novo_tamanho), existing_nullable=anulavel)
+
+
+def upgrade():
+    _alterar(120, 255)
+
+
+def downgrade():
+    _alterar(255, 120)
@@ -0,0 +1,54 @@
+"""fila de tarefas em segundo plano
+
+Tabela de app.tarefas: geração de mensalidades, PDFs de relatórios,
+importações e agendamentos recorrentes executados fora das requisições.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 21:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'tarefa' in sa.inspect(op.get_bind()).get_table_names():
+        return
+
+    op.create_table(
+        'tarefa',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('tipo', sa.String(length=50), nullable=False),
+        sa.Column('argumentos', sa.Text(), nullable=True),
+        sa.Column('chave', sa.String(length=200), nullable=True),
+        sa.Column('prioridade', sa.Integer(), nullable=False),
+        sa.Column('situacao', sa.String(length=20), nullable=False),
+        sa.Column('tentativas', sa.Integer(), nullable=False),
+        sa.Column('max_tentativas', sa.Integer(), nullable=False),
+        sa.Column('executar_em', sa.DateTime(), nullable=False),
+        sa.Column('progresso', sa.Float(), nullable=False),
+        sa.Column('mensagem', sa.String(length=255), nullable=True),
+        sa.Column('resultado', sa.Text(), nullable=True),
+        sa.Column('erro', sa.Text(), nullable=True),
+        sa.Column('worker', sa.String(length=100), nullable=True),
+        sa.Column('criada_em', sa.DateTime(), nullable=True),
+        sa.Column('iniciada_em', sa.DateTime(), nullable=True),
+        sa.Column('concluida_em', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_tarefa_fila', 'tarefa', ['situacao', 'prioridade', 'executar_em'])
+    op.create_index('uq_tarefa_chave', 'tarefa', ['chave'], unique=True)
+
+
+def downgrade():
+    op.drop_index('uq_tarefa_chave', table_name='tarefa')
+    op.drop_index('ix_tarefa_fila', table_name='tarefa')
+    op.drop_table('tarefa')
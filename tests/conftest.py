@@ -0,0 +1,53 @@
+"""
+Aplicação de testes sobre um banco SQLite temporário.
+
+O banco recebe o administrador padrão e o conjunto de flask gerar-dados
+(app.sinteticos) em um volume menor, mas suficiente para que consultas
+N+1 e varreduras completas apareçam.
+"""
+
+import os
+import shutil
+import tempfile
+
+import pytest
+
+_PASTA = tempfile.mkdtemp(prefix='desbravadores-testes-')
+os.environ['TEST_DATABASE_URL'] = f'sqlite:///{os.path.join(_PASTA, "testes.db")}'
+
+from app import create_app, db, banco, exemplos, senhas, sinteticos  # noqa: E402
+from app.models import Desbravador  # noqa: E402
+
+SENHA_MEMBRO = 'senha-do-membro'
+
+
+@pytest.fixture(scope='session')
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        banco.inicializar(app)
+        exemplos.criar_admin_padrao()
+        sinteticos.gerar(desbravadores=200, anos=2, transacoes=5000, eventos=100)
+        db.session.remove()
+    # Sem contexto ativo durante os testes: cada requisição tem o seu (e o seu g)
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+    shutil.rmtree(_PASTA, ignore_errors=True)
+
+
+@pytest.fixture(scope='session')
+def membro(app):
+    """Id de um desbravador ativo com login liberado (usuário 'membro', senha SENHA_MEMBRO)"""
+    with app.app_context():
+        desbravador = db.session.execute(
+            db.select(Desbravador).where(Desbravador.ativo == True).order_by(Desbravador.id).limit(1)
+        ).scalar()
+        desbravador.username = 'membro'
+        desbravador.password_hash = senhas.gerar(SENHA_MEMBRO)
+        desbravador.pode_fazer_login = True
+        db.session.commit()
+        identificador = desbravador.id
+        db.session.remove()
+    return identificador
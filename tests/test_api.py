@@ -0,0 +1,41 @@
+import pytest
+
+from app import db, diagnostico
+from app.models import User
+
+TRANSACAO = {'tipo': 'despesa', 'categoria': 'Material', 'descricao': 'Cordas', 'valor': 12.5,
+             'data_transacao': '2026-10-01'}
+
+
+@pytest.fixture
+def cliente(app):
+    with app.app_context():
+        identidade = db.session.execute(db.select(User).limit(1)).scalar().get_id()
+        db.session.remove()
+    return diagnostico.cliente_autenticado(app, identidade)
+
+
+def test_cria_transacao(cliente):
+    resposta = cliente.post('/api/v1/transacoes', json={**TRANSACAO, 'observacoes': 'Acampamento'})
+    assert resposta.status_code == 201
+    assert resposta.get_json()['valor'] == 12.5
+
+
+@pytest.mark.parametrize('alteracao', [
+    {'observacoes': {'texto': 'x'}},
+    {'observacoes': ['x']},
+    {'valor': 'inf'},
+    {'valor': 'nan'},
+    {'valor': -1},
+])
+def test_transacao_invalida_responde_400(cliente, alteracao):
+    resposta = cliente.post('/api/v1/transacoes', json={**TRANSACAO, **alteracao})
+    assert resposta.status_code == 400
+    assert 'erro' in resposta.get_json()
+
+
+def test_valor_infinito_no_json_responde_400(cliente):
+    corpo = ('{"tipo": "despesa", "categoria": "Material", "descricao": "Cordas", "valor": Infinity, '
+             '"data_transacao": "2026-10-01"}')
+    resposta = cliente.post('/api/v1/transacoes', data=corpo, content_type='application/json')
+    assert resposta.status_code == 400
@@ -0,0 +1,41 @@
+import importlib.util
+import os
+
+from alembic.operations import Operations
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy import create_engine, text
+
+from app import busca
+from app.models import Desbravador
+
+MIGRACAO = os.path.join(os.path.dirname(__file__), '..', 'migrations', 'versions',
+                        '0003_busca_desbravadores.py')
+
+
+def _esquema(conexao):
+    return conexao.execute(text(
+        "SELECT name, sql FROM sqlite_master WHERE name = :tabela OR type = 'trigger' ORDER BY name"
+    ), {'tabela': busca.TABELA}).all()
+
+
+def _migracao():
+    spec = importlib.util.spec_from_file_location('migracao_0003', MIGRACAO)
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+def test_create_all_e_migracao_criam_a_mesma_busca():
+    com_modelos, migrado = create_engine('sqlite://'), create_engine('sqlite://')
+    with com_modelos.begin() as conexao:
+        Desbravador.__table__.create(conexao)
+        busca.criar(conexao)
+        esperado = _esquema(conexao)
+    with migrado.begin() as conexao:
+        Desbravador.__table__.create(conexao)
+        with Operations.context(MigrationContext.configure(conexao)):
+            _migracao().upgrade()
+        obtido = _esquema(conexao)
+
+    assert len(esperado) == 4
+    assert obtido == esperado
@@ -0,0 +1,33 @@
+from app import diagnostico
+
+
+def _status(resultados):
+    return {url: status for url, status, _ in resultados if status != 200}
+
+
+def test_rotas_dentro_do_orcamento(app):
+    with app.app_context():
+        resultados, excedidas, falhas = diagnostico.verificar_orcamento(app)
+    assert _status(resultados) == {}
+    assert falhas == []
+    assert [(url, len(consultas), orcamento) for url, consultas, orcamento in excedidas] == []
+
+
+def test_rotas_sem_varredura_completa(app):
+    with app.app_context():
+        resultados, problemas, falhas = diagnostico.verificar_planos(app)
+    assert _status(resultados) == {}
+    assert falhas == []
+    assert [(url, linhas) for url, _, linhas in problemas] == []
+
+
+def test_rota_com_erro_e_uma_falha(app):
+    rotas = [('/rota-inexistente', 'admin', 5)]
+    with app.app_context():
+        _, excedidas, falhas = diagnostico.verificar_orcamento(app, rotas)
+        assert excedidas == []
+        assert falhas == [('/rota-inexistente', 404)]
+
+        _, problemas, falhas = diagnostico.verificar_planos(app, rotas)
+    assert problemas == []
+    assert falhas == [('/rota-inexistente', 404)]
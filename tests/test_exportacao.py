@@ -0,0 +1,21 @@
+import io
+
+import pytest
+
+from app import exportacao
+
+LINHAS = [('=HYPERLINK("http://exemplo")', 1.5), ('@SOMA', -2.0), ('Mensalidade', None)]
+
+
+def test_csv_nao_grava_formulas():
+    conteudo = b''.join(exportacao.gerar_csv('teste', ['Descrição', 'Valor'], iter(LINHAS))).decode('utf-8-sig')
+    assert conteudo.splitlines()[1:] == ['"\'=HYPERLINK(""http://exemplo"")";1,50', "'@SOMA;-2,00", 'Mensalidade;']
+
+
+def test_xlsx_grava_formulas_como_texto():
+    openpyxl = pytest.importorskip('openpyxl')
+    conteudo = b''.join(exportacao.gerar_xlsx('teste', ['Descrição', 'Valor'], iter(LINHAS)))
+    aba = openpyxl.load_workbook(io.BytesIO(conteudo)).active
+    celulas = [linha[0] for linha in aba.iter_rows(min_row=2)]
+    assert [celula.value for celula in celulas] == [linha[0] for linha in LINHAS]
+    assert {celula.data_type for celula in celulas} == {'s'}
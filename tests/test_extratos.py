@@ -0,0 +1,106 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import delete, func, select
+
+from app import db, extratos, resumos
+from app.models import Desbravador, Mensalidade, Transacao
+
+# Período sem mensalidades nem transações nos dados de teste
+ANO = 2091
+
+OFX = """OFXHEADER:100
+DATA:OFXSGML
+VERSION:102
+CHARSET:1252
+
+<OFX>
+<BANKMSGSRSV1><STMTTRNRS><STMTRS>
+<BANKACCTFROM><BANKID>0001<ACCTID>12345-6</BANKACCTFROM>
+<BANKTRANLIST>
+<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20910510120000[-3:BRT]<TRNAMT>35.00<FITID>A001<MEMO>PIX RECEBIDO ZACARIAS QUINTINO</STMTTRN>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20910512<TRNAMT>-12.30<FITID>A002<MEMO>TARIFA BANCARIA</STMTTRN>
+<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20910515<TRNAMT>99.00<FITID>A003<MEMO>DEPOSITO ZACARIAS QUINTINO</STMTTRN>
+</BANKTRANLIST>
+</STMTRS></STMTTRNRS></BANKMSGSRSV1>
+</OFX>
+"""
+
+CSV = (
+    'Data;Histórico;Valor\n'
+    '08/05/2091;PIX YOLANDA XAVIER;35,00\n'
+    '09/05/2091;Material de acampamento;-80,50\n'
+    'data errada;PIX;10,00\n'
+)
+
+
+def _contar(modelo, *criterios):
+    return db.session.execute(select(func.count()).select_from(modelo).where(*criterios)).scalar()
+
+
+@pytest.fixture
+def mensalidades(app):
+    """Uma mensalidade de 35,00 em aberto para cada desbravador dos extratos"""
+    with app.app_context():
+        desbravadores = [
+            Desbravador(nome=nome, idade=12, data_nascimento=date(2079, 1, 1), unidade='Amigo', classe='Amigo')
+            for nome in ('Zacarias Quintino', 'Yolanda Xavier')
+        ]
+        db.session.add_all(desbravadores)
+        db.session.flush()
+        db.session.add_all([Mensalidade(desbravador_id=d.id, ano_referencia=ANO, mes_referencia=5, valor=35.0)
+                            for d in desbravadores])
+        db.session.commit()
+        ids = [d.id for d in desbravadores]
+        yield ids
+
+        db.session.rollback()
+        db.session.execute(delete(Transacao).where(func.strftime('%Y', Transacao.data_transacao) == str(ANO)))
+        db.session.execute(delete(Mensalidade).where(Mensalidade.ano_referencia == ANO))
+        db.session.execute(delete(Desbravador).where(Desbravador.id.in_(ids)))
+        resumos.reconstruir(ANO)
+        db.session.commit()
+        db.session.remove()
+
+
+def _importar(tmp_path, nome, conteudo, codificacao='utf-8'):
+    arquivo = tmp_path / nome
+    arquivo.write_bytes(conteudo.encode(codificacao))
+    return extratos.processar(str(arquivo), nome.rsplit('.', 1)[1])
+
+
+def test_ofx_concilia_e_nao_duplica(mensalidades, tmp_path):
+    resumo = _importar(tmp_path, 'extrato.ofx', OFX, 'cp1252')
+    assert (resumo['lancamentos'], resumo['importados'], resumo['conciliados'], resumo['erros']) == (3, 3, 1, 0)
+    assert resumo['conciliacoes'][0]['desbravador'] == 'Zacarias Quintino'
+
+    paga = db.session.execute(select(Mensalidade).where(Mensalidade.desbravador_id == mensalidades[0])).scalar()
+    assert paga.status == 'pago' and paga.data_pagamento.date() == date(2091, 5, 10)
+    # O segundo crédito tem o nome, mas não o valor da mensalidade
+    assert _contar(Transacao, Transacao.categoria == 'mensalidade',
+                   func.strftime('%Y', Transacao.data_transacao) == str(ANO)) == 1
+    assert _contar(Transacao, Transacao.tipo == 'despesa', Transacao.valor == 12.3,
+                   func.strftime('%Y', Transacao.data_transacao) == str(ANO)) == 1
+    assert resumos.resumo_mes(ANO, 5)['pago'] == (1, 35.0)
+
+    total = _contar(Transacao)
+    repetido = _importar(tmp_path, 'extrato.ofx', OFX, 'cp1252')
+    assert (repetido['importados'], repetido['repetidos'], repetido['conciliados']) == (0, 3, 0)
+    assert _contar(Transacao) == total
+
+
+def test_csv_concilia_aponta_erros_e_nao_duplica(mensalidades, tmp_path):
+    resumo = _importar(tmp_path, 'extrato.csv', CSV)
+    assert (resumo['lancamentos'], resumo['importados'], resumo['conciliados'], resumo['erros']) == (2, 2, 1, 1)
+    assert resumo['detalhes'] == [{'linha': 4, 'motivo': 'Data inválida'}]
+
+    paga = db.session.execute(select(Mensalidade).where(Mensalidade.desbravador_id == mensalidades[1])).scalar()
+    assert paga.status == 'pago'
+    receita = db.session.execute(select(Transacao).where(Transacao.categoria == 'mensalidade',
+                                                         Transacao.descricao.contains('Yolanda Xavier'))).scalar()
+    assert receita.valor == 35.0 and receita.hash_extrato
+
+    total = _contar(Transacao)
+    repetido = _importar(tmp_path, 'extrato.csv', CSV)
+    assert (repetido['importados'], repetido['repetidos'], repetido['conciliados']) == (0, 2, 0)
+    assert _contar(Transacao) == total
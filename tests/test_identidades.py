@@ -0,0 +1,90 @@
+import pytest
+
+from app import db, diagnostico, identidades, senhas
+from app.models import Desbravador, User
+
+from conftest import SENHA_MEMBRO
+
+
+def _entrar_admin(app):
+    cliente = app.test_client()
+    resposta = cliente.post('/auth/login', data={'username': 'admin', 'password': 'admin123'})
+    assert resposta.status_code == 302
+    return cliente
+
+
+def _entrar_membro(app):
+    cliente = app.test_client()
+    resposta = cliente.post('/auth/desbravador-login', data={'username': 'membro', 'password': SENHA_MEMBRO})
+    assert resposta.location.endswith('/desbravador/dashboard')
+    return cliente
+
+
+def _identidade(cliente):
+    with cliente.session_transaction() as sessao:
+        return sessao.get('_user_id')
+
+
+def _salvar(app, desbravador_id, **valores):
+    with app.app_context():
+        desbravador = db.session.get(Desbravador, desbravador_id)
+        for campo, valor in valores.items():
+            setattr(desbravador, campo, valor)
+        db.session.commit()
+        db.session.remove()
+
+
+def test_login_separa_administrador_e_desbravador(app, membro):
+    admin, desbravador = _entrar_admin(app), _entrar_membro(app)
+    with app.app_context():
+        admin_id = db.session.execute(db.select(User.id).where(User.username == 'admin')).scalar()
+        db.session.remove()
+    assert membro == admin_id
+    assert _identidade(admin) == f'u:{admin_id}'
+    assert _identidade(desbravador) == f'd:{membro}'
+
+    # Cada sessão carrega a conta da sua tabela, mesmo com ids iguais
+    assert admin.get('/desempenho').status_code == 200
+    assert desbravador.get('/desempenho').status_code == 302
+    assert desbravador.get('/desbravador/dashboard').status_code == 200
+    assert admin.get('/desbravador/dashboard').status_code == 302
+
+
+@pytest.mark.parametrize('identidade, esperado', [('1', 200), ('x:1', 302), ('u:abc', 302), ('d:999999', 302)])
+def test_identificadores_da_sessao(app, identidade, esperado):
+    # Sessões antigas (id numérico) continuam valendo; os demais não entram
+    assert diagnostico.cliente_autenticado(app, identidade).get('/desempenho').status_code == esperado
+
+
+def test_cache_descartado_ao_trocar_a_senha(app, membro):
+    cliente = _entrar_membro(app)
+    assert cliente.get('/desbravador/dashboard').status_code == 200
+    assert f'd:{membro}' in identidades._cache
+
+    with app.app_context():
+        novo_hash = senhas.gerar('outra-senha')
+    try:
+        _salvar(app, membro, password_hash=novo_hash)
+        assert f'd:{membro}' not in identidades._cache
+        # A senha antiga deixa de valer
+        resposta = app.test_client().post('/auth/desbravador-login',
+                                          data={'username': 'membro', 'password': SENHA_MEMBRO})
+        assert resposta.status_code == 200
+    finally:
+        with app.app_context():
+            hash_original = senhas.gerar(SENHA_MEMBRO)
+        _salvar(app, membro, password_hash=hash_original)
+
+
+def test_desbravador_inativado_perde_o_acesso(app, membro):
+    desbravador = _entrar_membro(app)
+    assert desbravador.get('/desbravador/dashboard').status_code == 200
+
+    try:
+        resposta = _entrar_admin(app).post(f'/desbravadores/{membro}/inativar')
+        assert resposta.status_code == 302
+        assert f'd:{membro}' not in identidades._cache
+        assert desbravador.get('/desbravador/dashboard').status_code == 302
+    finally:
+        _salvar(app, membro, ativo=True)
+    assert desbravador.get('/desbravador/dashboard').status_code == 200
@@ -0,0 +1,28 @@
+from sqlalchemy import func, select
+
+from app import db, importacao
+from app.models import Desbravador
+
+CSV = (
+    'Nome;Data de Nascimento;Unidade;Classe\n'
+    'Ana Teste;10/03/2012;Amigo;Amigo\n'
+    'Bruno Teste;11/04/2012;Amigo;Capitão\n'
+    'Carla Teste;12/05/2012;Planeta;Guia\n'
+)
+
+
+def test_simulacao_aponta_classe_e_unidade_desconhecidas(app, tmp_path):
+    arquivo = tmp_path / 'desbravadores.csv'
+    arquivo.write_text(CSV, encoding='utf-8')
+    with app.app_context():
+        antes = db.session.execute(select(func.count(Desbravador.id))).scalar()
+        estado = importacao.processar(str(arquivo), 'csv', simular=True)
+        depois = db.session.execute(select(func.count(Desbravador.id))).scalar()
+        db.session.remove()
+
+    assert (estado['linhas'], estado['importadas'], estado['erros']) == (3, 1, 2)
+    assert estado['detalhes'] == [
+        {'linha': 3, 'motivo': 'Classe desconhecida: Capitão'},
+        {'linha': 4, 'motivo': 'Unidade desconhecida: Planeta'},
+    ]
+    assert antes == depois
@@ -0,0 +1,32 @@
+from datetime import date
+
+import pytest
+
+from app import db, diagnostico
+from app.models import User
+
+
+@pytest.fixture
+def cliente(app):
+    with app.app_context():
+        identidade = db.session.execute(db.select(User).limit(1)).scalar().get_id()
+        db.session.remove()
+    return diagnostico.cliente_autenticado(app, identidade)
+
+
+ROTAS = ['/financeiro/mensalidades/pagar-lote', '/api/v1/mensalidades/pagar']
+
+
+@pytest.mark.parametrize('url', ROTAS)
+@pytest.mark.parametrize('corpo', [[1, 2], {'ids': '12'}, {'ids': 12}, {'ids': [True]}, {'ids': ['1']}])
+def test_pagar_lote_rejeita_ids_invalidos(cliente, url, corpo):
+    resposta = cliente.post(url, json=corpo)
+    assert resposta.status_code == 400
+
+
+@pytest.mark.parametrize('url', ROTAS)
+def test_pagar_lote_com_lista_vazia_nao_paga_nada(cliente, url):
+    hoje = date.today()
+    resposta = cliente.post(url, json={'ids': [], 'mes': hoje.month, 'ano': hoje.year})
+    assert resposta.status_code == 200
+    assert resposta.get_json()['pagas'] == 0
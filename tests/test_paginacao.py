@@ -0,0 +1,14 @@
+from app import paginacao
+from app.models import Transacao
+
+
+def test_contagens_limitadas(app, monkeypatch):
+    monkeypatch.setattr(paginacao, 'MAXIMO_CONTAGENS', 5)
+    with app.app_context():
+        query = Transacao.query.filter_by(tipo='receita')
+        total = query.count()
+        for numero in range(20):
+            assert paginacao.total_aproximado(query, 'transacao', f'filtro-{numero}') == total
+        chaves = [chave for _, _, chave in paginacao._contagens]
+
+    assert chaves == [f'filtro-{numero}' for numero in range(15, 20)]
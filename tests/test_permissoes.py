@@ -0,0 +1,27 @@
+import pytest
+
+from app import db, diagnostico
+from app.models import Desbravador, User
+
+ROTAS_ADMINISTRADOR = [
+    '/relatorios/exportar/desbravadores?formato=csv',
+    '/relatorios/exportar/transacoes?formato=xlsx',
+    '/relatorios/pdf/mensalidades',
+    '/desbravadores/importar',
+    '/desbravadores/importar/inexistente',
+    '/desbravadores/importar/inexistente/progresso',
+]
+
+
+@pytest.mark.parametrize('url', ROTAS_ADMINISTRADOR)
+def test_desbravador_nao_exporta_nem_importa(app, membro, url):
+    cliente = diagnostico.cliente_autenticado(app, f'{Desbravador.PREFIXO_SESSAO}:{membro}')
+    assert cliente.get(url).status_code == 403
+
+
+@pytest.mark.parametrize('url', ['/relatorios/exportar/desbravadores?formato=csv', '/desbravadores/importar'])
+def test_administrador_exporta_e_importa(app, url):
+    with app.app_context():
+        identidade = db.session.execute(db.select(User).limit(1)).scalar().get_id()
+        db.session.remove()
+    assert diagnostico.cliente_autenticado(app, identidade).get(url).status_code == 200
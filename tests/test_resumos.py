@@ -0,0 +1,95 @@
+import pytest
+from sqlalchemy import delete, func, select
+
+from app import db, resumos
+from app.models import Desbravador, Mensalidade, ResumoMensalidade
+
+# Período sem mensalidades nos dados de teste
+ANO = 2090
+
+
+def _agregado():
+    """Totais calculados direto das mensalidades do ANO"""
+    status = func.coalesce(Mensalidade.status, resumos.STATUS_PADRAO)
+    linhas = db.session.execute(
+        select(Mensalidade.mes_referencia, status, func.count(Mensalidade.id), func.sum(Mensalidade.valor))
+        .where(Mensalidade.ano_referencia == ANO)
+        .group_by(Mensalidade.mes_referencia, status)
+    )
+    return {(mes, status): (quantidade, valor) for mes, status, quantidade, valor in linhas}
+
+
+def _resumo():
+    """Totais mantidos em ResumoMensalidade para o ANO (linhas zeradas não contam)"""
+    linhas = db.session.execute(
+        select(ResumoMensalidade.mes, ResumoMensalidade.status,
+               ResumoMensalidade.quantidade, ResumoMensalidade.valor_total)
+        .where(ResumoMensalidade.ano == ANO, ResumoMensalidade.quantidade != 0)
+    )
+    return {(mes, status): (quantidade, valor) for mes, status, quantidade, valor in linhas}
+
+
+def _confere():
+    resumo, agregado = _resumo(), _agregado()
+    assert resumo.keys() == agregado.keys()
+    for chave, (quantidade, valor) in agregado.items():
+        assert resumo[chave] == (quantidade, pytest.approx(valor))
+
+
+@pytest.fixture
+def contexto(app):
+    with app.app_context():
+        yield
+        db.session.rollback()
+        db.session.execute(delete(Mensalidade).where(Mensalidade.ano_referencia == ANO))
+        db.session.commit()
+        resumos.reconstruir(ANO)
+        db.session.commit()
+        db.session.remove()
+
+
+def test_resumo_acompanha_cada_alteracao(contexto):
+    ids = db.session.execute(select(Desbravador.id).order_by(Desbravador.id).limit(3)).scalars().all()
+    mensalidades = [Mensalidade(desbravador_id=i, ano_referencia=ANO, mes_referencia=1, valor=25.0) for i in ids]
+    db.session.add_all(mensalidades)
+    db.session.commit()
+    assert _resumo() == {(1, 'pendente'): (3, 75.0)}
+    _confere()
+
+    # Pagamento e mudança de valor
+    primeira, segunda, terceira = mensalidades
+    primeira.status = 'pago'
+    segunda.valor = 30.0
+    db.session.commit()
+    _confere()
+
+    # Mudança de mês
+    terceira.mes_referencia = 2
+    db.session.commit()
+    _confere()
+
+    # Atributo expirado e sobrescrito sem ser carregado
+    db.session.expire(segunda)
+    segunda.status = 'atrasado'
+    db.session.commit()
+    _confere()
+
+    # Remoção
+    db.session.delete(primeira)
+    db.session.commit()
+    _confere()
+    assert _resumo() == {(1, 'atrasado'): (1, 30.0), (2, 'pendente'): (1, 25.0)}
+
+
+def test_reconstruir_igual_ao_mantido_por_deltas(contexto):
+    ids = db.session.execute(select(Desbravador.id).order_by(Desbravador.id).limit(4)).scalars().all()
+    for numero, desbravador_id in enumerate(ids):
+        db.session.add(Mensalidade(desbravador_id=desbravador_id, ano_referencia=ANO, mes_referencia=3,
+                                   valor=20.0 + numero, status='pago' if numero % 2 else None))
+    db.session.commit()
+    mantido = _resumo()
+
+    resumos.reconstruir(ANO, 3)
+    db.session.commit()
+    assert _resumo() == mantido
+    _confere()
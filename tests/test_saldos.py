@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import case, func, select
+
+from app import db, diagnostico, saldos
+from app.models import SaldoMensal, Tarefa, Transacao, User
+
+
+def _saldo_ate(inicio_aberto):
+    sinal = case((Transacao.tipo == 'receita', Transacao.valor), else_=-Transacao.valor)
+    return db.session.execute(
+        select(func.coalesce(func.sum(sinal), 0.0)).where(Transacao.data_transacao < inicio_aberto)
+    ).scalar()
+
+
+def test_lancamentos_antigos_reaproveitam_a_tarefa(app):
+    with app.app_context():
+        saldos.garantir_fechamentos(*saldos.mes_aberto())
+        antes = db.session.execute(select(func.count(Tarefa.id)).where(Tarefa.tipo == 'fechar_saldos')).scalar()
+
+        data = datetime.now() - timedelta(days=90)
+        for numero in range(5):
+            db.session.add(Transacao(tipo='receita', categoria='Doações', descricao=f'Retroativa {numero}',
+                                     valor=10.0, data_transacao=data))
+            db.session.commit()
+
+        tarefas = db.session.execute(
+            select(Tarefa.chave).where(Tarefa.tipo == 'fechar_saldos').order_by(Tarefa.id)
+        ).scalars().all()
+        # Os fechamentos foram refeitos com os novos lançamentos
+        ultimo = db.session.execute(
+            select(SaldoMensal).order_by(SaldoMensal.ano.desc(), SaldoMensal.mes.desc()).limit(1)
+        ).scalar()
+        esperado = _saldo_ate(saldos.intervalo_mes(*saldos.mes_aberto())[0])
+        db.session.remove()
+
+    assert len(tarefas) - antes <= len(saldos.CHAVES_REFAZER)
+    assert set(tarefas[antes:]) <= set(saldos.CHAVES_REFAZER)
+    assert ultimo.saldo_final == pytest.approx(esperado)
+
+
+@pytest.mark.parametrize('url', ['/financeiro/fluxo-caixa?mes=13', '/relatorios/fluxo-caixa?mes=0',
+                                 '/relatorios/pdf/fluxo-caixa?mes=13'])
+def test_mes_invalido_responde_400(app, url):
+    with app.app_context():
+        identidade = db.session.execute(db.select(User).limit(1)).scalar().get_id()
+        db.session.remove()
+    assert diagnostico.cliente_autenticado(app, identidade).get(url).status_code == 400
@@ -0,0 +1,177 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import delete, func, select
+
+from app import create_app, db, tarefas
+from app.config import TestingConfig
+from app.models import Tarefa
+
+execucoes = []
+
+
+@tarefas.tarefa('teste_anotar')
+def _anotar(valor=None):
+    execucoes.append(valor)
+    return {'valor': valor}
+
+
+@tarefas.tarefa('teste_instavel')
+def _instavel():
+    raise RuntimeError('serviço fora do ar')
+
+
+@tarefas.tarefa('teste_invalida')
+def _invalida():
+    raise ValueError('arquivo sem cabeçalho')
+
+
+@pytest.fixture(scope='module')
+def fila_app():
+    """Aplicação sobre um SQLite em memória; as tarefas ficam na fila até serem executadas"""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(TestingConfig, 'SQLALCHEMY_DATABASE_URI', 'sqlite://')
+        app = create_app('testing')
+    app.config['JOBS_EXECUTOR'] = 'worker'
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+@pytest.fixture
+def fila(fila_app):
+    with fila_app.app_context():
+        yield
+        db.session.execute(delete(Tarefa))
+        db.session.commit()
+    execucoes.clear()
+
+
+def _contar(*criterios):
+    return db.session.execute(select(func.count(Tarefa.id)).where(*criterios)).scalar()
+
+
+# Expressões cron
+
+def test_interpretar_campos():
+    cron = tarefas.interpretar('*/15 8-18/4 1,15 * 1-5')
+    assert cron.minutos == {0, 15, 30, 45}
+    assert cron.horas == {8, 12, 16}
+    assert cron.dias == {1, 15}
+    assert cron.meses == set(range(1, 13))
+    assert cron.dias_semana == {1, 2, 3, 4, 5}
+    # 7 também é domingo
+    assert tarefas.interpretar('0 0 * * 7').dias_semana == {0}
+
+
+@pytest.mark.parametrize('expressao', ['* * * *', '60 * * * *', '*/0 * * * *', '5-1 * * * *', 'a * * * *',
+                                       '* * 0 * *'])
+def test_interpretar_rejeita_expressoes_invalidas(expressao):
+    with pytest.raises(ValueError):
+        tarefas.interpretar(expressao)
+
+
+def test_corresponde_dia_ou_dia_da_semana():
+    # Como no cron: com dia e dia da semana restritos, basta um dos dois
+    cron = tarefas.interpretar('30 2 13 * 5')
+    assert tarefas.corresponde(cron, datetime(2026, 10, 13, 2, 30))  # terça-feira, dia 13
+    assert tarefas.corresponde(cron, datetime(2026, 10, 16, 2, 30))  # sexta-feira
+    assert not tarefas.corresponde(cron, datetime(2026, 10, 14, 2, 30))
+    assert not tarefas.corresponde(cron, datetime(2026, 10, 16, 2, 31))
+    # Só o dia da semana restrito: o dia do mês não basta
+    assert not tarefas.corresponde(tarefas.interpretar('0 0 * * 0'), datetime(2026, 10, 13))
+
+
+# Reserva
+
+def test_reservar_por_prioridade_e_horario(fila):
+    baixa = tarefas.enfileirar('teste_anotar', {'valor': 'baixa'}, prioridade=tarefas.BAIXA)
+    alta = tarefas.enfileirar('teste_anotar', {'valor': 'alta'}, prioridade=tarefas.ALTA)
+    tarefas.enfileirar('teste_anotar', {'valor': 'futura'}, prioridade=tarefas.ALTA,
+                       executar_em=datetime.now() + timedelta(hours=1))
+
+    reservada = tarefas.reservar()
+    assert reservada.id == alta.id
+    assert (reservada.situacao, reservada.tentativas) == (tarefas.PROCESSANDO, 1)
+    assert reservada.worker == tarefas.identificacao()
+    # Uma tarefa em andamento não é reservada de novo
+    assert tarefas.reservar(alta.id) is None
+
+    assert tarefas.reservar().id == baixa.id
+    assert tarefas.reservar() is None
+
+
+def test_executar_registra_o_resultado(fila):
+    linha = tarefas.enfileirar('teste_anotar', {'valor': 7})
+    assert tarefas.executar_proxima() is True
+    assert tarefas.executar_proxima() is False
+
+    concluida = tarefas.obter(linha.id)
+    assert concluida.situacao == tarefas.CONCLUIDA
+    assert (concluida.progresso, concluida.resultado) == (1.0, '{"valor": 7}')
+    assert execucoes == [7]
+
+
+# Chave
+
+def test_chave_evita_tarefa_repetida(fila):
+    primeira = tarefas.enfileirar('teste_anotar', chave='relatorio:1')
+    segunda = tarefas.enfileirar('teste_anotar', chave='relatorio:1')
+    assert primeira.id == segunda.id
+    assert _contar(Tarefa.chave == 'relatorio:1') == 1
+
+    # Também depois de executada
+    tarefas.executar_proxima()
+    assert tarefas.enfileirar('teste_anotar', chave='relatorio:1').situacao == tarefas.CONCLUIDA
+    assert _contar() == 1
+
+
+def test_agendamento_uma_vez_por_minuto(fila_app, fila, monkeypatch):
+    monkeypatch.setitem(fila_app.config, 'JOBS_SCHEDULE', [('*/2 * * * *', 'teste_anotar', {})])
+    inicio = datetime(2026, 10, 18, 10, 0)
+
+    assert len(tarefas.agendar(inicio)) == 1
+    assert len(tarefas.agendar(inicio + timedelta(seconds=30))) == 1
+    assert tarefas.agendar(inicio + timedelta(minutes=1)) == []
+    # Minutos 2, 4 e 6 (o 0 já estava na fila)
+    assert len(tarefas.agendar_desde(inicio, inicio + timedelta(minutes=6))) == 3
+    assert _contar() == 4
+
+
+# Falhas
+
+def test_falha_volta_para_a_fila_ate_o_limite(fila_app, fila):
+    linha = tarefas.enfileirar('teste_instavel', max_tentativas=2)
+    antes = datetime.now()
+    tarefas.executar_proxima()
+
+    primeira = tarefas.obter(linha.id)
+    assert (primeira.situacao, primeira.tentativas) == (tarefas.AGUARDANDO, 1)
+    assert primeira.executar_em >= antes + timedelta(seconds=fila_app.config['JOBS_RETRY_DELAY'])
+    assert 'RuntimeError' in primeira.erro
+    assert tarefas.executar_proxima() is False
+
+    db.session.execute(db.update(Tarefa).where(Tarefa.id == linha.id).values(executar_em=datetime.now()))
+    db.session.commit()
+    tarefas.executar_proxima()
+    segunda = tarefas.obter(linha.id)
+    assert (segunda.situacao, segunda.tentativas) == (tarefas.FALHOU, 2)
+
+
+def test_valueerror_nao_e_repetido(fila):
+    linha = tarefas.enfileirar('teste_invalida')
+    tarefas.executar_proxima()
+    falha = tarefas.obter(linha.id)
+    assert (falha.situacao, falha.tentativas, falha.mensagem) == (tarefas.FALHOU, 1, 'arquivo sem cabeçalho')
+
+
+def test_tarefa_de_processo_encerrado_volta_para_a_fila(fila):
+    linha = tarefas.enfileirar('teste_anotar')
+    tarefas.reservar(linha.id)
+    worker = f'{tarefas.identificacao().rsplit(":", 1)[0]}:999999999'
+    db.session.execute(db.update(Tarefa).where(Tarefa.id == linha.id).values(worker=worker))
+    db.session.commit()
+
+    assert tarefas.recuperar_interrompidas() == 1
+    assert tarefas.obter(linha.id).situacao == tarefas.AGUARDANDO
+    assert tarefas.executar_proxima() is True
@@ -0,0 +1,11 @@
+"""
+Ponto de entrada WSGI (gunicorn wsgi:app).
+
+Apenas monta a aplicação: não cria tabelas, não aplica migrações e não
+cadastra dados, para que cada worker suba em poucos milissegundos. Prepare
+o banco antes com flask init-db (e flask seed / flask create-admin).
+"""
+
+from app import create_app
+
+app = create_app()